@@ -24,5 +24,7 @@ experiment = Experiment([simulation])
 # Configure Simulation & Experiment engine
 simulation.engine = experiment.engine
 experiment.engine.backend = Backend.SINGLE_PROCESS
+# Safe without deep copying the state, as Policy Functions receive copy-on-write array State Variables,
+# see `model.utils.copy_on_write`
 experiment.engine.deepcopy = False
 experiment.engine.drop_substeps = True
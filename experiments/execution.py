@@ -0,0 +1,428 @@
+"""
+# Simulation Execution
+
+Runs the model from a state at any timestep, rather than only from the Initial State at timestep 0,
+so that simulations can be resumed from intermediate states, e.g. those cached by `experiments.simulator`,
+or saved to a checkpoint file by `run_checkpointed`,
+and so that parameter subsets that only differ in late-acting parameters share their common prefix, see `run_forked`.
+A System Parameter that changes value at a timestep is declared as a `ParameterChange`,
+which the runs of this module resolve at each timestep.
+
+Resuming from the state of a simulation at a timestep before any changed parameter takes effect
+produces the same results as a run from timestep 0, up to the draws of the stochastic Policy Functions.
+"""
+
+import copy
+import gzip
+import hashlib
+import io
+import logging
+import os
+import pickle
+import random
+import typing
+from dataclasses import dataclass
+from functools import partial
+
+import dill
+import numpy as np
+from radcad import Experiment
+from radcad.core import generate_parameter_sweep, single_run
+
+from model.simulation_calendar import simulation_calendar
+from model.types import Timestep
+
+
+def first_timestep_after_date(key) -> typing.Callable[[dict], Timestep]:
+    """The first timestep whose state is affected by the date of the System Parameter with this key"""
+    def first_affected_timestep(params):
+        calendar = simulation_calendar(params["date_start"], params["dt"])
+        # The timestamp at a timestep is that of the previous timestep, see hub.policy_upgrade_stages
+        return calendar.first_timestep_after(params[key]) + 1
+    return first_affected_timestep
+
+
+def never_affects_state(params) -> Timestep:
+    return np.inf
+
+
+LATE_ACTING_PARAMETERS = {
+    "date_slashing": first_timestep_after_date("date_slashing"),
+    # The Proof-of-Stake launch date of the ETH supply simulator only marks the stages in plots
+    "date_pos": never_affects_state,
+}
+"""
+System Parameters that only affect the state from a timestep onwards,
+mapped to a function of the System Parameters returning that first affected timestep,
+or `np.inf` if the model doesn't read the parameter
+"""
+
+
+@dataclass(frozen=True)
+class ParameterChange:
+    """A System Parameter whose value changes from `before` to `after` at a timestep,
+    e.g. a late change of `inflation_sqrt_numerator`, so that runs share the timesteps before the change
+
+    The change is resolved by `run_from`, and so by `run_forked`, `run_checkpointed` and the runs on processes
+    or a job queue, but not by radCAD `Experiment.run`, which would pass it to the Policy Functions as is.
+    """
+
+    before: typing.Any
+    after: typing.Any
+    timestep: Timestep
+    """The first timestep whose state is updated using the `after` value"""
+
+    def value(self, timestep):
+        """The value of the System Parameter when updating the state of the timestep"""
+        return self.after if timestep >= self.timestep else self.before
+
+
+def parameters_at(params, timestep) -> dict:
+    """The System Parameters when updating the state of the timestep, resolving any `ParameterChange`"""
+    if not any(isinstance(value, ParameterChange) for value in params.values()):
+        return params
+    return {
+        key: value.value(timestep) if isinstance(value, ParameterChange) else value
+        for key, value in params.items()
+    }
+
+
+def change_timestep(a, b) -> Timestep:
+    """The first timestep at which two values of a System Parameter, either of which may be a `ParameterChange`, differ"""
+    before_a, timestep_a = (a.before, a.timestep) if isinstance(a, ParameterChange) else (a, np.inf)
+    before_b, timestep_b = (b.before, b.timestep) if isinstance(b, ParameterChange) else (b, np.inf)
+    if not parameter_equal(before_a, before_b):
+        return 0
+    return min(timestep_a, timestep_b)
+
+
+def parameter_equal(a, b) -> bool:
+    if a is b:
+        return True
+    if isinstance(a, partial) or isinstance(b, partial):
+        # Processes bound to the same arguments, e.g. the constant processes of slider values
+        return (
+            isinstance(a, partial)
+            and isinstance(b, partial)
+            and a.func is b.func
+            and len(a.args) == len(b.args)
+            and all(parameter_equal(x, y) for x, y in zip(a.args, b.args))
+            and a.keywords.keys() == b.keywords.keys()
+            and all(parameter_equal(a.keywords[key], b.keywords[key]) for key in a.keywords)
+        )
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and np.array_equal(a, b)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def divergence_timestep(params, other_params, late_acting=LATE_ACTING_PARAMETERS) -> Timestep:
+    """The first timestep at which the state of simulations with the two sets of System Parameters may differ
+
+    Returns:
+        Timestep: 0 if any parameter other than the late-acting parameters and `ParameterChange` values differs
+        before its change, and `np.inf` if none of the parameters differ
+    """
+    timestep = np.inf
+    for key in params.keys() | other_params.keys():
+        if key in params and key in other_params and parameter_equal(params[key], other_params[key]):
+            continue
+        if key not in params or key not in other_params:
+            return 0
+        if isinstance(params[key], ParameterChange) or isinstance(other_params[key], ParameterChange):
+            timestep = min(timestep, change_timestep(params[key], other_params[key]))
+            continue
+        if key not in late_acting:
+            return 0
+        timestep = min(timestep, late_acting[key](params), late_acting[key](other_params))
+    return max(timestep, 0)
+
+
+def run_from(
+    state: dict,
+    state_update_blocks: list,
+    params: dict,
+    timesteps: int,
+    deepcopy=False,
+    drop_substeps=True,
+) -> typing.List[typing.List[dict]]:
+    """Run the model from a state of a simulation run until the timestep `timesteps`
+
+    Args:
+        state (dict): State of the run to resume from, e.g. the Initial State with the run and timestep set
+        state_update_blocks (list): Partial State Update Blocks
+        params (dict): System Parameters of a single parameter subset, which may include `ParameterChange` values
+        timesteps (int): Last timestep to run until
+        deepcopy (bool): Whether to deepcopy the state passed to Policy Functions, see radCAD `Engine`
+        drop_substeps (bool): Whether to only keep the last substep of each timestep, see radCAD `Engine`
+
+    Returns:
+        List[List[dict]]: The substeps of each timestep after the state, as in radCAD results
+    """
+    results = []
+    previous_state = state
+    # radCAD only offsets the first timestep of a run from a non-zero timestep,
+    # so run one timestep at a time
+    for _ in range(previous_state["timestep"], timesteps):
+        result, exception, _traceback = single_run(
+            simulation=previous_state.get("simulation", 0),
+            timesteps=1,
+            run=previous_state.get("run", 1) - 1,
+            subset=previous_state.get("subset", 0),
+            initial_state=previous_state.copy(),
+            state_update_blocks=state_update_blocks,
+            params=parameters_at(params, previous_state["timestep"] + 1),
+            deepcopy=deepcopy,
+            drop_substeps=drop_substeps,
+        )
+        if exception:
+            raise exception
+        results.append(result[-1])
+        previous_state = result[-1][-1]
+    return results
+
+
+def simulation_tasks(executable, runs=None):
+    """The `(simulation, subset, run)` key, Simulation and System Parameters of each run of an Experiment or Simulation,
+    in the order of radCAD results
+
+    Args:
+        executable (radcad.Experiment or radcad.Simulation): Experiment or Simulation
+        runs (Iterable[int]): Run indices, defaults to all runs of each Simulation
+    """
+    simulations = executable.simulations if isinstance(executable, Experiment) else [executable]
+    for simulation_index, simulation in enumerate(simulations):
+        param_sweep = generate_parameter_sweep(simulation.model.params) or [simulation.model.params]
+        for run in (range(simulation.runs) if runs is None else runs):
+            for subset, params in enumerate(param_sweep):
+                yield (simulation_index, subset, run), simulation, params
+
+
+def run_task(key, simulation, params, seed) -> typing.List[typing.List[dict]]:
+    """Run the `(simulation, subset, run)` task from timestep 0, seeding the random number generators from the task
+
+    Seeding each task independently makes its results independent of the process it runs in
+    and of the other tasks run before it, e.g. when run by `experiments.scheduler` or `experiments.job_queue`.
+
+    Returns:
+        List[List[dict]]: The radCAD results of the task, including the initial state
+    """
+    seeds = np.random.SeedSequence([seed, *key]).generate_state(2)
+    np.random.seed(seeds[0])
+    random.seed(int(seeds[1]))
+
+    engine = simulation.engine
+    state = initial_run_state(simulation, key)
+    return [[state]] + run_from(
+        state,
+        simulation.model.state_update_blocks,
+        params,
+        simulation.timesteps,
+        deepcopy=engine.deepcopy,
+        drop_substeps=engine.drop_substeps,
+    )
+
+
+def initial_run_state(simulation, key) -> dict:
+    simulation_index, subset, run = key
+    return {
+        **copy.deepcopy(simulation.model.initial_state),
+        "simulation": simulation_index,
+        "subset": subset,
+        "run": run + 1,
+        "substep": 0,
+        "timestep": 0,
+    }
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(dill.dumps(value)).hexdigest()[:16]
+
+
+def parameter_fingerprint(params, state_update_blocks) -> dict:
+    """Hashes of each System Parameter and of the State Update Blocks of a run,
+    to check that a checkpoint is resumed with the same model
+    """
+    return {
+        "state_update_blocks": _digest(state_update_blocks),
+        **{f"params.{key}": _digest(value) for key, value in params.items()},
+    }
+
+
+def _history_path(path) -> str:
+    return f"{path}.history"
+
+
+def save_checkpoint(path, checkpoint, chunks=()):
+    """Save a checkpoint to compressed binary files
+
+    The history of each run is appended to `<path>.history` in chunks of the timesteps since the previous save,
+    and the latest state of each run, the state of the random number generators and the parameter fingerprints
+    replace any previous checkpoint at `path` atomically, so that the I/O per save doesn't grow with the history.
+
+    Args:
+        path (str): Checkpoint file
+        checkpoint (dict): Checkpoint, with the results of each run so far
+        chunks (Iterable[tuple]): `(key, timesteps)` pairs of the results of each run since the previous save
+    """
+    with open(_history_path(path), "ab") as file:
+        # Discard any chunks appended by an interrupted save
+        file.truncate(checkpoint.get("history_size", 0))
+        with gzip.GzipFile(fileobj=file, mode="wb", compresslevel=1) as compressed:
+            for chunk in chunks:
+                pickle.dump(chunk, compressed, protocol=pickle.HIGHEST_PROTOCOL)
+        file.flush()
+        os.fsync(file.fileno())
+        checkpoint["history_size"] = file.tell()
+
+    snapshot = {key: value for key, value in checkpoint.items() if key != "results"}
+    snapshot["states"] = {key: results[-1] for key, results in checkpoint["results"].items()}
+    temporary_path = f"{path}.tmp"
+    with gzip.open(temporary_path, "wb", compresslevel=1) as file:
+        pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path) -> dict:
+    """Load a checkpoint saved with `save_checkpoint`, with the results of each run read from its history"""
+    with gzip.open(path, "rb") as file:
+        checkpoint = pickle.load(file)
+    with open(_history_path(path), "rb") as file:
+        history = file.read(checkpoint["history_size"])
+
+    checkpoint["results"] = {}
+    with gzip.GzipFile(fileobj=io.BytesIO(history), mode="rb") as compressed:
+        while True:
+            try:
+                key, timesteps = pickle.load(compressed)
+            except EOFError:
+                break
+            checkpoint["results"].setdefault(key, []).extend(timesteps)
+    return checkpoint
+
+
+def run_checkpointed(executable, checkpoint_path=None, checkpoint_interval=None, resume_from=None) -> list:
+    """Run an Experiment or Simulation, saving a checkpoint of every run every `checkpoint_interval` timesteps
+
+    The checkpoint holds the results of each run so far, including the full state of its last timestep,
+    and the state of the random number generators,
+    so that resuming from it produces the same results as an uninterrupted run.
+    Resuming runs whose System Parameters or State Update Blocks differ from those of the checkpoint raises an error.
+
+    Args:
+        executable (radcad.Experiment or radcad.Simulation): Experiment or Simulation to run
+        checkpoint_path (str): File to save checkpoints to, see `save_checkpoint`
+        checkpoint_interval (int): Timesteps between checkpoints, defaults to only saving completed runs
+        resume_from (str): Checkpoint file to resume from, e.g. the `checkpoint_path` of a run that crashed
+
+    Returns:
+        list: The flattened results, as in radCAD `Experiment.results`
+    """
+    if resume_from:
+        checkpoint = load_checkpoint(resume_from)
+        random.setstate(checkpoint["random_state"])
+        np.random.set_state(checkpoint["numpy_random_state"])
+        if checkpoint_path and os.path.abspath(checkpoint_path) != os.path.abspath(resume_from):
+            # Continue the history of the resumed checkpoint
+            with open(_history_path(resume_from), "rb") as source, open(_history_path(checkpoint_path), "wb") as target:
+                target.write(source.read(checkpoint["history_size"]))
+    else:
+        checkpoint = {"results": {}, "fingerprints": {}, "history_size": 0}
+    saved_timesteps = {key: len(results) for key, results in checkpoint["results"].items()}
+
+    keys = []
+    for key, simulation, params in simulation_tasks(executable):
+        keys.append(key)
+        fingerprint = parameter_fingerprint(params, simulation.model.state_update_blocks)
+        if key in checkpoint["results"]:
+            changed = sorted(
+                name for name in fingerprint.keys() | checkpoint["fingerprints"][key].keys()
+                if fingerprint.get(name) != checkpoint["fingerprints"][key].get(name)
+            )
+            if changed:
+                raise ValueError(f"Run {key} of checkpoint {resume_from} was simulated with different {', '.join(changed)}")
+        checkpoint["fingerprints"][key] = fingerprint
+        results = checkpoint["results"].setdefault(key, [[initial_run_state(simulation, key)]])
+        engine = simulation.engine
+
+        while results[-1][-1]["timestep"] < simulation.timesteps:
+            timestep = results[-1][-1]["timestep"]
+            until = min(timestep + checkpoint_interval, simulation.timesteps) if checkpoint_interval else simulation.timesteps
+            results += run_from(
+                results[-1][-1],
+                simulation.model.state_update_blocks,
+                params,
+                until,
+                deepcopy=engine.deepcopy,
+                drop_substeps=engine.drop_substeps,
+            )
+            if checkpoint_path:
+                checkpoint["random_state"] = random.getstate()
+                checkpoint["numpy_random_state"] = np.random.get_state()
+                save_checkpoint(checkpoint_path, checkpoint, [(key, results[saved_timesteps.get(key, 0):])])
+                saved_timesteps[key] = len(results)
+
+    return [state for key in keys for timestep in checkpoint["results"][key] for state in timestep]
+
+
+def run_forked(executable, late_acting=LATE_ACTING_PARAMETERS) -> list:
+    """Run an Experiment or Simulation, simulating the common prefix of parameter subsets once
+
+    Each run of a parameter subset forks from the state of the previously simulated run with the same index and model
+    that shares the longest prefix with it, i.e. the last timestep before the first of the differing
+    late-acting parameters takes effect, see `divergence_timestep`.
+    For example, a sweep of the `date_slashing` System Parameter simulates the timesteps before the earliest date once.
+    Other System Parameters, e.g. `inflation_sqrt_numerator`, may affect the state from timestep 0,
+    so a late change of such a parameter only shares the prefix when declared as a `ParameterChange`.
+
+    The forked runs use different draws of the stochastic Policy Functions than runs from timestep 0.
+
+    Args:
+        executable (radcad.Experiment or radcad.Simulation): Experiment or Simulation to run
+        late_acting (dict): Late-acting System Parameters, see `LATE_ACTING_PARAMETERS`
+
+    Returns:
+        list: The flattened results, as in radCAD `Experiment.results`
+    """
+    branches = {}
+    all_results = []
+    forked_timesteps = 0
+
+    for key, simulation, params in simulation_tasks(executable):
+        simulation_index, subset, run = key
+        model = simulation.model
+        candidates = branches.setdefault((run, id(model.initial_state), id(model.state_update_blocks)), [])
+
+        source_results, fork_timestep = None, 0
+        for other_params, other_results in candidates:
+            timestep = min(divergence_timestep(params, other_params, late_acting), len(other_results), simulation.timesteps + 1)
+            # Fork from the last state before the first affected timestep
+            if timestep - 1 > fork_timestep:
+                source_results, fork_timestep = other_results, timestep - 1
+
+        if source_results is None:
+            prefix = [[initial_run_state(simulation, key)]]
+        else:
+            prefix = [
+                [{**state, "simulation": simulation_index, "subset": subset} for state in substeps]
+                for substeps in source_results[: fork_timestep + 1]
+            ]
+            forked_timesteps += fork_timestep
+
+        engine = simulation.engine
+        results = prefix + run_from(
+            prefix[-1][-1],
+            model.state_update_blocks,
+            params,
+            simulation.timesteps,
+            deepcopy=engine.deepcopy,
+            drop_substeps=engine.drop_substeps,
+        )
+        candidates.append((params, results))
+        all_results.append(results)
+
+    logging.info(f"Forked {forked_timesteps} timesteps from shared simulation prefixes")
+
+    return [state for results in all_results for substeps in results for state in substeps]
@@ -0,0 +1,302 @@
+"""
+# Distributed Job Queue
+
+Runs the `(simulation, subset, run)` tasks of an Experiment on any number of worker processes,
+on the same node or on nodes sharing a filesystem, using a queue backed by a local directory:
+```
+<queue>/manifest.pkl        Ordered task IDs of the Experiment, `<simulation>-<subset>-<run>-<hash of the task>`
+<queue>/seed.pkl            Seed of the tasks, reused when resubmitting without a seed
+<queue>/tasks/<id>.pkl      Serialized tasks: System Parameters, references to process tables and seed
+<queue>/tables/<hash>.npy   Process tables of the tasks, see `model.stochastic_processes.SharedProcessTable`
+<queue>/claimed/<id>.pkl    Tasks claimed by a worker, by an atomic rename from `tasks/`, touched while running
+<queue>/results/<id>.pkl.gz Results written by the workers, by an atomic rename
+```
+
+The results of each task are seeded from the task, see `experiments.execution.run_task`,
+so retrying a task, e.g. one whose worker died and whose claim expired, is idempotent.
+Task IDs include a hash of the serialized task, so resubmitting a changed Experiment
+doesn't reuse the results of the tasks it changed, and pending tasks it no longer contains are removed. An Experiment whose Initial State or System Parameters
+are drawn anew in each process, e.g. a `date_start` of now, is a changed Experiment in every process:
+to complete its queue after a crash, run workers on the queue instead of resubmitting it.
+
+To add workers on other nodes:
+```bash
+python -m experiments.job_queue <queue>
+```
+"""
+
+import gzip
+import hashlib
+import io
+import logging
+import os
+import pickle
+import shutil
+import socket
+import sys
+import threading
+import time
+import typing
+import uuid
+
+import dill
+import multiprocess
+import numpy as np
+
+from experiments.execution import run_task, simulation_tasks
+from model.stochastic_processes import SharedProcessTable
+
+
+class _TaskPickler(dill.Pickler):
+    """Pickles the process tables of a task as references to their copies in the queue directory,
+    as the files they were published to, e.g. in node-local shared memory, may not be reachable by every worker
+    """
+
+    def __init__(self, file, queue):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.queue = queue
+
+    def persistent_id(self, obj):
+        if isinstance(obj, SharedProcessTable):
+            return self.queue._table_id(obj)
+        return None
+
+
+class _TaskUnpickler(dill.Unpickler):
+    def __init__(self, file, queue):
+        super().__init__(file)
+        self.queue = queue
+
+    def persistent_load(self, table_id):
+        return SharedProcessTable(self.queue._path("tables", table_id, ""))
+
+
+class JobQueue:
+    """A queue of simulation tasks backed by the directory `path`
+
+    Args:
+        path (str): Directory of the queue
+        heartbeat (float): Seconds between renewals of the lease of a running task, shorter than the lease
+    """
+
+    def __init__(self, path, heartbeat=60.0):
+        self.path = path
+        self.heartbeat = heartbeat
+        for directory in ["tasks", "claimed", "results", "tables"]:
+            os.makedirs(os.path.join(path, directory), exist_ok=True)
+        self._table_ids = {}
+
+    def _path(self, directory, task_id, extension=".pkl"):
+        return os.path.join(self.path, directory, task_id + extension)
+
+    def _write(self, path, data, compress=False):
+        temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with (gzip.open(temporary_path, "wb", compresslevel=1) if compress else open(temporary_path, "wb")) as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+    def _table_id(self, table) -> str:
+        """Copy a process table to the queue directory once, named by the hash of its contents"""
+        if table.path not in self._table_ids:
+            digest = hashlib.sha256()
+            with open(table.path, "rb") as file:
+                for chunk in iter(lambda: file.read(2**20), b""):
+                    digest.update(chunk)
+            table_id = digest.hexdigest()[:32] + ".npy"
+            path = self._path("tables", table_id, "")
+            if not os.path.exists(path):
+                temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                shutil.copyfile(table.path, temporary_path)
+                os.replace(temporary_path, path)
+            self._table_ids[table.path] = table_id
+        return self._table_ids[table.path]
+
+    def _dumps(self, task) -> bytes:
+        buffer = io.BytesIO()
+        _TaskPickler(buffer, self).dump(task)
+        return buffer.getvalue()
+
+    def submit(self, executable, seed=None) -> typing.List[str]:
+        """Serialize the tasks of an Experiment or Simulation to the queue
+
+        Tasks already in the queue or completed, e.g. when resubmitting after a crash, are not submitted again.
+        A task whose System Parameters, Simulation or seed changed has a different ID, and is submitted,
+        and pending tasks of an earlier submission that aren't part of this one are removed.
+
+        Args:
+            executable (radcad.Experiment or radcad.Simulation): Experiment or Simulation to run
+            seed (int): Seed of the random number generators of the tasks,
+                defaults to the seed of the last submission to the queue, or a random seed
+
+        Returns:
+            List[str]: The task IDs, in the order of radCAD results
+        """
+        seed = self._seed(seed)
+        task_ids = []
+        for key, simulation, params in simulation_tasks(executable):
+            task = self._dumps((key, simulation, params, seed))
+            task_id = "-".join(map(str, key)) + "-" + hashlib.sha256(task).hexdigest()[:16]
+            task_ids.append(task_id)
+            if any(os.path.exists(path) for path in [
+                self._path("tasks", task_id),
+                self._path("claimed", task_id),
+                self._path("results", task_id, ".pkl.gz"),
+            ]):
+                continue
+            self._write(self._path("tasks", task_id), task)
+        self._write(os.path.join(self.path, "manifest.pkl"), pickle.dumps(task_ids))
+
+        submitted = set(task_ids)
+        for filename in os.listdir(os.path.join(self.path, "tasks")):
+            task_id, extension = os.path.splitext(filename)
+            if extension == ".pkl" and task_id not in submitted:
+                try:
+                    os.remove(self._path("tasks", task_id))
+                except FileNotFoundError:
+                    # Claimed by a worker
+                    pass
+        return task_ids
+
+    def _seed(self, seed=None) -> int:
+        """The seed of a submission, persisted so that resubmitting without a seed reproduces the task IDs"""
+        path = os.path.join(self.path, "seed.pkl")
+        if seed is None and os.path.exists(path):
+            with open(path, "rb") as file:
+                return pickle.load(file)
+        seed = int(np.random.randint(2**31)) if seed is None else seed
+        self._write(path, pickle.dumps(seed))
+        return seed
+
+    def claim(self) -> typing.Optional[str]:
+        """Claim a pending task, returning its ID, or None if there are no pending tasks"""
+        for filename in sorted(os.listdir(os.path.join(self.path, "tasks"))):
+            task_id, extension = os.path.splitext(filename)
+            if extension != ".pkl":
+                continue
+            try:
+                # Start the lease of the claim, before it can be seen as expired
+                os.utime(self._path("tasks", task_id))
+                os.rename(self._path("tasks", task_id), self._path("claimed", task_id))
+            except FileNotFoundError:
+                # Claimed by another worker
+                continue
+            return task_id
+        return None
+
+    def _renew_lease(self, task_id, done: threading.Event):
+        while not done.wait(self.heartbeat):
+            try:
+                os.utime(self._path("claimed", task_id))
+            except FileNotFoundError:
+                # Requeued by another worker
+                return
+
+    def run(self, task_id):
+        """Run a claimed task and write its results, renewing the lease of the claim every `heartbeat` seconds"""
+        with open(self._path("claimed", task_id), "rb") as file:
+            key, simulation, params, seed = _TaskUnpickler(file, self).load()
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_lease, args=(task_id, done), daemon=True)
+        heartbeat.start()
+        try:
+            results = run_task(key, simulation, params, seed)
+        finally:
+            done.set()
+            heartbeat.join()
+        self._write(
+            self._path("results", task_id, ".pkl.gz"),
+            pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL),
+            compress=True,
+        )
+        try:
+            os.remove(self._path("claimed", task_id))
+        except FileNotFoundError:
+            # Requeued and completed by another worker
+            pass
+
+    def requeue_expired(self, lease=3600) -> int:
+        """Return the tasks whose lease was last renewed more than `lease` seconds ago to the queue,
+        e.g. those of workers that died, unless they're no longer part of the submitted Experiment
+        """
+        submitted = set(self.task_ids())
+        requeued = 0
+        for filename in os.listdir(os.path.join(self.path, "claimed")):
+            task_id, extension = os.path.splitext(filename)
+            if extension != ".pkl":
+                continue
+            try:
+                if time.time() - os.path.getmtime(self._path("claimed", task_id)) <= lease:
+                    continue
+                if task_id not in submitted or os.path.exists(self._path("results", task_id, ".pkl.gz")):
+                    os.remove(self._path("claimed", task_id))
+                else:
+                    os.rename(self._path("claimed", task_id), self._path("tasks", task_id))
+                    requeued += 1
+            except FileNotFoundError:
+                continue
+        return requeued
+
+    def work(self):
+        """Run pending tasks until the queue is empty"""
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        while (task_id := self.claim()) is not None:
+            logging.info(f"Worker {worker} running task {task_id}")
+            self.run(task_id)
+
+    def task_ids(self) -> typing.List[str]:
+        with open(os.path.join(self.path, "manifest.pkl"), "rb") as file:
+            return pickle.load(file)
+
+    def is_complete(self) -> bool:
+        return all(os.path.exists(self._path("results", task_id, ".pkl.gz")) for task_id in self.task_ids())
+
+    def results(self) -> list:
+        """Merge the results of all tasks
+
+        Returns:
+            list: The flattened results, as in radCAD `Experiment.results`
+        """
+        merged = []
+        for task_id in self.task_ids():
+            with gzip.open(self._path("results", task_id, ".pkl.gz"), "rb") as file:
+                merged.extend(state for substeps in pickle.load(file) for state in substeps)
+        return merged
+
+
+def _work(path, heartbeat):
+    JobQueue(path, heartbeat).work()
+
+
+def run_distributed(executable, path, workers=1, seed=None, lease=3600, poll_interval=1.0) -> list:
+    """Run an Experiment or Simulation on a job queue, and wait for all tasks to complete
+
+    Args:
+        executable (radcad.Experiment or radcad.Simulation): Experiment or Simulation to run
+        path (str): Directory of the queue, e.g. on a filesystem shared with worker nodes
+        workers (int): Number of local worker processes, in addition to any started on other nodes
+        seed (int): Seed of the random number generators of the tasks, see `JobQueue.submit`
+        lease (float): Seconds without a renewal of the lease after which tasks claimed by a worker are retried
+        poll_interval (float): Seconds between checks for completed tasks
+
+    Returns:
+        list: The flattened results, as in radCAD `Experiment.results`
+    """
+    # Renew the leases of running tasks well before they expire
+    queue = JobQueue(path, heartbeat=min(60.0, lease / 4))
+    queue.submit(executable, seed)
+
+    if workers:
+        with multiprocess.Pool(workers) as pool:
+            pool.starmap(_work, [(path, queue.heartbeat)] * workers)
+
+    while not queue.is_complete():
+        queue.requeue_expired(lease)
+        if workers:
+            queue.work()
+        time.sleep(poll_interval)
+
+    return queue.results()
+
+
+if __name__ == "__main__":
+    JobQueue(sys.argv[1]).work()
@@ -0,0 +1,293 @@
+"""
+# Monte Carlo Statistics
+
+Folds the results of each Monte Carlo run into running statistics per `(simulation, subset, timestep, metric)`
+as it finishes,
+rather than keeping the full trajectory of every run to plot means and bands:
+* the mean and variance, using Welford's online algorithm
+* approximate quantiles, using the P² algorithm (Jain & Chlamtac, 1985), with five markers per quantile
+
+Memory is O(simulations × subsets × timesteps × metrics), independent of the number of runs.
+
+`run_adaptive_monte_carlo` uses the statistics to run batches of runs until the confidence intervals of target metrics
+are narrow enough, instead of a fixed number of runs such as `Run_num.SUPER`.
+"""
+
+import logging
+import typing
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from experiments.post_processing import post_process
+from experiments.scheduler import iter_parallel
+
+
+class P2Quantiles:
+    """Streaming estimates of a quantile of many variables at once, using the P² algorithm
+
+    Args:
+        quantile (float): Quantile to estimate, between 0 and 1
+        size (int): Number of variables
+    """
+
+    def __init__(self, quantile, size):
+        self.quantile = quantile
+        self.increments = np.array([0, quantile / 2, quantile, (1 + quantile) / 2, 1])
+        self.initial_desired_positions = np.array([1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5])
+        self.heights = np.full((size, 5), np.nan)
+        self.positions = np.tile(np.arange(1.0, 6.0), (size, 1))
+        self.desired_positions = np.tile(self.initial_desired_positions, (size, 1))
+        self.count = np.zeros(size, dtype=int)
+
+    def grow(self, size):
+        """Add variables, without observations"""
+        extra = size - len(self.count)
+        self.heights = np.vstack([self.heights, np.full((extra, 5), np.nan)])
+        self.positions = np.vstack([self.positions, np.tile(np.arange(1.0, 6.0), (extra, 1))])
+        self.desired_positions = np.vstack([self.desired_positions, np.tile(self.initial_desired_positions, (extra, 1))])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=int)])
+
+    def add(self, values):
+        """Add an observation of each variable, ignoring NaN observations"""
+        valid = ~np.isnan(values)
+
+        # Store the first five observations
+        initial = valid & (self.count < 5)
+        rows = np.nonzero(initial)[0]
+        self.heights[rows, self.count[rows]] = values[rows]
+        self.count[rows] += 1
+        self.heights[rows[self.count[rows] == 5]] = np.sort(self.heights[rows[self.count[rows] == 5]], axis=1)
+
+        rows = np.nonzero(valid & ~initial)[0]
+        if len(rows) == 0:
+            return
+        x = values[rows]
+        q = self.heights[rows]
+        n = self.positions[rows]
+        self.count[rows] += 1
+
+        # Find the cell k of the observation, extending the extreme markers
+        q[:, 0] = np.minimum(q[:, 0], x)
+        q[:, 4] = np.maximum(q[:, 4], x)
+        k = np.clip(np.sum(x[:, None] >= q[:, 1:4], axis=1), 0, 3)
+        n += np.arange(5)[None, :] > k[:, None]
+        desired = self.desired_positions[rows] + self.increments
+
+        # Adjust the heights of the middle markers
+        for i in range(1, 4):
+            delta = desired[:, i] - n[:, i]
+            adjust = ((delta >= 1) & (n[:, i + 1] - n[:, i] > 1)) | ((delta <= -1) & (n[:, i - 1] - n[:, i] < -1))
+            s = np.sign(delta) * adjust
+            with np.errstate(divide="ignore", invalid="ignore"):
+                parabolic = q[:, i] + s / (n[:, i + 1] - n[:, i - 1]) * (
+                    (n[:, i] - n[:, i - 1] + s) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i])
+                    + (n[:, i + 1] - n[:, i] - s) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1])
+                )
+                neighbour = np.where(s > 0, i + 1, i - 1)
+                linear = q[:, i] + s * (q[np.arange(len(rows)), neighbour] - q[:, i]) / (
+                    n[np.arange(len(rows)), neighbour] - n[:, i]
+                )
+            in_bounds = (q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1])
+            q[:, i] = np.where(adjust, np.where(in_bounds, parabolic, linear), q[:, i])
+            n[:, i] += s
+
+        self.heights[rows] = q
+        self.positions[rows] = n
+        self.desired_positions[rows] = desired
+
+    def estimate(self) -> np.ndarray:
+        """The quantile estimates, exact for variables with fewer than five observations"""
+        estimates = self.heights[:, 2].copy()
+        for count in range(1, 5):
+            rows = self.count == count
+            if rows.any():
+                estimates[rows] = np.quantile(self.heights[rows, :count], self.quantile, axis=1)
+        estimates[self.count == 0] = np.nan
+        return estimates
+
+
+class MonteCarloStatistics:
+    """Running statistics of metrics per simulation, subset and timestep across Monte Carlo runs
+
+    Args:
+        metrics (List[str]): Columns of the DataFrames to accumulate statistics of
+        quantiles (Tuple[float]): Quantiles to estimate
+    """
+
+    def __init__(self, metrics: typing.List[str], quantiles=(0.05, 0.5, 0.95)):
+        self.metrics = list(metrics)
+        self.quantiles = quantiles
+        self.index = pd.MultiIndex.from_arrays([[], [], []], names=["simulation", "subset", "timestep"])
+        self.timestamps = np.array([], dtype="datetime64[ns]")
+        self.count = np.zeros((0, len(self.metrics)))
+        self.mean = np.zeros((0, len(self.metrics)))
+        self.m2 = np.zeros((0, len(self.metrics)))
+        self.quantile_estimators = [P2Quantiles(quantile, 0) for quantile in quantiles]
+        self.runs = 0
+        """Number of runs folded into the statistics, counting each run of each simulation and subset"""
+
+    def _positions(self, df) -> np.ndarray:
+        simulations = df["simulation"].to_numpy() if "simulation" in df else np.zeros(len(df), dtype=int)
+        keys = pd.MultiIndex.from_arrays(
+            [simulations, df["subset"].to_numpy(), df["timestep"].to_numpy()], names=self.index.names
+        )
+        positions = self.index.get_indexer(keys)
+        new = positions == -1
+        if new.any():
+            self.index = self.index.append(keys[new])
+            self.timestamps = np.concatenate([self.timestamps, df["timestamp"].to_numpy()[new]])
+            extra = np.zeros((new.sum(), len(self.metrics)))
+            self.count = np.vstack([self.count, extra])
+            self.mean = np.vstack([self.mean, extra])
+            self.m2 = np.vstack([self.m2, extra])
+            for estimator in self.quantile_estimators:
+                estimator.grow(len(self.index) * len(self.metrics))
+            positions[new] = np.arange(len(self.index) - new.sum(), len(self.index))
+        return positions
+
+    def add(self, df: pd.DataFrame):
+        """Fold the DataFrame of one or more finished runs into the statistics
+
+        Each run is identified by its simulation, subset and run index, and contributes one observation per timestep,
+        that of its last substep.
+        """
+        keys = [key for key in ("simulation", "subset", "run") if key in df]
+        for _key, run_df in (df.groupby(keys, sort=False) if keys else [(None, df)]):
+            # The positions must be unique, as repeated positions of the fancy indexing below would lose writes
+            run_df = run_df.drop_duplicates("timestep", keep="last")
+            positions = self._positions(run_df)
+            values = run_df[self.metrics].to_numpy(dtype=float)
+            valid = ~np.isnan(values)
+
+            # Welford's online algorithm, skipping NaN values
+            count = self.count[positions] + valid
+            delta = np.where(valid, values - self.mean[positions], 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = self.mean[positions] + np.where(valid, delta / count, 0)
+            self.m2[positions] += np.where(valid, delta * (values - mean), 0)
+            self.mean[positions] = mean
+            self.count[positions] = count
+
+            observations = np.full((len(self.index), len(self.metrics)), np.nan)
+            observations[positions] = values
+            for estimator in self.quantile_estimators:
+                estimator.add(observations.ravel())
+            self.runs += 1
+
+    def statistics(self) -> pd.DataFrame:
+        """The statistics per simulation, subset and timestep, with a (metric, statistic) column for each"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        statistics = {
+            "count": self.count,
+            "mean": np.where(self.count > 0, self.mean, np.nan),
+            "std": np.where(self.count > 1, std, np.nan),
+        }
+        for quantile, estimator in zip(self.quantiles, self.quantile_estimators):
+            statistics[f"q{quantile:g}"] = estimator.estimate().reshape(self.count.shape)
+
+        columns = pd.MultiIndex.from_tuples(
+            [(metric, statistic) for metric in self.metrics for statistic in statistics], names=["metric", "statistic"]
+        )
+        values = np.stack([statistics[statistic] for statistic in statistics], axis=2).reshape(len(self.index), -1)
+        df = pd.DataFrame(values, index=self.index, columns=columns)
+        df.insert(0, "timestamp", self.timestamps)
+        return df.sort_index()
+
+    def frames(self, statistic="mean", simulation=0) -> typing.Dict[int, pd.DataFrame]:
+        """A DataFrame of a statistic of the metrics per timestamp for each subset of a simulation,
+        e.g. for the plots of `experiments.notebooks.visualizations.multi_sim`
+        """
+        statistics = self.statistics().xs(simulation, level="simulation")
+        df = statistics.xs(statistic, axis=1, level="statistic")
+        df.insert(0, "timestamp", statistics["timestamp"])
+        return {
+            subset: df.xs(subset, level="subset").reset_index()
+            for subset in df.index.get_level_values("subset").unique()
+        }
+
+    def confidence_interval_width(self, confidence=0.95, relative=False) -> pd.DataFrame:
+        """The width of the normal confidence interval of the mean of each metric per simulation, subset and timestep
+
+        Args:
+            confidence (float): Confidence level
+            relative (bool): Whether to divide the width by the absolute value of the mean
+        """
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            width = 2 * z * np.sqrt(self.m2 / (self.count - 1)) / np.sqrt(self.count)
+            if relative:
+                width = width / np.abs(self.mean)
+        width = np.where(self.count > 1, width, np.inf)
+        return pd.DataFrame(width, index=self.index, columns=self.metrics).sort_index()
+
+
+def run_monte_carlo_statistics(
+    executable, metrics, quantiles=(0.05, 0.5, 0.95), processes=None, seed=None, runs=None, statistics=None
+):
+    """Run an Experiment or Simulation on a process pool, folding each run into `MonteCarloStatistics` as it finishes
+
+    Args:
+        runs (Iterable[int]): Run indices to run, defaults to all runs
+        statistics (MonteCarloStatistics): Statistics to fold the runs into, defaults to new statistics
+
+    Returns:
+        MonteCarloStatistics: The statistics of the metrics across runs
+    """
+    statistics = statistics or MonteCarloStatistics(metrics, quantiles)
+    for (simulation_index, _subset, _run), results in iter_parallel(executable, processes, seed, runs=runs):
+        simulation = executable.simulations[simulation_index] if hasattr(executable, "simulations") else executable
+        df = pd.DataFrame([state for substeps in results for state in substeps])
+        statistics.add(post_process(df, parameters=simulation.model.params))
+    return statistics
+
+
+def run_adaptive_monte_carlo(
+    executable,
+    metrics,
+    tolerance,
+    relative=True,
+    confidence=0.95,
+    batch_size=10,
+    max_runs=200,
+    quantiles=(0.05, 0.5, 0.95),
+    processes=None,
+    seed=None,
+) -> typing.Tuple[MonteCarloStatistics, bool]:
+    """Run batches of Monte Carlo runs until the confidence intervals of the target metrics are narrower than a tolerance
+
+    Each batch runs the next `batch_size` run indices of the Experiment or Simulation, ignoring its `runs`,
+    and stops once the widest confidence interval of the mean of the metrics,
+    across simulations, subsets and timesteps, is at most `tolerance`, or after `max_runs` runs.
+
+    Args:
+        executable (radcad.Experiment or radcad.Simulation): Experiment or Simulation to run
+        metrics (List[str]): Target metrics, e.g. `total_profit_yields_pct`, `monoply_51`
+        tolerance (float): Maximum confidence interval width
+        relative (bool): Whether the tolerance is relative to the absolute value of the mean
+        confidence (float): Confidence level
+        batch_size (int): Runs per batch
+        max_runs (int): Maximum number of runs, e.g. `Run_num.SUPER.value`
+
+    Returns:
+        Tuple[MonteCarloStatistics, bool]: The statistics, and whether the confidence intervals converged
+    """
+    seed = int(np.random.randint(2**31)) if seed is None else seed
+    statistics = MonteCarloStatistics(metrics, quantiles)
+    runs = 0
+    while runs < max_runs:
+        batch = range(runs, min(runs + batch_size, max_runs))
+        run_monte_carlo_statistics(executable, metrics, processes=processes, seed=seed, runs=batch, statistics=statistics)
+        runs = batch.stop
+
+        # Ignore metrics that are undefined in every run, and zero-width intervals around a zero mean
+        width = statistics.confidence_interval_width(confidence, relative)
+        defined = pd.DataFrame(statistics.count > 0, index=statistics.index, columns=metrics).sort_index()
+        max_width = np.nanmax(width.where(defined).to_numpy(), initial=0)
+        logging.info(f"Monte Carlo runs: {runs}, maximum confidence interval width: {max_width}")
+        if max_width <= tolerance:
+            return statistics, True
+
+    return statistics, False
@@ -17,6 +17,7 @@ from experiments.notebooks.visualizations.plotly_theme import (
 )
 from model.system_parameters import parameters, validator_environments
 import model.constants as constants
+from model.emission import EMISSION_OPTIONS, emission_df
 from . import multi_sim
 
 
@@ -3238,41 +3239,21 @@ def plot_treasury_balance_barplot(df):
 
 ## Emission Model
 def create_emission_df():
-    # Define the duration
-    start_date = datetime.today()
-    end_date = start_date.replace(year=start_date.year + 15)
-    dates = pd.date_range(start=start_date, end=end_date, freq='M')
-
-    # Initialize the DataFrame
-    df = pd.DataFrame(index=dates)
-    df.index.name = 'timestamp'
-
-    # Define the inflation rates for the first 10 years
-    first_10_years = (df.index.year - start_date.year < 10)
-
-    df['option_1'] = 0.01  # Option 1: The inflation rate remains at 1% for the entire duration
-    df.loc[first_10_years, 'option_2'] = 0.01  # Option 2: The inflation rate is 1% for the first 10 years
-    df.loc[first_10_years, 'option_3'] = 0.01  # Option 3: The inflation rate is 1% for the first 10 years
-    df.loc[first_10_years,'curve_group'] = 0
-
-    # Define the inflation rates for the last 5 years
-    last_5_years = ~first_10_years
-
-    # Convert date index to series
-    date_series = pd.Series(df.index)
-
-    # Calculate the years into last 5 years
-    years_into_last_5 = (df.index[last_5_years].year - df.index[last_5_years].year.min()) + \
-                        (df.index[last_5_years].month - df.index[last_5_years].month.min()) / 12
-
-    # Option 2: The inflation rate decreases quadratically
-    df.loc[last_5_years, 'option_2'] = np.maximum(0.01 * (1 - (years_into_last_5 / 7) ** 2),0)
-
-    # Option 3: The inflation rate decreases exponentially
-    df.loc[last_5_years, 'option_3'] = np.maximum(0.01 * (1 - (years_into_last_5 / 3) ** 2),0)
-
-    # mark the last 5 years as curve group 1
-    df.loc[last_5_years,'curve_group'] = 1
+    # Evaluate the emission model options over 15 years, see model/emission.py
+    emission = emission_df(
+        validator_rates=(0.01,),
+        treasury_rates=(0.01,),
+        constant_years=(10,),
+        decay_years=tuple(EMISSION_OPTIONS.values()),
+        years=15,
+    )
+    df = emission.pivot(index="timestamp", columns="decay_years", values="validator_emission")
+    df = df[list(EMISSION_OPTIONS.values())]
+    df.columns = list(EMISSION_OPTIONS)
+    df.columns.name = None
+
+    # Mark the first 10 years as curve group 0, and the last 5 years as curve group 1
+    df['curve_group'] = np.where(df.index.year - df.index.year.min() < 10, 0.0, 1.0)
 
     df.reset_index(level=0, inplace=True)
 
@@ -5,12 +5,13 @@ from dash.dependencies import Input, Output
 from dash.exceptions import PreventUpdate
 import copy
 from datetime import datetime
+from functools import partial
 import psutil
 
 import experiments.notebooks.visualizations as visualizations
 import experiments.notebooks.visualizations.plotly_theme
 import experiments.templates.eth_supply_analysis as eth_supply_analysis
-from experiments.run import run
+from experiments.simulator import WarmSimulator
 from data.historical_values import df_ether_supply
 
 
@@ -191,22 +192,35 @@ def update_output_graph(validator_adoption, pos_launch_date, eip1559_base_fee):
     )
 
 
+def constant(value, _run, _timestep):
+    return value
+
+
+def slider_parameters(validators_per_epoch, pos_launch_date, eip1559_base_fee):
+    # Processes of the same slider values compare equal, see experiments.execution.parameter_equal,
+    # so that the warm simulator can resume from the results of other slider values
+    return {
+        'validator_process': partial(constant, float(validators_per_epoch)),
+        'date_pos': datetime.strptime(pos_launch_date, '%Y/%m/%d'),
+        'base_fee_process': partial(constant, float(eip1559_base_fee)),  # Gwei per gas
+    }
+
+
+# Keep the simulation warm between slider callbacks, see experiments/simulator.py
+warm_simulator = WarmSimulator(simulation, parameters=slider_parameters)
+
+
 def run_simulation(validators_per_epoch, pos_launch_date, eip1559_base_fee):
-    simulation.model.params.update({
-        'validator_process': [
-            lambda _run, _timestep: float(validators_per_epoch),
-        ],
-        'date_pos': [
-            datetime.strptime(pos_launch_date, '%Y/%m/%d')
-        ],
-        'base_fee_process': [
-            lambda _run, _timestep: float(eip1559_base_fee),
-        ],  # Gwei per gas
-    })
-
-    df, _exceptions = run(simulation)
-
-    return df, simulation.model.params
+    sliders = dict(
+        validators_per_epoch=validators_per_epoch,
+        pos_launch_date=pos_launch_date,
+        eip1559_base_fee=eip1559_base_fee,
+    )
+    # Dash runs each callback on a server thread already, so the simulation runs on this thread
+    df = warm_simulator.run(**sliders)
+    parameters = {key: [value] for key, value in warm_simulator.params(**sliders).items()}
+
+    return df, parameters
 
 
 def run_eth_supply_simulator(execution_mode=None):
@@ -0,0 +1,263 @@
+"""
+# Parameter Optimization
+
+Searches continuous System Parameters, e.g. `inflationary_rate_per_year` and `inflation_sqrt_numerator`,
+for settings meeting economic targets, such as a validator yield band with capped `supply_inflation`,
+using the Covariance Matrix Adaptation Evolution Strategy (CMA-ES, Hansen, 2016) in the unit hypercube of the dimensions.
+
+Each generation of candidates is evaluated as one batch, e.g. as the parameter subsets of a Simulation
+run on a process pool, see `experiments.surrogate.simulation_metrics`,
+and every evaluated point is cached on disk, so that a rerun with the same seed replays the cached evaluations,
+and a run with a larger budget continues where the last one stopped.
+The Pareto front over the objectives, e.g. yield vs. inflation vs. decentralization,
+is taken from all evaluated points that meet the constraints.
+"""
+
+import logging
+import math
+import os
+import typing
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from experiments.sweeps import Dimension
+
+
+@dataclass
+class Objective:
+    """An objective of a metric, minimized, maximized, or within the band from `low` to `high`"""
+
+    metric: str
+    direction: str = "min"
+    """Direction of the objective, one of min, max, or band"""
+    low: float = -np.inf
+    high: float = np.inf
+    weight: float = 1.0
+    """Weight of the objective in the weighted sum optimized by CMA-ES"""
+
+    def loss(self, values: np.ndarray) -> np.ndarray:
+        """The loss of the metric values, to minimize"""
+        if self.direction == "min":
+            return values
+        if self.direction == "max":
+            return -values
+        if self.direction == "band":
+            return np.maximum(self.low - values, 0) + np.maximum(values - self.high, 0)
+        raise ValueError(f"Invalid objective direction {self.direction}")
+
+
+@dataclass
+class Constraint:
+    """A constraint on a metric to be within the range from `low` to `high`"""
+
+    metric: str
+    low: float = -np.inf
+    high: float = np.inf
+
+    def violation(self, values: np.ndarray) -> np.ndarray:
+        violation = np.maximum(self.low - values, 0) + np.maximum(values - self.high, 0)
+        return np.where(np.isnan(values), np.inf, violation)
+
+
+class EvaluationCache:
+    """A cache of evaluated points persisted to disk
+
+    Args:
+        path (str): Pickle file of the evaluations, loaded if it exists
+        evaluate (Callable): Function of a design table returning the metrics of each point,
+            e.g. `experiments.surrogate.simulation_metrics`
+        parameters (List[str]): System Parameters of the points
+    """
+
+    def __init__(self, path, evaluate, parameters: typing.List[str]):
+        self.path = path
+        self.evaluate = evaluate
+        self.parameters = list(parameters)
+        self.evaluations = pd.read_pickle(path) if path and os.path.exists(path) else None
+        self.evaluated_points = 0
+        """Number of points evaluated rather than read from the cache, e.g. for monitoring"""
+
+    def __call__(self, table: pd.DataFrame) -> pd.DataFrame:
+        """The metrics of each point of a design table, evaluating the points not in the cache as one batch"""
+        keys = list(table[self.parameters].itertuples(index=False, name=None))
+        cached = {} if self.evaluations is None else {
+            key: row for key, row in zip(
+                self.evaluations[self.parameters].itertuples(index=False, name=None),
+                self.evaluations.drop(columns=self.parameters).to_dict("records"),
+            )
+        }
+
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        # Evaluate duplicate points of the table once
+        missing = list({keys[i]: i for i in reversed(missing)}.values())[::-1]
+        if missing:
+            batch = table.iloc[missing].reset_index(drop=True)
+            values = self.evaluate(batch).reset_index(drop=True)
+            self.evaluated_points += len(batch)
+            evaluations = pd.concat([batch[self.parameters], values], axis=1)
+            self.evaluations = pd.concat([self.evaluations, evaluations], ignore_index=True)
+            self.save()
+            cached.update(zip(
+                evaluations[self.parameters].itertuples(index=False, name=None),
+                values.to_dict("records"),
+            ))
+
+        return pd.DataFrame([cached[key] for key in keys], index=table.index)
+
+    def save(self):
+        if not self.path:
+            return
+        temporary_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        self.evaluations.to_pickle(temporary_path)
+        os.replace(temporary_path, self.path)
+
+
+class CMAES:
+    """The (mu/mu_w, lambda)-CMA-ES, minimizing a function of points in `dimensions` dimensions
+
+    Args:
+        mean (np.ndarray): Initial mean of the search distribution
+        sigma (float): Initial step size
+        population (int): Number of candidates per generation, defaults to `4 + 3 ln(dimensions)`
+        seed (int): Seed of the random number generator
+    """
+
+    def __init__(self, mean, sigma, population=None, seed=None):
+        n = len(mean)
+        self.mean = np.array(mean, dtype=float)
+        self.sigma = sigma
+        self.population = population or 4 + int(3 * math.log(n))
+        self.rng = np.random.default_rng(seed)
+
+        mu = self.population // 2
+        weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1 / (self.weights ** 2).sum()
+
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.C = np.eye(n)
+        self.generation = 0
+
+    def ask(self) -> np.ndarray:
+        """Sample the candidates of the next generation, in [Population, Dimensions]"""
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        z = self.rng.standard_normal((self.population, len(self.mean)))
+        self.y = z @ (self.B * self.D).T
+        return self.mean + self.sigma * self.y
+
+    def tell(self, ranks: np.ndarray):
+        """Update the search distribution from the ranks of the candidates of `ask`, lowest first"""
+        n = len(self.mean)
+        selected = self.y[np.argsort(ranks)[: len(self.weights)]]
+        y_w = self.weights @ selected
+        self.mean = self.mean + self.sigma * y_w
+
+        inverse_sqrt_C = self.B @ np.diag(1 / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(self.cs * (2 - self.cs) * self.mueff) * inverse_sqrt_C @ y_w
+        self.generation += 1
+        norm = np.linalg.norm(self.ps) / math.sqrt(1 - (1 - self.cs) ** (2 * self.generation))
+        hsig = norm / self.chi_n < 1.4 + 2 / (n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+
+        rank_mu = (selected * self.weights[:, None]).T @ selected
+        self.C = (
+            (1 - self.c1 - self.cmu) * self.C
+            + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+            + self.cmu * rank_mu
+        )
+        self.sigma *= math.exp(self.cs / self.damps * (np.linalg.norm(self.ps) / self.chi_n - 1))
+
+
+def _losses(values: pd.DataFrame, objectives, constraints) -> typing.Tuple[np.ndarray, np.ndarray]:
+    losses = np.column_stack([objective.loss(values[objective.metric].to_numpy(dtype=float)) for objective in objectives])
+    violations = sum(
+        (constraint.violation(values[constraint.metric].to_numpy(dtype=float)) for constraint in constraints),
+        np.zeros(len(values)),
+    )
+    return losses, violations
+
+
+def pareto_front(evaluations: pd.DataFrame, objectives: typing.List[Objective], constraints=()) -> pd.DataFrame:
+    """The evaluated points meeting the constraints that no other such point improves on in every objective"""
+    losses, violations = _losses(evaluations, objectives, constraints)
+    feasible = (violations == 0) & ~np.isnan(losses).any(axis=1)
+    losses = losses[feasible]
+    dominated = (
+        (losses[:, None, :] <= losses[None, :, :]).all(axis=2)
+        & (losses[:, None, :] < losses[None, :, :]).any(axis=2)
+    ).any(axis=0)
+    return evaluations[feasible][~dominated]
+
+
+def optimize(
+    evaluate,
+    dimensions: typing.List[Dimension],
+    objectives: typing.List[Objective],
+    constraints: typing.List[Constraint] = (),
+    cache_path=None,
+    max_evaluations=200,
+    population=None,
+    sigma=0.3,
+    seed=None,
+) -> typing.Tuple[pd.DataFrame, pd.DataFrame]:
+    """Minimize the weighted sum of the objective losses over the dimensions with CMA-ES, subject to the constraints
+
+    Candidates are ranked by their constraint violation, then their weighted loss,
+    and candidates outside the ranges of the dimensions are evaluated at the nearest point in range,
+    ranked behind it by their distance to the range.
+
+    Args:
+        evaluate (Callable): Function of a design table returning the metrics of each point,
+            e.g. `experiments.surrogate.simulation_metrics`
+        dimensions (List[Dimension]): Swept System Parameters
+        objectives (List[Objective]): Objectives, e.g. a `total_profit_yields_pct` band and minimum `monoply_51`
+        constraints (List[Constraint]): Constraints, e.g. a maximum `supply_inflation`
+        cache_path (str): Pickle file to cache the evaluated points in, see `EvaluationCache`
+        max_evaluations (int): Budget of evaluated candidates, including those read from the cache
+        population (int): Candidates per generation, evaluated as one batch
+        sigma (float): Initial step size, relative to the ranges of the dimensions
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The Pareto front and all evaluated points,
+        with a column per System Parameter and metric, and the weighted `loss` and constraint `violation`
+    """
+    parameters = [dimension.parameter for dimension in dimensions]
+    cache = EvaluationCache(cache_path, evaluate, parameters)
+    strategy = CMAES(np.full(len(dimensions), 0.5), sigma, population, seed)
+    weights = np.array([objective.weight for objective in objectives])
+
+    evaluations = []
+    evaluated = 0
+    while evaluated + strategy.population <= max_evaluations:
+        candidates = strategy.ask()
+        in_range = np.clip(candidates, 0, 1)
+        table = pd.DataFrame(
+            {dimension.parameter: dimension.scale(in_range[:, i]) for i, dimension in enumerate(dimensions)}
+        )
+        values = cache(table)
+        evaluated += len(table)
+
+        losses, violations = _losses(values, objectives, constraints)
+        loss = np.where(np.isnan(losses).any(axis=1), np.inf, losses @ weights)
+        out_of_range = np.linalg.norm(candidates - in_range, axis=1)
+        ranks = np.lexsort((out_of_range, loss, violations))
+        strategy.tell(np.argsort(ranks))
+
+        evaluations.append(pd.concat([table, values.reset_index(drop=True)], axis=1).assign(loss=loss, violation=violations))
+        logging.info(f"CMA-ES generation {strategy.generation}: best loss {loss[violations == 0].min(initial=np.inf)}")
+
+    evaluations = pd.concat(evaluations, ignore_index=True) if evaluations else pd.DataFrame(columns=parameters)
+    evaluations = evaluations.drop_duplicates(subset=parameters, ignore_index=True)
+    return pareto_front(evaluations, objectives, constraints), evaluations
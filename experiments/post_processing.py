@@ -4,6 +4,8 @@ from radcad.core import generate_parameter_sweep
 import model.constants as constants
 from model.system_parameters import parameters, Parameters, validator_environments
 from model.types import List
+from typing import Iterable
+from model.simulation_calendar import simulation_calendar
 
 
 def assign_parameters(df: pd.DataFrame, parameters: Parameters, set_params=[]):
@@ -18,6 +20,19 @@ def assign_parameters(df: pd.DataFrame, parameters: Parameters, set_params=[]):
     return df
 
 
+def simulation_years(df: pd.DataFrame, parameters: Parameters):
+    """Whole years since the earliest timestamp for each row, NaN for the initial state"""
+    date_starts = set(parameters['date_start'])
+    dts = df['dt'].unique()
+    if len(date_starts) == 1 and len(dts) == 1:
+        # Each timestamp is that of the previous timestep, see hub.policy_upgrade_stages
+        calendar = simulation_calendar(date_starts.pop(), dts[0])
+        return calendar.years_at(df['timestep'].to_numpy() - 1)
+    # Otherwise the calendars differ per subset, so fall back to the timestamps
+    earliest_date = df['timestamp'].min()
+    return (df['timestamp'] - earliest_date).dt.days // 365
+
+
 def post_process(df: pd.DataFrame, drop_timestep_zero=True, parameters=parameters):
     # Assign parameters to DataFrame
     assign_parameters(df, parameters, [
@@ -93,13 +108,15 @@ def post_process(df: pd.DataFrame, drop_timestep_zero=True, parameters=parameter
     # Calculate cumulative treasury balance
     df["cumulative_treasury_balance_usd"] = df.groupby('subset')["total_inflation_to_validators_usd"].transform('cumsum')
     # Calculate the total annaul treasury inflow by years
-    earliest_date = df['timestamp'].min()
-    df['year'] = (df['timestamp'] - earliest_date).dt.days // 365
+    df['year'] = simulation_years(df, parameters)
     df['annual_treasury_inflow'] = df.groupby(['subset', 'year'])['total_inflation_to_validators_usd'].transform('sum')
 
 
     # Convert treasury balance from Gwei to POLYGN
-    df[['total_domain_treasury_balance']] = df[['domain_treasury_balance_locked']] / constants.gwei
+    df['total_domain_treasury_balance'] = (
+        df['domain_treasury_balance_locked'] + df['domain_treasury_balance_unlocked']
+    ) / constants.gwei
+    df['domain_treasury_balance_unlocked_polygn'] = df['domain_treasury_balance_unlocked'] / constants.gwei
 
     # Drop the initial state for plotting
     if drop_timestep_zero:
@@ -108,16 +125,43 @@ def post_process(df: pd.DataFrame, drop_timestep_zero=True, parameters=parameter
     return df
 
 
-def aggregate_df_in_multi_sims(dfs: List[pd.DataFrame]):
-    # get the average number for each subset across all df
-    agg_dfs = {}
-    for subset in dfs[0].subset.unique():
-        agg_df_list = []
-        for df in dfs:
-            df_subset = df.query(f"subset == {subset}").copy()
-            #df_subset['data'] = pd.to_numeric(df_subset['data']) # Convert 'data' column to numeric
-            agg_df_list.append(df_subset)
-        agg_df = pd.concat(agg_df_list) # Using pd.concat instead of df.append
-        agg_df = agg_df.groupby('timestamp').mean(numeric_only=True).reset_index() # Specify numeric_only=False
-        agg_dfs[subset] = agg_df
-    return agg_dfs
+def aggregate_df_in_multi_sims(dfs: Iterable[pd.DataFrame]):
+    """The mean of the numeric columns per subset and timestamp across the DataFrames of multiple simulations
+
+    The DataFrames are folded into running sums and counts one at a time,
+    so `dfs` can be a generator yielding the DataFrame of each replicate as it finishes.
+
+    Returns:
+        dict: DataFrame of the means per timestamp, for each subset
+    """
+    sums, counts, subsets = None, None, None
+    for df in dfs:
+        if subsets is None:
+            subsets = df.subset.unique()
+        # Group by the values of the subset and timestamp, keeping the subset column as in `groupby('timestamp')`
+        grouped = df.groupby([df['subset'].to_numpy(), df['timestamp'].to_numpy()])
+        df_sums = grouped.sum(numeric_only=True)
+        df_counts = grouped[list(df_sums.columns)].count()
+        sums = df_sums if sums is None else sums.add(df_sums, fill_value=0)
+        counts = df_counts if counts is None else counts.add(df_counts, fill_value=0)
+
+    means = sums / counts.where(counts > 0)
+    means.index.names = ['subset', 'timestamp']
+    return {subset: means.xs(subset, level='subset').reset_index() for subset in subsets}
+
+
+def aggregate_statistics(dfs: List[pd.DataFrame], quantiles=(0.05, 0.5, 0.95)) -> pd.DataFrame:
+    """The mean, standard deviation and quantiles of the numeric columns per subset and timestamp across simulations
+
+    Returns:
+        pd.DataFrame: Statistics indexed by subset and timestamp, with a (column, statistic) column for each
+    """
+    df = pd.concat(dfs, keys=range(len(dfs)), names=['replicate']).reset_index(level='replicate')
+    columns = [column for column in df.select_dtypes(include=['number', 'bool']).columns if column not in ('subset', 'replicate')]
+    grouped = df.groupby(['subset', 'timestamp'])[columns]
+    statistics = {'mean': grouped.mean(), 'std': grouped.std()}
+    for quantile in quantiles:
+        statistics[f'q{quantile:g}'] = grouped.quantile(quantile)
+    return pd.concat(statistics, axis=1).swaplevel(axis=1)[
+        [(column, statistic) for column in columns for statistic in statistics]
+    ]
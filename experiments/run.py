@@ -2,9 +2,14 @@ import pandas as pd
 import logging
 import sys
 import time
+from contextlib import nullcontext
 
 from experiments.default_experiment import experiment
+from experiments.execution import run_checkpointed, run_forked
+from experiments.job_queue import run_distributed
+from experiments.scheduler import run_parallel
 from experiments.post_processing import post_process
+from model.block_scheduler import scheduled_blocks
 
 # Configure logging framework
 # e.g. Use logging.debug(...) to log to log file
@@ -17,11 +22,65 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
-def run(executable=experiment):
+def run(
+    executable=experiment,
+    checkpoint_path=None,
+    checkpoint_interval=None,
+    resume_from=None,
+    fork=False,
+    processes=None,
+    queue_path=None,
+    schedule=False,
+    concurrent=False,
+):
+    """Run an Experiment or Simulation and post-process the results
+
+    Args:
+        executable (radcad.Experiment or radcad.Simulation): Experiment or Simulation to run
+        checkpoint_path (str): File to save checkpoints of every run to, see `experiments.execution.run_checkpointed`
+        checkpoint_interval (int): Timesteps between checkpoints
+        resume_from (str): Checkpoint file to resume from
+        fork (bool): Whether to simulate the common prefix of parameter subsets once,
+            see `experiments.execution.run_forked`
+        processes (int): Number of processes to run the tasks of the experiment on,
+            see `experiments.scheduler.run_parallel`
+        queue_path (str): Directory of a job queue to run the tasks of the experiment on,
+            with `processes` local workers, see `experiments.job_queue.run_distributed`
+        schedule (bool): Whether to merge independent State Update Blocks into fewer substeps,
+            see `model.block_scheduler.scheduled_blocks`
+        concurrent (bool): Whether to evaluate the policies of merged blocks that don't draw random numbers concurrently
+
+    Raises:
+        ValueError: If options of different execution backends are combined, e.g. `fork` and `processes`
+    """
+    checkpointed = bool(checkpoint_path or resume_from)
+    if fork and (processes or queue_path or checkpointed):
+        raise ValueError("Forked runs can't be run on processes, a job queue, or checkpointed")
+    if (processes or queue_path) and checkpointed:
+        raise ValueError("Runs on processes or a job queue can't be checkpointed")
+    if checkpoint_interval and not checkpoint_path:
+        raise ValueError("A checkpoint interval requires a checkpoint path")
+    if concurrent and not schedule:
+        raise ValueError("Concurrent policies require scheduled State Update Blocks")
+
     logging.info("Running experiment")
     start_time = time.time()
 
-    executable.run()
+    with scheduled_blocks(executable, concurrent) if schedule else nullcontext():
+        if fork:
+            executable.results = run_forked(executable)
+            executable.exceptions = []
+        elif queue_path:
+            executable.results = run_distributed(executable, queue_path, workers=processes or 1)
+            executable.exceptions = []
+        elif processes:
+            executable.results = run_parallel(executable, processes)
+            executable.exceptions = []
+        elif checkpointed:
+            executable.results = run_checkpointed(executable, checkpoint_path, checkpoint_interval, resume_from)
+            executable.exceptions = []
+        else:
+            executable.run()
 
     experiment_duration = time.time() - start_time
     logging.info(f"Experiment complete in {experiment_duration} seconds")
@@ -0,0 +1,94 @@
+"""
+# Parallel Experiment Scheduler
+
+Runs every `(simulation, subset, run)` of an Experiment as a separate task on a process pool,
+rather than serially as radCAD's `Backend.SINGLE_PROCESS` does.
+
+Tasks are ordered by their estimated cost, the number of timesteps times the expected number of chains,
+and handed out one at a time from a shared queue, so that workers that finish early take over the remaining tasks,
+and the most expensive tasks don't end up last.
+Results are streamed back in the order of radCAD results as soon as all earlier tasks are complete.
+"""
+
+import typing
+
+import numpy as np
+import multiprocess
+from tqdm.auto import tqdm
+
+from experiments.execution import run_task, simulation_tasks
+
+
+_tasks = None
+"""The tasks of the Experiment in the worker process, set once per worker by `_initialize_worker`"""
+
+
+def estimate_cost(simulation, params, run) -> float:
+    """Estimate the cost of a task as the sum over its timesteps of the expected number of chains
+
+    The chain x validator matrices grow with the chains adopted per timestep,
+    see `supernets.policy_new_supernet_staking`.
+    """
+    dt = params.get("dt", 1)
+    initial_chains = np.shape(simulation.model.initial_state.get("staking_metrics", ()))[0] or 1
+    adoption = [
+        params["Adoption_speed_process"](run + 1, timestep * dt)
+        + params["Adoption_speed_public_process"](run + 1, timestep * dt)
+        for timestep in range(simulation.timesteps)
+    ] if "Adoption_speed_process" in params and "Adoption_speed_public_process" in params else 0
+    return float(np.sum(initial_chains + np.cumsum(adoption)))
+
+
+def _initialize_worker(tasks):
+    global _tasks
+    _tasks = tasks
+
+
+def _run_task(args):
+    index, seed = args
+    return index, run_task(*_tasks[index], seed)
+
+
+def iter_parallel(executable, processes=None, seed=None, progress=True, runs=None) -> typing.Iterator[tuple]:
+    """Run an Experiment or Simulation on a process pool, yielding the results of each task in order
+
+    Args:
+        executable (radcad.Experiment or radcad.Simulation): Experiment or Simulation to run
+        processes (int): Number of worker processes, defaults to the number of CPUs
+        seed (int): Seed of the random number generators of the tasks, defaults to a draw from NumPy's
+        progress (bool): Whether to show a progress bar
+        runs (Iterable[int]): Run indices to run, defaults to all runs, see `experiments.execution.simulation_tasks`
+
+    Yields:
+        tuple: The `(simulation, subset, run)` key and radCAD results of each task
+    """
+    tasks = list(simulation_tasks(executable, runs))
+    seed = int(np.random.randint(2**31)) if seed is None else seed
+    costs = [estimate_cost(simulation, params, key[2]) for key, simulation, params in tasks]
+    # Most expensive tasks first
+    schedule = sorted(range(len(tasks)), key=lambda index: -costs[index])
+
+    completed = {}
+    next_index = 0
+    with multiprocess.Pool(processes, initializer=_initialize_worker, initargs=(tasks,)) as pool, \
+            tqdm(total=len(tasks), disable=not progress, desc="Simulations") as progress_bar:
+        for index, results in pool.imap_unordered(_run_task, [(index, seed) for index in schedule], chunksize=1):
+            completed[index] = results
+            progress_bar.update()
+            while next_index in completed:
+                yield tasks[next_index][0], completed.pop(next_index)
+                next_index += 1
+
+
+def run_parallel(executable, processes=None, seed=None, progress=True) -> list:
+    """Run an Experiment or Simulation on a process pool, see `iter_parallel`
+
+    Returns:
+        list: The flattened results, as in radCAD `Experiment.results`
+    """
+    return [
+        state
+        for _key, results in iter_parallel(executable, processes, seed, progress)
+        for substeps in results
+        for state in substeps
+    ]
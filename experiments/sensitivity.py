@@ -0,0 +1,139 @@
+"""
+# Sensitivity Analysis
+
+Variance-based (Sobol) sensitivity indices of simulated metrics to continuous System Parameters,
+e.g. of `total_profit_yields_pct` and `monoply_51` to `inflation_sqrt_numerator` and `slashing_fraction`.
+
+The first-order index of a parameter is the fraction of the variance of a metric explained by the parameter alone,
+and the total index the fraction explained by the parameter including its interactions with the other parameters.
+Both are estimated from a Saltelli sample of `n * (d + 2)` points for `d` parameters,
+using the estimators of Saltelli et al. (2010) and Jansen (1999),
+with confidence intervals from bootstrap resamples of the `n` base points.
+"""
+
+import typing
+
+import numpy as np
+import pandas as pd
+
+from experiments.surrogate import simulation_metrics
+from experiments.sweeps import Dimension, unit_design
+
+
+def saltelli_sample(dimensions: typing.List[Dimension], n, method="sobol", seed=None) -> pd.DataFrame:
+    """A Saltelli sample of the dimensions, as a design table, see `experiments.sweeps.design_table`
+
+    The rows are the `n` base points of matrix A, the `n` points of matrix B,
+    and for each dimension `i` the `n` points of A with the values of dimension `i` from B.
+
+    Args:
+        dimensions (List[Dimension]): Swept System Parameters
+        n (int): Number of base points, preferably a power of two for Sobol designs
+        method (str): Method of the base design, see `experiments.sweeps.unit_design`
+        seed (int): Seed of the base design
+    """
+    d = len(dimensions)
+    base = unit_design(n, 2 * d, method, seed)
+    a, b = base[:, :d], base[:, d:]
+    ab = np.repeat(a[None], d, axis=0)
+    ab[np.arange(d), :, np.arange(d)] = b.T
+    unit_values = np.concatenate([a, b, ab.reshape(-1, d)])
+
+    table = pd.DataFrame(
+        {dimension.parameter: dimension.scale(unit_values[:, i]) for i, dimension in enumerate(dimensions)}
+    )
+    table.index.name = "subset"
+    return table
+
+
+def _indices(f_a, f_b, f_ab) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """First-order and total indices in [..., Dimensions, Metrics] of model outputs in [..., Points, Metrics]"""
+    variance = np.concatenate([f_a, f_b], axis=-2).var(axis=-2)[..., None, :]
+    first_order = (f_b[..., None, :, :] * (f_ab - f_a[..., None, :, :])).mean(axis=-2)
+    total = 0.5 * ((f_a[..., None, :, :] - f_ab) ** 2).mean(axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return first_order / variance, total / variance
+
+
+def sobol_indices(
+    values: pd.DataFrame,
+    parameters: typing.List[str],
+    bootstrap=1000,
+    confidence=0.95,
+    seed=None,
+) -> pd.DataFrame:
+    """Estimate first-order and total Sobol indices from the model outputs of a Saltelli sample
+
+    Args:
+        values (pd.DataFrame): Metrics of each point of the Saltelli sample, in the order of `saltelli_sample`
+        parameters (List[str]): System Parameters of the dimensions of the sample
+        bootstrap (int): Number of bootstrap resamples of the confidence intervals
+        confidence (float): Confidence level
+
+    Returns:
+        pd.DataFrame: A row per (metric, parameter), with the indices `S1` and `ST`
+        and the bounds of their confidence intervals, e.g. `S1_low` and `S1_high`
+    """
+    d = len(parameters)
+    outputs = values.to_numpy(dtype=float)
+    if len(outputs) % (d + 2):
+        raise ValueError(f"Expected a Saltelli sample of n * {d + 2} points, got {len(outputs)}")
+    n = len(outputs) // (d + 2)
+    # Centering the outputs improves the accuracy of the estimators
+    outputs = outputs - outputs[: 2 * n].mean(axis=0)
+    f_a, f_b, f_ab = outputs[:n], outputs[n: 2 * n], outputs[2 * n:].reshape(d, n, -1)
+
+    first_order, total = _indices(f_a, f_b, f_ab)
+
+    # Resample the base points, all bootstrap resamples at once
+    resamples = np.random.default_rng(seed).integers(0, n, (bootstrap, n))
+    first_order_resampled, total_resampled = _indices(f_a[resamples], f_b[resamples], f_ab[:, resamples].swapaxes(0, 1))
+    tails = [100 * (1 - confidence) / 2, 100 * (1 + confidence) / 2]
+    first_order_low, first_order_high = np.nanpercentile(first_order_resampled, tails, axis=0)
+    total_low, total_high = np.nanpercentile(total_resampled, tails, axis=0)
+
+    index = pd.MultiIndex.from_product([values.columns, parameters], names=["metric", "parameter"])
+    return pd.DataFrame(
+        {
+            "S1": first_order.T.ravel(),
+            "S1_low": first_order_low.T.ravel(),
+            "S1_high": first_order_high.T.ravel(),
+            "ST": total.T.ravel(),
+            "ST_low": total_low.T.ravel(),
+            "ST_high": total_high.T.ravel(),
+        },
+        index=index,
+    )
+
+
+def run_sensitivity_analysis(
+    simulation,
+    dimensions: typing.List[Dimension],
+    metrics,
+    n=64,
+    method="sobol",
+    bootstrap=1000,
+    confidence=0.95,
+    processes=None,
+    seed=None,
+) -> pd.DataFrame:
+    """Run a Saltelli sample of a Simulation on a process pool, and estimate the Sobol indices of the metrics
+
+    Each point of the sample is a parameter subset, and its metric is the mean at the last timestep across runs,
+    see `experiments.surrogate.simulation_metrics`.
+
+    Args:
+        simulation (radcad.Simulation): Simulation with the base System Parameters
+        dimensions (List[Dimension]): Swept System Parameters, e.g. with `constant_process` for the adoption speed
+        metrics (List[str]): Columns of the post-processed results, e.g. `total_profit_yields_pct`, `monoply_51`
+        n (int): Number of base points, for `n * (len(dimensions) + 2)` parameter subsets
+        processes (int): Number of worker processes, see `experiments.scheduler.iter_parallel`
+
+    Returns:
+        pd.DataFrame: The Sobol indices, see `sobol_indices`
+    """
+    table = saltelli_sample(dimensions, n, method, seed)
+    values = simulation_metrics(simulation, dimensions, metrics, processes=processes, seed=seed)(table)
+    return sobol_indices(
+        values, [dimension.parameter for dimension in dimensions], bootstrap, confidence, seed
+    )
@@ -0,0 +1,121 @@
+"""
+# Warm Simulator
+
+A simulator service for interactive front-ends, such as the Dash apps in `experiments/notebooks/visualizations/`.
+
+The model, Initial State and System Parameters, including the pre-generated process tables,
+are kept resident between runs, rather than deep copied per run by radCAD,
+and the post-processed results are memoized per tuple of slider values in an LRU cache.
+When only late-acting parameters change, see `experiments.execution.LATE_ACTING_PARAMETERS`,
+a run resumes from the cached intermediate state of the most similar run instead of timestep 0.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+from radcad.core import generate_parameter_sweep
+
+from experiments.execution import LATE_ACTING_PARAMETERS, divergence_timestep, run_from
+from experiments.post_processing import post_process
+
+
+class WarmSimulator:
+    """Runs a radCAD Simulation of a single parameter subset for different slider values
+
+    Args:
+        simulation (radcad.Simulation): Simulation with the model and base System Parameters
+        parameters (Callable): Function of the slider values returning the System Parameter overrides
+        late_acting (dict): Late-acting System Parameters, see `experiments.execution.LATE_ACTING_PARAMETERS`
+        maxsize (int): Number of results to cache
+        max_workers (int): Number of threads to run simulations on
+    """
+
+    def __init__(
+        self,
+        simulation,
+        parameters=lambda **sliders: sliders,
+        late_acting=LATE_ACTING_PARAMETERS,
+        maxsize=32,
+        max_workers=1,
+    ):
+        self.model = simulation.model
+        self.timesteps = simulation.timesteps
+        self.runs = simulation.runs
+        self.engine = simulation.engine
+        self.parameters = parameters
+        self.late_acting = late_acting
+        self.maxsize = maxsize
+
+        self.initial_state = copy.deepcopy(self.model.initial_state)
+        self.base_params = generate_parameter_sweep(self.model.params)[0]
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.resumed_timesteps = 0
+        """Number of timesteps resumed from cached states rather than simulated, e.g. for monitoring"""
+
+    def params(self, **sliders) -> dict:
+        """The System Parameters of the slider values"""
+        return {**self.base_params, **self.parameters(**sliders)}
+
+    def run(self, **sliders) -> pd.DataFrame:
+        """Run the simulation for the slider values, or return the cached results"""
+        key = tuple(sorted(sliders.items()))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key][1]
+            params = self.params(**sliders)
+            resume = self._resume_point(params)
+
+        results = self._simulate(params, resume)
+        df = post_process(
+            pd.DataFrame([state for run in results for timestep in run for state in timestep]),
+            parameters={key: [value] for key, value in params.items()},
+        )
+
+        with self._lock:
+            self._cache[key] = (params, df, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return df
+
+    def submit(self, **sliders) -> Future:
+        """Run the simulation for the slider values in the thread pool"""
+        return self._executor.submit(self.run, **sliders)
+
+    def _resume_point(self, params):
+        """The cached results and timestep to resume from that share the longest prefix with the parameters"""
+        best_results, best_timestep = None, 0
+        for cached_params, _df, cached_results in self._cache.values():
+            timestep = min(divergence_timestep(params, cached_params, self.late_acting), self.timesteps + 1)
+            # Resume from the last state before the first affected timestep
+            timestep = timestep - 1
+            if timestep > best_timestep:
+                best_results, best_timestep = cached_results, timestep
+        return best_results, best_timestep
+
+    def _simulate(self, params, resume):
+        cached_results, resume_timestep = resume
+        results = []
+        for run in range(self.runs):
+            if cached_results is not None:
+                prefix = cached_results[run][: resume_timestep + 1]
+                self.resumed_timesteps += resume_timestep
+            else:
+                state = {**self.initial_state, "simulation": 0, "subset": 0, "run": run + 1, "substep": 0, "timestep": 0}
+                prefix = [[state]]
+            results.append(prefix + run_from(
+                prefix[-1][-1],
+                self.model.state_update_blocks,
+                params,
+                self.timesteps,
+                deepcopy=self.engine.deepcopy,
+                drop_substeps=self.engine.drop_substeps,
+            ))
+        return results
@@ -0,0 +1,273 @@
+"""
+# Surrogate Models
+
+Cheap interpolators of simulated metrics over continuous System Parameters,
+e.g. the profit yields over POLYGN price and POLYGN staked of `plot_validator_environment_yield_surface`,
+fitted to a modest number of simulated points and queried on dense grids instead of simulating every grid point.
+
+The surrogate is a cubic radial basis function (RBF) interpolant with a linear polynomial tail,
+fitted in the unit hypercube of the swept dimensions, see `experiments.sweeps.Dimension`.
+Its error is estimated from the closed form leave-one-out (LOO) errors of the simulated points (Rippa, 1999):
+the LOO error of a point per unit distance to its nearest neighbour, interpolated with inverse distance weights,
+times the distance to the nearest simulated point.
+The estimate tracks the average error, but may underestimate the error when extrapolating to the corners of the ranges.
+`SurrogateCache` persists the surrogate to disk and simulates more points where the estimated error is too high.
+"""
+
+import copy
+import os
+import typing
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from experiments.monte_carlo import run_monte_carlo_statistics
+from experiments.sweeps import Dimension, design_parameters, design_table
+
+
+def _distances(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    return np.sqrt(((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2))
+
+
+def _polynomial(points: np.ndarray) -> np.ndarray:
+    return np.hstack([np.ones((len(points), 1)), points])
+
+
+class RBFSurrogate:
+    """A cubic RBF interpolant of metrics over the swept dimensions
+
+    Args:
+        dimensions (List[Dimension]): Swept System Parameters, whose ranges define the unit hypercube
+        table (pd.DataFrame): Simulated points, with a column per System Parameter, see `experiments.sweeps.design_table`
+        values (pd.DataFrame): Simulated metrics of the points, with a column per metric
+    """
+
+    def __init__(self, dimensions: typing.List[Dimension], table: pd.DataFrame, values: pd.DataFrame):
+        self.dimensions = dimensions
+        self.parameters = [dimension.parameter for dimension in dimensions]
+        self.metrics = list(values.columns)
+        self.table = table[self.parameters].reset_index(drop=True)
+        self.values = values.reset_index(drop=True)
+
+        centers = self._unit(self.table.to_numpy(dtype=float))
+        if len(centers) < len(dimensions) + 2:
+            raise ValueError(f"At least {len(dimensions) + 2} points are required to fit a surrogate")
+
+        n = len(centers)
+        polynomial = _polynomial(centers)
+        system = np.block([
+            [_distances(centers, centers) ** 3, polynomial],
+            [polynomial.T, np.zeros((polynomial.shape[1], polynomial.shape[1]))],
+        ])
+        inverse = np.linalg.inv(system)
+        targets = np.vstack([self.values.to_numpy(dtype=float), np.zeros((polynomial.shape[1], len(self.metrics)))])
+        coefficients = inverse @ targets
+
+        self.centers = centers
+        self.weights = coefficients[:n]
+        self.polynomial_coefficients = coefficients[n:]
+        self.loo_errors = np.abs(coefficients[:n] / np.diag(inverse)[:n, None])
+        # The LOO error of a point is the error at the distance to its nearest neighbour
+        self.spacing = (_distances(centers, centers) + np.diag(np.full(n, np.inf))).min(axis=1)
+
+    def _unit(self, points: np.ndarray) -> np.ndarray:
+        return np.column_stack([dimension.unit(points[:, i]) for i, dimension in enumerate(self.dimensions)])
+
+    def predict(self, points) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Predict the metrics at points
+
+        Args:
+            points (pd.DataFrame or np.ndarray): Points with a column per System Parameter, in the order of the dimensions
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The predicted metrics and their estimated absolute errors, in [Points, Metrics]
+        """
+        if isinstance(points, pd.DataFrame):
+            points = points[self.parameters].to_numpy(dtype=float)
+        unit_points = self._unit(np.atleast_2d(points))
+        distances = _distances(unit_points, self.centers)
+        values = distances ** 3 @ self.weights + _polynomial(unit_points) @ self.polynomial_coefficients
+
+        with np.errstate(divide="ignore"):
+            inverse_distances = 1 / distances ** 2
+        nearest = distances.min(axis=1)
+        exact = nearest == 0
+        inverse_distances[exact] = distances[exact] == 0
+        weights = inverse_distances / inverse_distances.sum(axis=1, keepdims=True)
+        errors = weights @ (self.loo_errors / self.spacing[:, None]) * nearest[:, None]
+        return values, errors
+
+    def save(self, path):
+        """Save the fitted surrogate to an `.npz` file, atomically replacing any previous one"""
+        temporary_path = f"{path}.{uuid.uuid4().hex}.tmp.npz"
+        np.savez(
+            temporary_path,
+            parameters=np.array(self.parameters),
+            metrics=np.array(self.metrics),
+            low=np.array([dimension.low for dimension in self.dimensions], dtype=float),
+            high=np.array([dimension.high for dimension in self.dimensions], dtype=float),
+            log=np.array([dimension.log for dimension in self.dimensions]),
+            table=self.table.to_numpy(dtype=float),
+            values=self.values.to_numpy(dtype=float),
+            centers=self.centers,
+            weights=self.weights,
+            polynomial_coefficients=self.polynomial_coefficients,
+            loo_errors=self.loo_errors,
+            spacing=self.spacing,
+        )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path) -> "RBFSurrogate":
+        """Load a fitted surrogate saved with `save`"""
+        with np.load(path) as data:
+            surrogate = cls.__new__(cls)
+            surrogate.parameters = data["parameters"].tolist()
+            surrogate.metrics = data["metrics"].tolist()
+            surrogate.dimensions = [
+                Dimension(parameter, low, high, log=bool(log))
+                for parameter, low, high, log in zip(surrogate.parameters, data["low"], data["high"], data["log"])
+            ]
+            surrogate.table = pd.DataFrame(data["table"], columns=surrogate.parameters)
+            surrogate.values = pd.DataFrame(data["values"], columns=surrogate.metrics)
+            surrogate.centers = data["centers"]
+            surrogate.weights = data["weights"]
+            surrogate.polynomial_coefficients = data["polynomial_coefficients"]
+            surrogate.loo_errors = data["loo_errors"]
+            surrogate.spacing = data["spacing"]
+        return surrogate
+
+
+def simulation_metrics(simulation, dimensions: typing.List[Dimension], metrics, processes=None, seed=None):
+    """A function simulating the mean of the metrics at the last timestep across runs, for each point of a design table
+
+    Args:
+        simulation (radcad.Simulation): Simulation with the base System Parameters
+        dimensions (List[Dimension]): Swept System Parameters
+        metrics (List[str]): Columns of the post-processed results, e.g. `total_profit_yields_pct`
+        processes (int): Number of worker processes, see `experiments.scheduler.iter_parallel`
+        seed (int): Seed of the random number generators of the runs
+    """
+
+    def simulate(table: pd.DataFrame) -> pd.DataFrame:
+        simulation_ = copy.deepcopy(simulation)
+        simulation_.model.params.update(design_parameters(dimensions, table))
+        statistics = run_monte_carlo_statistics(simulation_, metrics, processes=processes, seed=seed).statistics()
+        means = statistics.xs("mean", axis=1, level="statistic")
+        last = means.xs(simulation_.timesteps, level="timestep")
+        return pd.DataFrame(last[metrics].to_numpy(), index=table.index, columns=metrics)
+
+    return simulate
+
+
+class SurrogateCache:
+    """A surrogate of simulated metrics persisted to disk, refined with more simulations where its error is too high
+
+    Args:
+        path (str): `.npz` file of the surrogate, loaded if it exists
+        simulate (Callable): Function of a design table returning the metrics of each point, e.g. `simulation_metrics`
+        dimensions (List[Dimension]): Swept System Parameters
+        initial_points (int): Number of points of the initial design, if there is no saved surrogate
+        method (str): Method of the initial design, see `experiments.sweeps.unit_design`
+        seed (int): Seed of the initial design
+    """
+
+    def __init__(self, path, simulate, dimensions: typing.List[Dimension], initial_points=16, method="sobol", seed=None):
+        self.path = path
+        self.simulate = simulate
+        self.dimensions = dimensions
+        self.simulated_points = 0
+        """Number of points simulated rather than loaded, e.g. for monitoring"""
+
+        if os.path.exists(path):
+            self.surrogate = RBFSurrogate.load(path)
+            if self.surrogate.parameters != [dimension.parameter for dimension in dimensions]:
+                raise ValueError(f"Surrogate {path} was fitted over System Parameters {self.surrogate.parameters}")
+            if any(
+                (dimension.low, dimension.high, dimension.log) != (saved.low, saved.high, saved.log)
+                for dimension, saved in zip(dimensions, self.surrogate.dimensions)
+            ):
+                # Refit the simulated points in the unit hypercube of the new ranges
+                self.surrogate = RBFSurrogate(dimensions, self.surrogate.table, self.surrogate.values)
+                self.surrogate.save(path)
+        else:
+            self.surrogate = None
+            self.add(design_table(dimensions, initial_points, method, seed))
+
+    def add(self, table: pd.DataFrame):
+        """Simulate the points of a design table, and refit and save the surrogate"""
+        values = self.simulate(table)
+        self.simulated_points += len(table)
+        if self.surrogate is not None:
+            table = pd.concat([self.surrogate.table, table], ignore_index=True)
+            values = pd.concat([self.surrogate.values, values], ignore_index=True)
+        self.surrogate = RBFSurrogate(self.dimensions, table, values)
+        self.surrogate.save(self.path)
+
+    def predict(self, points) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Predict the metrics at points, see `RBFSurrogate.predict`"""
+        return self.surrogate.predict(points)
+
+    def refine(self, candidates: pd.DataFrame, tolerance, batch_size=8, max_points=256) -> bool:
+        """Simulate the candidate points with the highest estimated errors until all are within the tolerance
+
+        Each batch greedily selects the candidates with the highest estimated error,
+        discounting the errors of candidates close to those already selected, as the surrogate would after refitting.
+
+        Args:
+            candidates (pd.DataFrame): Candidate points, e.g. a dense grid
+            tolerance (float): Maximum estimated absolute error of any metric
+            batch_size (int): Points simulated per batch
+            max_points (int): Maximum number of simulated points of the surrogate
+
+        Returns:
+            bool: Whether the estimated errors of all candidates are within the tolerance
+        """
+        candidates = candidates.reset_index(drop=True)
+        while True:
+            _values, errors = self.predict(candidates)
+            errors = errors.max(axis=1)
+            points = len(self.surrogate.table)
+            if errors.max() <= tolerance:
+                return True
+            if points >= max_points:
+                return False
+
+            unit_candidates = self.surrogate._unit(candidates[self.surrogate.parameters].to_numpy(dtype=float))
+            nearest = _distances(unit_candidates, self.surrogate.centers).min(axis=1)
+            selected = []
+            for _ in range(min(batch_size, max_points - points)):
+                index = int(np.argmax(errors))
+                if errors[index] <= tolerance:
+                    break
+                selected.append(index)
+                # The estimated errors are proportional to the distance to the nearest simulated point
+                distances = np.minimum(nearest, _distances(unit_candidates, unit_candidates[[index]])[:, 0])
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    errors = np.where(nearest > 0, errors * distances / nearest, 0)
+                nearest = distances
+            self.add(candidates.iloc[selected].reset_index(drop=True))
+
+    def grid(self, num=50, tolerance=None, **kwargs) -> pd.DataFrame:
+        """Predict the metrics over a dense grid of the dimensions, e.g. for a yield surface
+
+        Args:
+            num (int): Number of grid points per dimension, log-spaced for log-scale dimensions
+            tolerance (float): If set, refine the surrogate over the grid first, see `refine`
+
+        Returns:
+            pd.DataFrame: A row per grid point, with a column per System Parameter, metric, and `<metric>_error`
+        """
+        axes = [dimension.scale(np.linspace(0, 1, num)) for dimension in self.dimensions]
+        mesh = np.meshgrid(*axes, indexing="ij")
+        df = pd.DataFrame({
+            dimension.parameter: values.ravel() for dimension, values in zip(self.dimensions, mesh)
+        })
+        if tolerance is not None:
+            self.refine(df, tolerance, **kwargs)
+        values, errors = self.predict(df)
+        for i, metric in enumerate(self.surrogate.metrics):
+            df[metric] = values[:, i]
+            df[f"{metric}_error"] = errors[:, i]
+        return df
@@ -0,0 +1,127 @@
+"""
+# Parameter Sweep Designs
+
+Space-filling designs over continuous System Parameters, as an alternative to Cartesian product sweeps,
+whose number of subsets grows multiplicatively with each swept parameter.
+
+A design of `n` points is materialized as `n` parameter subsets, one value per subset for each swept System Parameter,
+and as a table of the raw parameter values per subset, e.g. to fit surrogate models to the simulation results.
+
+Sobol designs use `scipy.stats.qmc` when installed (SciPy >= 1.7, e.g. as a dependency of `stochastic`),
+Latin hypercube and random designs only need NumPy.
+"""
+
+import typing
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.stats import qmc
+except ImportError:
+    qmc = None
+
+
+@dataclass
+class Dimension:
+    """A System Parameter swept over the range from `low` to `high`"""
+
+    parameter: str
+    low: float
+    high: float
+    log: bool = False
+    """Whether to sample uniformly on a log scale"""
+    integer: bool = False
+    """Whether to round values to integers"""
+    transform: typing.Callable[[float], typing.Any] = None
+    """Function of the value returning the System Parameter, e.g. `constant_process`"""
+
+    def scale(self, unit_values: np.ndarray) -> np.ndarray:
+        """Scale values in the unit interval to the range of the dimension"""
+        if self.log:
+            values = np.exp(np.log(self.low) + unit_values * (np.log(self.high) - np.log(self.low)))
+        else:
+            values = self.low + unit_values * (self.high - self.low)
+        return np.round(values) if self.integer else values
+
+    def unit(self, values: np.ndarray) -> np.ndarray:
+        """Scale values in the range of the dimension to the unit interval, the inverse of `scale`"""
+        values = np.asarray(values, dtype=float)
+        if self.log:
+            return (np.log(values) - np.log(self.low)) / (np.log(self.high) - np.log(self.low))
+        return (values - self.low) / (self.high - self.low)
+
+
+def constant_process(value) -> typing.Callable:
+    """A process returning the value at every run and timestep, e.g. for `polygn_price_process`"""
+    return lambda _run, _timestep: value
+
+
+def latin_hypercube(n, dimensions, rng) -> np.ndarray:
+    """A Latin hypercube design of `n` points in the unit hypercube, with one point per stratum of each dimension"""
+    strata = np.argsort(rng.random((dimensions, n)), axis=1).T
+    return (strata + rng.random((n, dimensions))) / n
+
+
+def unit_design(n, dimensions, method="sobol", seed=None) -> np.ndarray:
+    """A design of `n` points in the unit hypercube
+
+    Args:
+        n (int): Number of points, preferably a power of two for Sobol designs
+        dimensions (int): Number of dimensions
+        method (str): "sobol" for a scrambled Sobol sequence, "lhs" for a Latin hypercube, or "random"
+        seed (int): Seed of the random number generator
+
+    Returns:
+        np.ndarray: Points in [n, dimensions]
+    """
+    rng = np.random.default_rng(seed)
+    if method == "sobol":
+        if qmc is None:
+            raise ImportError("Sobol designs require scipy.stats.qmc, use method='lhs' instead")
+        sampler = qmc.Sobol(d=dimensions, scramble=True, seed=rng)
+        m = int(np.log2(n))
+        return sampler.random_base2(m) if 2 ** m == n else sampler.random(n)
+    if method == "lhs":
+        return latin_hypercube(n, dimensions, rng)
+    if method == "random":
+        return rng.random((n, dimensions))
+    raise ValueError(f"Invalid design method {method}")
+
+
+def design_table(dimensions: typing.List[Dimension], n, method="sobol", seed=None) -> pd.DataFrame:
+    """The parameter values of each point of a design, one row per subset and one column per System Parameter"""
+    unit_values = unit_design(n, len(dimensions), method, seed)
+    table = pd.DataFrame(
+        {dimension.parameter: dimension.scale(unit_values[:, i]) for i, dimension in enumerate(dimensions)}
+    )
+    table.index.name = "subset"
+    return table
+
+
+def design_parameters(dimensions: typing.List[Dimension], table: pd.DataFrame) -> typing.Dict[str, list]:
+    """The System Parameter lists of the subsets of a design table, as radCAD parameter sweeps"""
+    return {
+        dimension.parameter: [
+            dimension.transform(value) if dimension.transform else value
+            for value in table[dimension.parameter].tolist()
+        ]
+        for dimension in dimensions
+    }
+
+
+def apply_design(simulation, dimensions: typing.List[Dimension], n, method="sobol", seed=None) -> pd.DataFrame:
+    """Sweep the parameters of a Simulation over a design, with one parameter subset per point
+
+    Returns:
+        pd.DataFrame: The design table, e.g. to join with the results on the subset
+    """
+    swept = {dimension.parameter for dimension in dimensions}
+    for key, values in simulation.model.params.items():
+        if key not in swept and len(values) > 1:
+            raise ValueError(f"System Parameter {key} is already swept, and would be zipped with the design")
+
+    table = design_table(dimensions, n, method, seed)
+    simulation.model.params.update(design_parameters(dimensions, table))
+    return table
@@ -5,7 +5,7 @@
 import copy
 
 import model.constants as constants
-from model.stochastic_processes import create_stochastic_process_realizations
+from model.stochastic_processes import create_stochastic_process_realizations, share_process_realizations
 from model.types import Stage
 from experiments.default_experiment import experiment
 
@@ -20,21 +20,22 @@ TIMESTEPS = constants.epochs_per_day * SIMULATION_TIME_DAYS // DELTA_TIME
 # DELTA_TIME = 3
 # TIMESTEPS = 10
 
-# Generate stochastic process realizations
+# Generate stochastic process realizations,
+# shared between the worker processes of multi-process backends rather than copied into each
 ## Linear
-polygn_price_samples = create_stochastic_process_realizations("convex_polygn_price_samples", timesteps=TIMESTEPS, dt=DELTA_TIME)
+polygn_price_samples = share_process_realizations(create_stochastic_process_realizations("convex_polygn_price_samples", timesteps=TIMESTEPS, dt=DELTA_TIME))
 #polygn_price_samples = create_stochastic_process_realizations("stochastic_polygn_price_samples", timesteps=TIMESTEPS, dt=DELTA_TIME)
 
-adoption_rates_slow = create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=500)
-adoption_rates_med = create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=2000)
-adoption_rates_fast = create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=3500)
+adoption_rates_slow = share_process_realizations(create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=500))
+adoption_rates_med = share_process_realizations(create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=2000))
+adoption_rates_fast = share_process_realizations(create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=3500))
 
 
-adoption_rates_public_slow = create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=5)
-adoption_rates_public_med = create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=15)
-adoption_rates_public_fast = create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=25)
+adoption_rates_public_slow = share_process_realizations(create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=5))
+adoption_rates_public_med = share_process_realizations(create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=15))
+adoption_rates_public_fast = share_process_realizations(create_stochastic_process_realizations("adoption_rates", timesteps=TIMESTEPS, dt=DELTA_TIME, final_chains_num=25))
 
-hardware_cost_moores_law = create_stochastic_process_realizations("hardware_costs", timesteps=TIMESTEPS, dt=DELTA_TIME, init_hardware_cost=500)
+hardware_cost_moores_law = share_process_realizations(create_stochastic_process_realizations("hardware_costs", timesteps=TIMESTEPS, dt=DELTA_TIME, init_hardware_cost=500))
 
 
 parameter_overrides = {
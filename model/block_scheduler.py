@@ -0,0 +1,335 @@
+"""
+# State Update Block Scheduler
+
+Merges State Update Blocks without data dependencies on each other into fewer radCAD substeps,
+so that fewer substates are copied and recorded per timestep.
+
+The State Variables each block reads are found by static analysis of its Policy and State Update Functions,
+from the `previous_state["..."]` and `previous_state.get("...")` expressions in their source,
+and the State Variables it writes are the keys of its `variables`.
+A function that passes the whole state on, e.g. to the handlers of `model.parts.events`,
+or uses the state history, is assumed to read every State Variable, and to draw random numbers,
+as is a function calling functions it can't resolve, e.g. the processes and event handlers of the System Parameters.
+Each block is scheduled in the earliest substep after the blocks whose writes it reads or also writes,
+and not before the blocks that read its writes.
+Blocks drawing from the global random number generators keep their relative order,
+so that simulations with the scheduled blocks reproduce those with the original blocks.
+
+The policies of the blocks merged into a substep see the same substate, as the blocks did in separate substeps,
+and their signals are kept apart per block, as radCAD would otherwise add up signals with the same key.
+Policies that don't draw random numbers can be evaluated concurrently on a thread pool,
+as the NumPy operations of the larger Policy Functions release the GIL.
+
+```python
+from model.block_scheduler import schedule_blocks
+
+model = Model(
+    params=parameters,
+    initial_state=initial_state,
+    state_update_blocks=schedule_blocks(state_update_blocks),
+)
+```
+
+or for a single run of an Experiment, e.g. the default experiment, see `scheduled_blocks` and `experiments.run.run`.
+"""
+
+import ast
+import builtins
+import inspect
+import textwrap
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache, partial
+
+
+ENGINE_VARIABLES = {"timestep", "substep"}
+"""State Variables the radCAD engine updates after the first substep, or every substep"""
+
+
+@dataclass(frozen=True)
+class FunctionAccess:
+    """The State Variables a Policy or State Update Function reads, and whether it draws random numbers"""
+
+    reads: frozenset
+    opaque: bool = False
+    """Whether the function may read any State Variable"""
+    random: bool = False
+
+
+@dataclass(frozen=True)
+class BlockAccess:
+    """The State Variables a State Update Block reads and writes"""
+
+    reads: frozenset
+    writes: frozenset
+    opaque: bool = False
+    random: bool = False
+
+    def reads_any(self, state_variables) -> bool:
+        """Whether the block may read any of the State Variables"""
+        return self.opaque or not self.reads.isdisjoint(state_variables)
+
+
+OPAQUE = FunctionAccess(frozenset(), opaque=True, random=True)
+
+
+def _is_random(node) -> bool:
+    return isinstance(node, ast.Attribute) and (
+        node.attr == "random" or (isinstance(node.value, ast.Name) and node.value.id == "random")
+    )
+
+
+def _called_functions(tree, function) -> typing.Iterator[typing.Callable]:
+    """The functions of the model called by name, or as attributes of modules of the model"""
+    namespace = getattr(function, "__globals__", {})
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        target = None
+        if isinstance(node.func, ast.Name):
+            target = namespace.get(node.func.id)
+        elif isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+            module = namespace.get(node.func.value.id)
+            if inspect.ismodule(module):
+                target = getattr(module, node.func.attr, None)
+        if inspect.isfunction(target) and target.__module__.startswith("model"):
+            yield target
+
+
+@lru_cache(maxsize=None)
+def _source_tree(function):
+    try:
+        return ast.parse(textwrap.dedent(inspect.getsource(function)))
+    except (OSError, TypeError, SyntaxError):
+        return None
+
+
+def _calls_unresolved_functions(tree, function) -> bool:
+    """Whether the function calls functions other than those of its module namespace, builtins and nested definitions,
+    e.g. processes or event handlers taken from the System Parameters, which may draw random numbers
+    """
+    namespace = getattr(function, "__globals__", {})
+    nested = {node.name for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        if isinstance(node.func, ast.Name):
+            if node.func.id not in namespace and node.func.id not in nested and not hasattr(builtins, node.func.id):
+                return True
+        elif not isinstance(node.func, ast.Attribute):
+            # e.g. `params["process"](run, timestep)`
+            return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def _draws_random_numbers(function, _visited=frozenset()) -> bool:
+    tree = _source_tree(function)
+    if tree is None:
+        return True
+    if any(_is_random(node) for node in ast.walk(tree)) or _calls_unresolved_functions(tree, function):
+        return True
+    return any(
+        _draws_random_numbers(called, _visited | {function})
+        for called in _called_functions(tree, function)
+        if called not in _visited and called is not function
+    )
+
+
+def function_access(function) -> FunctionAccess:
+    """Find the State Variables a Policy or State Update Function reads by static analysis of its source
+
+    Arguments bound using `functools.partial`, e.g. by `model.utils.update_from_signal`,
+    resolve State Variable keys passed as arguments.
+    """
+    bound = {}
+    if isinstance(function, partial):
+        parameters = list(inspect.signature(inspect.unwrap(function.func)).parameters)
+        bound = {**dict(zip(parameters, function.args)), **function.keywords}
+        function = function.func
+    function = inspect.unwrap(function)
+    tree = _source_tree(function)
+    if tree is None:
+        return OPAQUE
+
+    parameters = [parameter for parameter in inspect.signature(function).parameters if parameter not in bound]
+    if len(parameters) < 4:
+        return OPAQUE
+    state_history, state = parameters[2], parameters[3]
+
+    def key(node):
+        """The State Variable key of a subscript or `get` argument, or None if it can't be resolved"""
+        if isinstance(node, ast.Index):
+            node = node.value
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.Name) and isinstance(bound.get(node.id), str):
+            return bound[node.id]
+        return None
+
+    reads = set()
+    resolved = set()
+    opaque = False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id == state:
+            resolved.add(id(node.value))
+            opaque |= key(node.slice) is None
+            reads.add(key(node.slice))
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "get"
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == state
+        ):
+            resolved.add(id(node.func.value))
+            opaque |= not node.args or key(node.args[0]) is None
+            reads.add(key(node.args[0]) if node.args else None)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in (state, state_history) and id(node) not in resolved:
+            # The state is passed on or iterated, or the state history is used
+            opaque = True
+
+    # An opaque function may pass the state to functions drawing random numbers, e.g. event handlers
+    return FunctionAccess(frozenset(reads - {None}), opaque, opaque or _draws_random_numbers(function))
+
+
+def block_access(block) -> BlockAccess:
+    """The State Variables a State Update Block reads and writes"""
+    accesses = [function_access(policy) for policy in block["policies"].values()] + [
+        function_access(function) for function in block["variables"].values()
+    ]
+    return BlockAccess(
+        reads=frozenset().union(*(access.reads for access in accesses)),
+        writes=frozenset(block["variables"]),
+        opaque=any(access.opaque for access in accesses),
+        random=any(access.random for access in accesses),
+    )
+
+
+def block_substeps(state_update_blocks) -> typing.List[int]:
+    """The earliest substep of each State Update Block, respecting the data dependencies between blocks"""
+    accesses = [block_access(block) for block in state_update_blocks]
+    substeps = []
+    for j, access in enumerate(accesses):
+        # The engine writes the timestep and substep after each substep
+        writes = access.writes | ENGINE_VARIABLES
+        substep = 0
+        for i in range(j):
+            earlier = accesses[i]
+            earlier_writes = earlier.writes | (ENGINE_VARIABLES if i == 0 else {"substep"})
+            if access.reads_any(earlier_writes) or not access.writes.isdisjoint(earlier.writes):
+                # Reads the writes of the earlier block, or writes the same State Variables
+                substep = max(substep, substeps[i] + 1)
+            elif earlier.reads_any(writes - ENGINE_VARIABLES) or (earlier.random and access.random):
+                # Must not run before the earlier block
+                substep = max(substep, substeps[i])
+        substeps.append(substep)
+    return substeps
+
+
+_executors = {}
+
+
+def _executor(max_workers) -> ThreadPoolExecutor:
+    # Created per process, as the merged blocks are sent to worker processes
+    if max_workers not in _executors:
+        _executors[max_workers] = ThreadPoolExecutor(max_workers=max_workers)
+    return _executors[max_workers]
+
+
+def _add_signals(results) -> dict:
+    """Add up the signals of the policies of a block by key, as radCAD does for the policies of a substep"""
+    signals = {}
+    for result in results:
+        for key, value in result.items():
+            signals[key] = value if signals.get(key) is None else signals[key] + value
+    return signals
+
+
+def _block_signals(policies, params, substep, state_history, previous_state):
+    return _add_signals(policy(params, substep, state_history, previous_state) for policy in policies)
+
+
+def _merged_policy(blocks, concurrent, max_workers, params, substep, state_history, previous_state):
+    """Evaluate the policies of each merged block, returning their signals per block"""
+    evaluate = partial(_block_signals, params=params, substep=substep, state_history=state_history, previous_state=previous_state)
+    futures = {
+        index: _executor(max_workers).submit(evaluate, policies)
+        for index, policies, random in blocks
+        if concurrent and not random
+    }
+    # Blocks drawing random numbers are evaluated in order, on this thread
+    signals = {index: evaluate(policies) for index, policies, _random in blocks if index not in futures}
+    signals.update({index: future.result() for index, future in futures.items()})
+    return {"signals": signals}
+
+
+def _merged_update(index, function, params, substep, state_history, previous_state, policy_input):
+    return function(params, substep, state_history, previous_state, policy_input["signals"][index])
+
+
+def merge_blocks(state_update_blocks, concurrent=False, max_workers=None) -> dict:
+    """Merge State Update Blocks into a single block, evaluating their policies on the same substate"""
+    if len(state_update_blocks) == 1:
+        return state_update_blocks[0]
+    blocks = [
+        (index, list(block["policies"].values()), block_access(block).random)
+        for index, block in enumerate(state_update_blocks)
+    ]
+    return {
+        "description": "\n".join(block.get("description", "").strip() for block in state_update_blocks),
+        "policies": {"merged": partial(_merged_policy, blocks, concurrent, max_workers)},
+        "variables": {
+            state_variable: partial(_merged_update, index, function)
+            for index, block in enumerate(state_update_blocks)
+            for state_variable, function in block["variables"].items()
+        },
+    }
+
+
+def schedule_blocks(state_update_blocks, concurrent=False, max_workers=None) -> list:
+    """Merge independent State Update Blocks into fewer substeps, see `block_substeps`
+
+    Args:
+        state_update_blocks (list): State Update Blocks, e.g. `model.state_update_blocks.state_update_blocks`
+        concurrent (bool): Whether to evaluate the policies of merged blocks that don't draw random numbers concurrently
+        max_workers (int): Number of threads to evaluate policies on
+
+    Returns:
+        list: The scheduled State Update Blocks, one per substep
+    """
+    substeps = block_substeps(state_update_blocks)
+    return [
+        merge_blocks(
+            [block for block, block_substep in zip(state_update_blocks, substeps) if block_substep == substep],
+            concurrent,
+            max_workers,
+        )
+        for substep in range(max(substeps, default=-1) + 1)
+    ]
+
+
+@contextmanager
+def scheduled_blocks(executable, concurrent=False, max_workers=None):
+    """Run an Experiment or Simulation with the State Update Blocks of its models scheduled, see `schedule_blocks`,
+    restoring the original State Update Blocks afterwards
+
+    ```python
+    with scheduled_blocks(experiment):
+        experiment.run()
+    ```
+    """
+    simulations = getattr(executable, "simulations", [executable])
+    models = {id(simulation.model): simulation.model for simulation in simulations}
+    original_blocks = {key: model.state_update_blocks for key, model in models.items()}
+    try:
+        for key, model in models.items():
+            model.state_update_blocks = schedule_blocks(original_blocks[key], concurrent, max_workers)
+        yield executable
+    finally:
+        for key, model in models.items():
+            model.state_update_blocks = original_blocks[key]
@@ -11,6 +11,7 @@ epochs_per_month = 6750
 epochs_per_year = 82180
 pow_blocks_per_epoch = 32.0 * 12 / 13
 eth_deposited_per_validator = 32
+validator_liveness = 0.95  # probability of a validator being online at each epoch
 
 PoS_checkpoint_gas_cost = 210000
 
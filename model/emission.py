@@ -0,0 +1,193 @@
+"""
+# Emission Model
+
+Validator and treasury emission curves, evaluated for a whole grid of annual inflation rates and horizons
+as a single NumPy broadcast, independently of the cadCAD model.
+
+Each curve holds its annual inflation rate constant for `constant_years` calendar years,
+then decreases quadratically to zero over `decay_years` years (never, for an infinite `decay_years`).
+Results are cached per parameter tuple, so that interactive exploration of the emission model,
+e.g. in `experiments/notebooks/visualizations/`, only evaluates each grid once.
+The locked and unlocked treasury balances of each curve are evaluated for many unlock schedules at once,
+see `treasury_unlock_df`.
+"""
+
+import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import model.constants as constants
+from model.parts.treasury import treasury_unlocks, unlock_schedule
+
+
+EMISSION_OPTIONS = {
+    "option_1": np.inf,
+    "option_2": 7,
+    "option_3": 3,
+}
+"""Decay years of the emission model options of the economics notebook"""
+
+
+def emission_rates(rates, constant_years, decay_years, years_elapsed, months_into_year):
+    """The annual emission rate of each curve of the grid at each month
+
+    All arguments are broadcast against each other, e.g. rates in [Rates, 1, 1, 1],
+    constant years in [1, Horizons, 1, 1], decay years in [1, 1, Decays, 1]
+    and the calendar years elapsed and month of the year in [Months].
+
+    Args:
+        rates (np.ndarray): Annual inflation rates
+        constant_years (np.ndarray): Calendar years the rate is held constant for
+        decay_years (np.ndarray): Years the rate decreases quadratically to zero over
+        years_elapsed (np.ndarray): Calendar years since the start year
+        months_into_year (np.ndarray): Months since the start of the calendar year, from 0 to 11
+
+    Returns:
+        np.ndarray: Annual emission rates
+    """
+    years_into_decay = (years_elapsed - constant_years) + months_into_year / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        decay = np.maximum(1 - (years_into_decay / decay_years) ** 2, 0)
+    return np.where(years_elapsed < constant_years, rates, rates * decay)
+
+
+def emission_timestamps(date_start, years=15) -> pd.DatetimeIndex:
+    """The month-end timestamps of the emission curves, starting at `date_start`"""
+    date_end = date_start.replace(year=date_start.year + years)
+    return pd.date_range(start=date_start, end=date_end, freq="M")
+
+
+@lru_cache(maxsize=128)
+def _emission_grid(
+    validator_rates, treasury_rates, constant_years, decay_years, date_start, years, initial_supply
+) -> pd.DataFrame:
+    timestamps = emission_timestamps(date_start, years)
+    years_elapsed = (timestamps.year - date_start.year).to_numpy()
+    months_into_year = (timestamps.month - 1).to_numpy()
+
+    # Grid axes: [Validator Rates, Treasury Rates, Horizons, Decays, Months]
+    grid_shape = (len(validator_rates), len(treasury_rates), len(constant_years), len(decay_years), len(timestamps))
+    constant_years_axis = np.array(constant_years, dtype=float)[None, None, :, None, None]
+    decay_years_axis = np.array(decay_years, dtype=float)[None, None, None, :, None]
+
+    validator_emission = np.broadcast_to(
+        emission_rates(
+            np.array(validator_rates, dtype=float)[:, None, None, None, None],
+            constant_years_axis,
+            decay_years_axis,
+            years_elapsed,
+            months_into_year,
+        ),
+        grid_shape,
+    )
+    treasury_emission = np.broadcast_to(
+        emission_rates(
+            np.array(treasury_rates, dtype=float)[None, :, None, None, None],
+            constant_years_axis,
+            decay_years_axis,
+            years_elapsed,
+            months_into_year,
+        ),
+        grid_shape,
+    )
+    # Monthly compounding of the annual emission rates
+    polygn_supply = initial_supply * np.cumprod(1 + (validator_emission + treasury_emission) / 12, axis=-1)
+
+    index = pd.MultiIndex.from_product(
+        [validator_rates, treasury_rates, constant_years, decay_years, timestamps],
+        names=["validator_rate", "treasury_rate", "constant_years", "decay_years", "timestamp"],
+    )
+    return pd.DataFrame(
+        {
+            "validator_emission": validator_emission.ravel(),
+            "treasury_emission": treasury_emission.ravel(),
+            "polygn_supply": polygn_supply.ravel(),
+        },
+        index=index,
+    ).reset_index()
+
+
+def emission_df(
+    validator_rates=(0.01,),
+    treasury_rates=(0.01,),
+    constant_years=(10,),
+    decay_years=tuple(EMISSION_OPTIONS.values()),
+    date_start=None,
+    years=15,
+    initial_supply=10e9,
+) -> pd.DataFrame:
+    """Evaluate the validator and treasury emission curves of every combination of the parameters
+
+    Args:
+        validator_rates (Sequence[float]): Annual validator inflation rates
+        treasury_rates (Sequence[float]): Annual treasury inflation rates
+        constant_years (Sequence[int]): Calendar years the rates are held constant for
+        decay_years (Sequence[float]): Years the rates decrease quadratically to zero over
+        date_start (datetime.date): Start date of the curves, defaults to today
+        years (int): Duration of the curves in years
+        initial_supply (float): POLYGN supply at the start date
+
+    Returns:
+        pd.DataFrame: A tidy frame with one row per combination of the parameters and month-end timestamp
+    """
+    date_start = date_start or datetime.date.today()
+    return _emission_grid(
+        tuple(validator_rates),
+        tuple(treasury_rates),
+        tuple(constant_years),
+        tuple(decay_years),
+        date_start,
+        years,
+        initial_supply,
+    ).copy()
+
+
+def treasury_unlock_df(unlock_processes=(lambda _run, _epoch: 0.01,), initial_balance=0.0, **kwargs) -> pd.DataFrame:
+    """Evaluate the locked and unlocked treasury balances of every emission curve and unlock schedule
+
+    The treasury emission of each month is added to the locked treasury balance,
+    of which the monthly unlock fraction of the schedule is unlocked, as in `policy_domain_treasury_balance`,
+    evaluated for all curves and schedules at once, see `model.parts.treasury.treasury_unlocks`.
+
+    Args:
+        unlock_processes (Sequence[Callable]): Unlock schedules, as processes returning the monthly unlock fraction
+            at each epoch, e.g. variants of the `domain_treasury_monthly_unlock_process` System Parameter
+        initial_balance (float): Locked treasury balance at the start date
+        **kwargs: Parameters of the emission curves, see `emission_df`
+
+    Returns:
+        pd.DataFrame: The `emission_df` frame, with one row per combination of the parameters, unlock schedule
+        and month-end timestamp, and the `treasury_inflow`, `treasury_balance_locked`
+        and `treasury_balance_unlocked` columns, in POLYGN
+    """
+    emission = emission_df(**kwargs)
+    months = emission["timestamp"].nunique()
+    curves = len(emission) // months
+
+    # The treasury emission is minted from the supply at the start of each month
+    polygn_supply = emission["polygn_supply"].to_numpy()
+    treasury_emission = emission["treasury_emission"].to_numpy()
+    previous_supply = polygn_supply / (1 + (emission["validator_emission"].to_numpy() + treasury_emission) / 12)
+    inflows = (previous_supply * treasury_emission / 12).reshape(curves, 1, months)
+
+    # One timestep per month, so that the monthly unlock fraction is unlocked each timestep
+    schedules = np.stack([
+        unlock_schedule(process, 0, constants.epochs_per_month, months) for process in unlock_processes
+    ])
+    shape = (curves, len(schedules), months)
+    locked, unlocked = treasury_unlocks(
+        initial_balance,
+        np.broadcast_to(inflows, shape).reshape(-1, months),
+        np.broadcast_to(schedules[None], shape).reshape(-1, months),
+    )
+
+    rows = np.broadcast_to(np.arange(len(emission)).reshape(curves, 1, months), shape).ravel()
+    df = emission.iloc[rows].reset_index(drop=True)
+    schedule_index = np.broadcast_to(np.arange(len(schedules))[None, :, None], shape).ravel()
+    df.insert(df.columns.get_loc("timestamp"), "unlock_schedule", schedule_index)
+    df["treasury_inflow"] = np.broadcast_to(inflows, shape).ravel()
+    df["treasury_balance_locked"] = locked.ravel()
+    df["treasury_balance_unlocked"] = unlocked.ravel()
+    return df
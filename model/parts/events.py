@@ -1,66 +1,172 @@
 """
 # Events
 
+Discrete events, such as slashing on a large service, run by the scheduled-event engine.
+
+Each `ScheduledEvent` is registered using the `scheduled_events` System Parameter with a trigger:
+a date, a timestep, a predicate of the state, or a combination of these.
+`policy_scheduled_events` runs only the handlers of the events that are due,
+so a timestep at which no event fires only evaluates the triggers and leaves the state unchanged.
+All events share a single State Update Block, updating the `SCHEDULED_EVENT_VARIABLES`.
 """
 
 import typing
+from dataclasses import dataclass, field
+from datetime import datetime
 
 import model.constants as constants
 import numpy as np
-from model.types import Stage
-from datetime import datetime
+from model.types import Stage, Callable, Timestep
+from model.parts.utils import staking_matrix
+from model.parts.utils.precision import as_state_dtype
+from model.simulation_calendar import simulation_calendar
 import random
 
+
+SCHEDULED_EVENT_VARIABLES = [
+    "stage",
+    "staking_metrics",
+    "polygn_staked_per_validator",
+    "polygn_staked",
+    "validator_group_by_event",
+    "unassigned_rewards_ratio",
+]
+"""State Variables that scheduled events can update"""
+
+
+@dataclass
+class ScheduledEvent:
+    """A discrete event, whose handler is run at the timesteps its trigger is due
+
+    When multiple triggers are set, the event is due when all of them are.
+    """
+
+    handler: Callable
+    """A Policy Function returning the updated `SCHEDULED_EVENT_VARIABLES`"""
+    date: typing.Union[datetime, str] = None
+    """
+    Trigger at the first timestep after the date, or after the date of the System Parameter with this key,
+    e.g. "date_slashing".
+    """
+    timestep: Timestep = None
+    """Trigger at the timestep"""
+    predicate: Callable[[dict, dict], bool] = None
+    """Trigger at every timestep at which `predicate(params, previous_state)` is true"""
+    pulse: typing.Dict[str, any] = field(default_factory=dict)
+    """State Variables only set at the timestep the event fires, and reset to these values at the next timestep"""
+
+    def is_due(self, params, timestep, previous_state) -> bool:
+        """Whether the event fires at the timestep, i.e. its date, timestep and predicate triggers, if set, are all met"""
+        if self.date is not None:
+            date = params[self.date] if isinstance(self.date, str) else self.date
+            calendar = simulation_calendar(params["date_start"], params["dt"])
+            # The timestamp is that of the previous timestep, see hub.policy_upgrade_stages
+            if timestep - 1 != calendar.first_timestep_after(date):
+                return False
+        if self.timestep is not None and timestep != self.timestep:
+            return False
+        if self.predicate is not None and not self.predicate(params, previous_state):
+            return False
+        return True
+
+
+def policy_scheduled_events(
+    params, substep, state_history, previous_state
+) -> typing.Dict[str, any]:
+    """
+    ## Scheduled Events Policy
+
+    Run the handlers of the scheduled events that are due, in order of registration.
+    Each handler receives the state updated by the events before it,
+    and only the State Variables updated by the handlers are returned.
+    """
+    # Parameters
+    scheduled_events = params["scheduled_events"]
+
+    # State Variables
+    timestep = previous_state["timestep"]
+
+    signals = {}
+    state = previous_state
+
+    # Reset the pulse State Variables of events that fired at the previous timestep
+    for event in scheduled_events:
+        for key, value in event.pulse.items():
+            if previous_state[key] != value:
+                signals[key] = value
+
+    for event in scheduled_events:
+        if not event.is_due(params, timestep, state):
+            continue
+        outputs = event.handler(params, substep, state_history, state)
+        unknown_variables = set(outputs) - set(SCHEDULED_EVENT_VARIABLES)
+        if unknown_variables:
+            raise ValueError(f"Scheduled event can't update State Variables {unknown_variables}")
+        signals.update(outputs)
+        state = {**state, **outputs}
+
+    return signals
+
+
 def event_slashing_on_large_service(
     params, substep, state_history, previous_state
 ) -> typing.Dict[str, any]:
+    """
+    ## Slashing on Large Service Event
+
+    An attack happens on a large service, and all validators staking on it are slashed.
+    Scheduled at the `date_slashing` System Parameter, see `slashing_on_large_service`.
+    """
     # Parameters
-    dt = params["dt"]
-    date_slashing = params["date_slashing"]
     slashing_fraction = params["slashing_fraction"]
     # State Variables
     current_stage = previous_state["stage"]
-    timestamp = previous_state["timestamp"]
     staking_metrics = previous_state["staking_metrics"]
     polygn_staked_per_validator = previous_state["polygn_staked_per_validator"]
 
+    # Stage finite-state machine
+    # If Stage ALL selected, transition through all stages
+    # at different timestamps
+    if current_stage != Stage.ALL.value:
+        return {}
+
+    current_stage = Stage.SLASHING_on_LARGE_SERVICE
+
     # mark the validators who got slashed
     slashed_chain_id = random.choice([0,1,2])
     #slashed_chain_id = 2 # The slashed chain has 70% validators
-    validator_group_by_event = np.where(staking_metrics[slashed_chain_id]!=0, 1, 0)
-    unassigned_rewards_ratio = 0
+    validator_group_by_event = np.where(staking_matrix.chain(staking_metrics, slashed_chain_id)!=0, 1, 0)
 
-    # Stage finite-state machine
-    if current_stage == Stage.ALL.value:
-        # If Stage ALL selected, transition through all stages
-        # at different timestamps
-        
-        if (
-            timestamp > date_slashing
-        ):
-            current_stage = Stage.SLASHING_on_LARGE_SERVICE
-            # On this moment, attack happens and large service (Public Chain 0) slashing initiated
-            staking_metrics = staking_metrics.astype(float)
-            
-            slashing_amount = staking_metrics[slashed_chain_id] * slashing_fraction
-            unassigned_rewards_ratio = np.sum(slashing_amount)/np.sum(staking_metrics)     
-            staking_metrics[slashed_chain_id] = staking_metrics[slashed_chain_id] - slashing_amount
-            # Iterate over each chain (row in original_stakes)
-            for i in range(staking_metrics.shape[1]):
-                # Iterate over each node (column in original_stakes)
-                # Calculate the remaining stake after slashing
-                polygn_staked_per_validator[i] = max(polygn_staked_per_validator[i] - slashing_amount[i],0)
-                for j in range(staking_metrics.shape[0]):            
-                    # If the total stake of a node is smaller than the original stake of the node on a specific chain
-                    staking_metrics[j, i] = min(staking_metrics[j, i], polygn_staked_per_validator[i])
-
-              
+    # On this moment, attack happens and large service (Public Chain 0) slashing initiated
+    staking_metrics = staking_metrics.astype(float)
+    polygn_staked_per_validator = polygn_staked_per_validator.copy()
+
+    slashing_amount = staking_matrix.chain(staking_metrics, slashed_chain_id) * slashing_fraction
+    unassigned_rewards_ratio = np.sum(slashing_amount)/staking_matrix.total(staking_metrics)
+    # Deduct the slashing from the slashed chain and each node's total stake,
+    # and cap the node's stake on every chain, see model.parts.utils.staking_matrix
+    staking_matrix.slash_chain(
+        staking_metrics, slashed_chain_id, slashing_amount, polygn_staked_per_validator
+    )
 
     return {
         "stage": current_stage,
-        "staking_metrics": staking_metrics,
+        "staking_metrics": as_state_dtype(
+            "staking_metrics",
+            staking_matrix.as_staking_matrix(staking_metrics, params["sparse_staking_metrics"]),
+            params["state_precision"],
+        ),
         "polygn_staked_per_validator": polygn_staked_per_validator,
         "polygn_staked": polygn_staked_per_validator.sum(),
         "validator_group_by_event": validator_group_by_event,
         "unassigned_rewards_ratio": unassigned_rewards_ratio,
-    }
\ No newline at end of file
+    }
+
+
+slashing_on_large_service = ScheduledEvent(
+    handler=event_slashing_on_large_service,
+    date="date_slashing",
+    # The slashed rewards are only unassigned at the timestep of the slashing
+    pulse={"unassigned_rewards_ratio": 0.0},
+)
+"""The slashing on a large service at the `date_slashing` System Parameter"""
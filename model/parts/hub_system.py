@@ -11,6 +11,8 @@ import numpy as np
 
 from model import constants as constants
 from model.types import ETH, USD_per_POLYGN, Gwei, Stage
+from model.parts.utils import staking_matrix
+from model.simulation_calendar import simulation_calendar
 
 
 
@@ -34,10 +36,8 @@ def policy_upgrade_stages(params, substep, state_history, previous_state):
     current_stage = previous_state["stage"]
     timestep = previous_state["timestep"]
 
-    # Calculate current timestamp from timestep
-    timestamp = date_start + datetime.timedelta(
-        days=(timestep * dt / constants.epochs_per_day)
-    )
+    # Look up current timestamp of timestep in the precomputed calendar
+    timestamp = simulation_calendar(date_start, dt).timestamp(timestep)
 
     # Initialize stage State Variable at start of simulation
     if current_stage is None:
@@ -270,12 +270,25 @@ def policy_eip1559_transaction_pricing(
     }
 
 # Added
+def inflation_rate(polygn_staked, inflation_sqrt_numerator):
+    """The annual inflation rate `inflation_sqrt_numerator / sqrt(polygn_staked)` in Gwei per POLYGN"""
+    return inflation_sqrt_numerator / (polygn_staked**0.5) * constants.gwei
+
+
 def policy_inflation(params, substep, state_history, previous_state) -> typing.Dict[str, ETH]:
     """
     ## Inflation Policy
 
     Inflation is allocated to validators post Proof-of-Stake,
     using the `inflationary_rate_per_year` System Parameter.
+
+    When the `polygn_staked_process` drives the model, the inflation rate is that of the process at the timestep,
+    see `inflation_rate`. Until an event assigns validators to the deviating group, e.g. a slashing,
+    all online stake is normal stake and only the total is reduced over the staking matrix;
+    with the `expected_liveness_inflation` System Parameter enabled, not even that,
+    as the total is then the expected online stake of the i.i.d. liveness draws.
+    After such an event, the total, normal and deviate online stakes are reduced in a single pass,
+    see `staking_matrix.weighted_group_totals`.
     """
     
     # Parameters
@@ -283,6 +296,7 @@ def policy_inflation(params, substep, state_history, previous_state) -> typing.D
     inflationary_rate_per_year = params["inflationary_rate_per_year"]
     inflation_sqrt_numerator = params["inflation_sqrt_numerator"]
     polygn_staked_process = params["polygn_staked_process"]
+    expected_liveness_inflation = params["expected_liveness_inflation"]
     
     # State Variables
     run = previous_state["run"]
@@ -297,11 +311,9 @@ def policy_inflation(params, substep, state_history, previous_state) -> typing.D
     
 
     if inflation_sqrt_numerator != 0 and polygn_staked_process(0, 0) is not None:
-        polygn_staked = polygn_staked_process(run, timestep * dt)
-        inflationary_rate_per_year = (
-            inflation_sqrt_numerator
-            / (polygn_staked**0.5)
-            * constants.gwei
+        # Only evaluate the process at this timestep, as it may not extend beyond the simulated timesteps
+        inflationary_rate_per_year = inflation_rate(
+            polygn_staked_process(run, timestep * dt), inflation_sqrt_numerator
         )
     
     
@@ -319,24 +331,31 @@ def policy_inflation(params, substep, state_history, previous_state) -> typing.D
 
 
     # Only active and unslashed validators can claim
-    total_staking = staking_metrics.sum()
-    total_staking_normal = (
-        np.multiply(staking_metrics, 1-validator_group_by_event)
-    )
-    total_staking_deviate = (
-        np.multiply(staking_metrics,  validator_group_by_event)
-    )
+    total_staking = staking_matrix.total(staking_metrics)
+    if not np.any(validator_group_by_event):
+        # No event has split the validators, so the normal group is all validators, and the deviate group empty
+        if expected_liveness_inflation:
+            online_staking = constants.validator_liveness * total_staking
+        else:
+            online_staking = staking_matrix.weighted_total(staking_metrics, liveness_metrics)
+        online_staking_normal = online_staking
+        online_staking_deviate = 0.0
+    else:
+        online_staking, online_staking_normal, online_staking_deviate = staking_matrix.weighted_group_totals(
+            staking_metrics, liveness_metrics, validator_group_by_event
+        )
+
     total_inflation_to_validators = (
         total_inflation_to_validators
-        * ((liveness_metrics*staking_metrics).sum()/ total_staking)
+        * (online_staking / total_staking)
     )
     total_inflation_to_validators_normal = (
         total_inflation_to_validators
-        * ((liveness_metrics*total_staking_normal).sum()/ total_staking)
+        * (online_staking_normal / total_staking)
     )
     total_inflation_to_validators_deviate = (
         total_inflation_to_validators
-        * ((liveness_metrics*total_staking_deviate).sum()/ total_staking)
+        * (online_staking_deviate / total_staking)
     )
 
     
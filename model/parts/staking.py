@@ -8,6 +8,10 @@ import typing
 import model.constants as constants
 import numpy as np
 
+from model.parts.utils import staking_matrix
+from model.parts.utils.precision import as_state_dtype
+from model.utils import writes
+
 def policy_signature_check(
     params, substep, state_history, previous_state
 ) -> typing.Dict[str, any]:
@@ -17,6 +21,7 @@ def policy_signature_check(
     # Parameters
     dt = params["dt"]
     staking_mode = params["staking_mode"]
+    state_precision = params["state_precision"]
 
     # State Variables
     # run = previous_state["run"]
@@ -30,13 +35,14 @@ def policy_signature_check(
     # random generate liveness
     liveness_metrics = np.reshape(liveness_metrics, (-1,number_of_validators * CHAINS_CNT))
     # liveness_metrics = (liveness_metrics + np.random.binomial(dt, 0.95, number_of_validators * CHAINS_CNT)/dt)/2
-    liveness_metrics = np.random.binomial(dt, 0.95, number_of_validators * CHAINS_CNT)/dt
+    liveness_metrics = np.random.binomial(dt, constants.validator_liveness, number_of_validators * CHAINS_CNT)/dt
     liveness_metrics = np.reshape(liveness_metrics, (CHAINS_CNT, number_of_validators))
 
     return {
-        "liveness_metrics": liveness_metrics,
+        "liveness_metrics": as_state_dtype("liveness_metrics", liveness_metrics, state_precision),
     }
 
+@writes("polygn_staked_per_validator")
 def policy_staking_multistaking_sampling(
     params, substep, state_history, previous_state
 ) -> typing.Dict[str, any]:
@@ -57,7 +63,15 @@ def policy_staking_multistaking_sampling(
         polygn_staked_per_validator *= polygn_staked
 
     
-    if staking_mode == "MultiStaking":
+    if staking_mode == "MultiStaking" and staking_matrix.is_sparse(staking_metrics):
+        # Samples from the same distribution as the dense sampling, without densifying the matrix
+        staking_metrics = staking_matrix.sample_stakes(
+            staking_metrics[:, :number_of_active_validators],
+            1_000_000,
+            polygn_staked_per_validator[:number_of_active_validators],
+            180000,
+        )
+    elif staking_mode == "MultiStaking":
         staking_metrics = [[ np.random.normal(i,scale=1_000_000) for i in chain]  for chain in staking_metrics]
         cutoff = lambda s,m: min(max(0,s),m)
         staking_metrics = np.array([
@@ -67,8 +81,12 @@ def policy_staking_multistaking_sampling(
             ] for chain in staking_metrics      
         ])
     
-    staking_metrics = np.where(staking_metrics<180000,0,staking_metrics)
+    staking_metrics = staking_matrix.apply_minimum_stake(staking_metrics, 180000)
 
     return {
-        "staking_metrics": staking_metrics,
+        "staking_metrics": as_state_dtype(
+            "staking_metrics",
+            staking_matrix.as_staking_matrix(staking_metrics, params["sparse_staking_metrics"]),
+            params["state_precision"],
+        ),
     }
\ No newline at end of file
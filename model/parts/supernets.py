@@ -11,7 +11,11 @@ import model.constants as constants
 import numpy as np
 
 from model.stochastic_processes import create_intial_state_risk_service_validator
+from model.parts.utils import staking_matrix
+from model.parts.utils.precision import as_state_dtype
+from model.utils import writes
 
+@writes("polygn_staked_per_validator")
 def policy_new_supernet_staking(
     params, substep, state_history, previous_state
 ) -> typing.Dict[str, any]:
@@ -21,6 +25,7 @@ def policy_new_supernet_staking(
     Adoption_speed_process = params["Adoption_speed_process"]
     Adoption_speed_public_process = params["Adoption_speed_public_process"]
     polygn_staked_process = params["polygn_staked_process"]
+    state_precision = params["state_precision"]
 
     # State Variables
     run = previous_state["run"]
@@ -69,7 +74,7 @@ def policy_new_supernet_staking(
                 np.repeat([list(polygn_staked_per_validator)], total_Adoption_speed, axis=0) 
                 * new_stake_risk_matrix_restaking
         )
-        staking_metrics = np.concatenate((staking_metrics, new_staking_metrics), axis=0)
+        staking_metrics = staking_matrix.append_chains(staking_metrics, new_staking_metrics)
     elif staking_mode == "SingleStaking":
         share_by_new_validator_in_SingleStaking = np.reshape(
             np.random.poisson(5, total_Adoption_speed*number_of_active_validators),
@@ -87,15 +92,21 @@ def policy_new_supernet_staking(
     PRIVATE_CHAINS_CNT = PRIVATE_CHAINS_CNT + Adoption_speed
     PUBLIC_CHAINS_CNT = PUBLIC_CHAINS_CNT + Adoption_speed_public
 
-    staking_metrics = np.where(staking_metrics<180000,0,staking_metrics)
+    staking_metrics = staking_matrix.apply_minimum_stake(staking_metrics, 180000)
 
     return {
         "chain_specific_checkpoint_submission_cadence": chain_specific_checkpoint_submission_cadence,
-        "liveness_metrics": liveness_metrics,
-        "staking_metrics":  staking_metrics,
+        "liveness_metrics": as_state_dtype("liveness_metrics", liveness_metrics, state_precision),
+        "staking_metrics":  as_state_dtype(
+            "staking_metrics",
+            staking_matrix.as_staking_matrix(staking_metrics, params["sparse_staking_metrics"]),
+            state_precision,
+        ),
         "PRIVATE_CHAINS_CNT": PRIVATE_CHAINS_CNT,
         "PUBLIC_CHAINS_CNT": PUBLIC_CHAINS_CNT,
-        "share_by_validator_in_SingleStaking": share_by_validator_in_SingleStaking,
+        "share_by_validator_in_SingleStaking": as_state_dtype(
+            "share_by_validator_in_SingleStaking", share_by_validator_in_SingleStaking, state_precision
+        ),
     }
 
     
\ No newline at end of file
@@ -9,6 +9,7 @@ import numpy as np
 
 import model.constants as constants
 from model.types import Percentage, Gwei
+from model.parts.utils import staking_matrix
 
 
 
@@ -52,7 +53,7 @@ def policy_validator_costs(
 
     # Calculate hardware, cloud, and third-party costs per validator type
     validator_count_distribution = (
-        np.count_nonzero(staking_metrics)
+        staking_matrix.count_nonzero(staking_metrics)
         * validator_percentage_distribution
     )
 
@@ -2,28 +2,130 @@
 
 Domain Treasury
 
+The locked domain treasury balance is unlocked following the `domain_treasury_monthly_unlock_process`,
+as a fraction of the locked balance per month.
+The Policy Function evaluates the unlock fraction at each timestep in O(1),
+and `unlock_schedule(...)` precomputes it as an array over the timesteps of a known horizon,
+so that `treasury_unlocks(...)` evaluates many schedule variants at once,
+e.g. for the treasury emission sweeps of `model.emission.treasury_unlock_df`.
 """
 
 import typing
 
+import numpy as np
+
+import model.constants as constants
 from model.types import POLYGN
 
 
+_MINIMUM_KEPT = np.sqrt(np.finfo(float).tiny)
+"""Smallest cumulative product of `1 - unlock_fraction` divided by in `treasury_unlocks`"""
+
+
+def unlock_fraction(monthly_unlock_rate, dt):
+    """The fraction of the locked treasury balance unlocked per timestep, of a monthly unlock rate or an array of them"""
+    return np.clip(np.asarray(monthly_unlock_rate, dtype=float) * dt / constants.epochs_per_month, 0, 1)
+
+
+def unlock_schedule(unlock_process, run, dt, horizon) -> np.ndarray:
+    """The fraction of the locked treasury balance unlocked at each timestep up to the horizon
+
+    The process is evaluated at every timestep up to the horizon,
+    which must not exceed the timesteps of the process, e.g. of a process table.
+
+    Args:
+        unlock_process (Callable): Process returning the monthly unlock fraction at each epoch
+        run (int): Run of the process
+        dt (int): Epochs per timestep
+        horizon (int): Number of timesteps
+
+    Returns:
+        np.ndarray: Read-only unlock fraction per timestep
+    """
+    monthly_unlock_rates = np.array([unlock_process(run, timestep * dt) for timestep in range(horizon)], dtype=float)
+    schedule = unlock_fraction(monthly_unlock_rates, dt)
+    schedule.flags.writeable = False
+    return schedule
+
+
+def treasury_unlocks(locked_balance, inflows, unlock_fractions, block=256):
+    """Evaluate the locked and cumulative unlocked treasury balances of many unlock schedule variants
+
+    Equivalent to running `policy_domain_treasury_balance` for each variant, vectorized over variants and timesteps:
+    with `kept` the cumulative product of `1 - unlock_fraction`, the locked balance at timestep `t` is
+    `kept[t] * (locked_balance + sum(inflows[s] / kept[s - 1] for s <= t))`.
+    The products restart every `block` timesteps, so that they don't underflow over long horizons,
+    and blocks in which a variant unlocks (almost) everything are evaluated timestep by timestep.
+
+    Args:
+        locked_balance (float or np.ndarray): Initial locked balance, per variant
+        inflows (np.ndarray): Inflow to the locked balance at each timestep in [Timesteps] or [Variants, Timesteps]
+        unlock_fractions (np.ndarray): Unlock fraction at each timestep in [Variants, Timesteps]
+        block (int): Number of timesteps of the cumulative products
+
+    Returns:
+        tuple: Locked and cumulative unlocked balances in [Variants, Timesteps]
+    """
+    unlock_fractions = np.atleast_2d(np.asarray(unlock_fractions, dtype=float))
+    variants, timesteps = unlock_fractions.shape
+    inflows = np.broadcast_to(inflows, unlock_fractions.shape)
+    initial_balance = np.broadcast_to(np.asarray(locked_balance, dtype=float), (variants,))
+    locked = np.empty(unlock_fractions.shape)
+
+    balance = initial_balance
+    for start in range(0, timesteps, block):
+        end = min(start + block, timesteps)
+        block_locked = locked[:, start:end]
+        kept = np.cumprod(1 - unlock_fractions[:, start:end], axis=1)
+        if kept[:, -1].min() > _MINIMUM_KEPT:
+            block_locked[:, 0] = balance + inflows[:, start]
+            np.divide(inflows[:, start + 1 : end], kept[:, :-1], out=block_locked[:, 1:])
+            np.cumsum(block_locked, axis=1, out=block_locked)
+            block_locked *= kept
+        else:
+            for timestep in range(start, end):
+                balance = (balance + inflows[:, timestep]) * (1 - unlock_fractions[:, timestep])
+                locked[:, timestep] = balance
+        balance = locked[:, end - 1]
+
+    # The balance each fraction is unlocked from, before the unlock at each timestep
+    unlocked = np.empty(unlock_fractions.shape)
+    unlocked[:, 0] = initial_balance
+    unlocked[:, 1:] = locked[:, :-1]
+    unlocked += inflows
+    unlocked *= unlock_fractions
+    np.cumsum(unlocked, axis=1, out=unlocked)
+
+    return locked, unlocked
+
+
 # Added
-# TODO: Need to add unlocking mechanism
 def policy_domain_treasury_balance(
     params, substep, state_history, previous_state
 ) -> typing.Dict[str, POLYGN]:
 
     # Parameters
+    dt = params["dt"]
+    domain_treasury_monthly_unlock_process = params["domain_treasury_monthly_unlock_process"]
 
     # State Variables
+    run = previous_state["run"]
+    timestep = previous_state["timestep"]
     domain_treasury_balance = previous_state["domain_treasury_balance_locked"]
+    domain_treasury_balance_unlocked = previous_state["domain_treasury_balance_unlocked"]
     public_base_fee_to_domain_treasury = previous_state["public_base_fee_to_domain_treasury"]
     private_base_fee_to_domain_treasury = previous_state["private_base_fee_to_domain_treasury"]
     
     domain_treasury_balance +=  public_base_fee_to_domain_treasury + private_base_fee_to_domain_treasury 
 
+    # The fraction unlocked over the previous timestep, as in `unlock_schedule`,
+    # only evaluating the process up to the simulated timesteps
+    index = max(timestep - 1, 0)
+    unlocked_amount = domain_treasury_balance * unlock_fraction(
+        domain_treasury_monthly_unlock_process(run, index * dt), dt
+    )
+
     return {
-        "domain_treasury_balance_locked": domain_treasury_balance,
-    }
\ No newline at end of file
+        "domain_treasury_balance_locked": domain_treasury_balance - unlocked_amount,
+        "domain_treasury_balance_unlocked": domain_treasury_balance_unlocked + unlocked_amount,
+    }
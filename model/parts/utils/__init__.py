@@ -2,11 +2,15 @@
 Misc. utility and helper functions
 """
 
-from model.state_variables import HubState
-from model.system_parameters import Parameters
+import typing
 
+# Only imported for type checking, as the System Parameters depend on the Policy Functions using these utilities
+if typing.TYPE_CHECKING:
+    from model.state_variables import HubState
+    from model.system_parameters import Parameters
 
-def get_number_of_awake_validators(params: Parameters, state: HubState) -> int:
+
+def get_number_of_awake_validators(params: "Parameters", state: "HubState") -> int:
     """
     Utility function used to return the number of awake validators.
     If the MAX_VALIDATOR_COUNT is disabled (set to None), it will return the number of active validators.
@@ -0,0 +1,227 @@
+"""
+Kernels for the per-chain and per-validator loops of the decentralization and event Policy Functions.
+
+The loop kernels are JIT-compiled using [Numba](https://numba.pydata.org/) when it is installed,
+otherwise the equivalent vectorized NumPy implementations are used.
+Both implementations return identical results, see `tests/test_kernels.py`.
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+NUMBA_AVAILABLE = numba is not None
+"""Whether the JIT-compiled kernels are used by default"""
+
+
+def _attack_sets_loop(staking_metrics, sorted_indices, total_stakes, number_of_validators):
+    number_of_chains, number_of_nodes = staking_metrics.shape
+    attack_nodes_51 = np.zeros(number_of_chains)
+    attack_nodes_33 = np.zeros(number_of_chains)
+    node_counts_51 = np.zeros(number_of_validators)
+    node_counts_33 = np.zeros(number_of_validators)
+
+    for chain in range(number_of_chains):
+        threshold_51 = total_stakes[chain] * 0.51
+        threshold_33 = total_stakes[chain] * 0.33
+        attack_stake = 0.0
+
+        # Add nodes to the attack until their combined stake is more than 51%
+        for position in range(number_of_nodes):
+            index = sorted_indices[chain, position]
+            attack_stake += staking_metrics[chain, index]
+            attack_nodes_51[chain] += 1
+            if attack_stake <= threshold_33:
+                attack_nodes_33[chain] += 1
+                node_counts_33[index] += 1
+            if attack_stake <= threshold_51:
+                node_counts_51[index] += 1
+            else:
+                break
+
+    return attack_nodes_51, attack_nodes_33, node_counts_51, node_counts_33
+
+
+def _attack_sets_numpy(staking_metrics, sorted_indices, total_stakes, number_of_validators):
+    number_of_nodes = staking_metrics.shape[1]
+
+    # Stakes are non-negative, so the cumulative stake is non-decreasing
+    # and the nodes within each threshold form a prefix of the sorted chain
+    attack_stakes = np.cumsum(
+        np.take_along_axis(staking_metrics, sorted_indices, axis=1), axis=1
+    )
+    within_51 = attack_stakes <= (total_stakes * 0.51)[:, np.newaxis]
+    within_33 = attack_stakes <= (total_stakes * 0.33)[:, np.newaxis]
+
+    # The node that crosses the 51% threshold is also part of the attack
+    attack_nodes_51 = np.minimum(within_51.sum(axis=1) + 1, number_of_nodes).astype(float)
+    attack_nodes_33 = within_33.sum(axis=1).astype(float)
+    node_counts_51 = np.bincount(
+        sorted_indices[within_51], minlength=number_of_validators
+    ).astype(float)
+    node_counts_33 = np.bincount(
+        sorted_indices[within_33], minlength=number_of_validators
+    ).astype(float)
+
+    return attack_nodes_51, attack_nodes_33, node_counts_51, node_counts_33
+
+
+def _sparse_attack_sets_loop(
+    data, indices, indptr, sorted_positions, total_stakes, number_of_nodes, number_of_validators
+):
+    number_of_chains = len(indptr) - 1
+    attack_nodes_51 = np.zeros(number_of_chains)
+    attack_nodes_33 = np.zeros(number_of_chains)
+    node_counts_51 = np.zeros(number_of_validators)
+    node_counts_33 = np.zeros(number_of_validators)
+
+    for chain in range(number_of_chains):
+        if total_stakes[chain] == 0:
+            # Without any stake every node is within both thresholds
+            attack_nodes_51[chain] = number_of_nodes
+            attack_nodes_33[chain] = number_of_nodes
+            node_counts_51[:number_of_nodes] += 1
+            node_counts_33[:number_of_nodes] += 1
+            continue
+
+        threshold_51 = total_stakes[chain] * 0.51
+        threshold_33 = total_stakes[chain] * 0.33
+        attack_stake = 0.0
+
+        # Nodes without stake on the chain sort last, after the 51% threshold has been crossed
+        for position in sorted_positions[indptr[chain]:indptr[chain + 1]]:
+            index = indices[position]
+            attack_stake += data[position]
+            attack_nodes_51[chain] += 1
+            if attack_stake <= threshold_33:
+                attack_nodes_33[chain] += 1
+                node_counts_33[index] += 1
+            if attack_stake <= threshold_51:
+                node_counts_51[index] += 1
+            else:
+                break
+
+    return attack_nodes_51, attack_nodes_33, node_counts_51, node_counts_33
+
+
+def _sparse_attack_sets_numpy(
+    data, indices, indptr, sorted_positions, total_stakes, number_of_nodes, number_of_validators
+):
+    number_of_chains = len(indptr) - 1
+    row_indices = np.repeat(np.arange(number_of_chains), np.diff(indptr))
+    sorted_data = data[sorted_positions]
+    sorted_indices = indices[sorted_positions]
+
+    # Cumulative stakes within each chain, from a single cumulative sum restarted at the first stake of each chain
+    cumulative_stakes = np.cumsum(sorted_data)
+    chain_offsets = np.concatenate(([0.0], cumulative_stakes))[indptr[:-1]]
+    attack_stakes = cumulative_stakes - chain_offsets[row_indices]
+
+    # Chains without stake are counted separately, as every node is within both thresholds
+    staked = total_stakes[row_indices] > 0
+    within_51 = staked & (attack_stakes <= (total_stakes * 0.51)[row_indices])
+    within_33 = staked & (attack_stakes <= (total_stakes * 0.33)[row_indices])
+
+    unstaked_chains = total_stakes == 0
+    # The node that crosses the 51% threshold is also part of the attack
+    attack_nodes_51 = np.bincount(row_indices[within_51], minlength=number_of_chains) + 1.0
+    attack_nodes_33 = np.bincount(row_indices[within_33], minlength=number_of_chains).astype(float)
+    attack_nodes_51[unstaked_chains] = number_of_nodes
+    attack_nodes_33[unstaked_chains] = number_of_nodes
+
+    node_counts_51 = np.bincount(sorted_indices[within_51], minlength=number_of_validators).astype(float)
+    node_counts_33 = np.bincount(sorted_indices[within_33], minlength=number_of_validators).astype(float)
+    node_counts_51[:number_of_nodes] += unstaked_chains.sum()
+    node_counts_33[:number_of_nodes] += unstaked_chains.sum()
+
+    return attack_nodes_51, attack_nodes_33, node_counts_51, node_counts_33
+
+
+def _clamp_slashed_stakes_loop(staking_metrics, polygn_staked_per_validator, slashing_amount):
+    number_of_chains, number_of_nodes = staking_metrics.shape
+    for i in range(number_of_nodes):
+        # Calculate the remaining stake after slashing
+        polygn_staked_per_validator[i] = max(polygn_staked_per_validator[i] - slashing_amount[i], 0)
+        for j in range(number_of_chains):
+            # A node can't stake more on a chain than its total stake
+            staking_metrics[j, i] = min(staking_metrics[j, i], polygn_staked_per_validator[i])
+
+
+def _clamp_slashed_stakes_numpy(staking_metrics, polygn_staked_per_validator, slashing_amount):
+    polygn_staked_per_validator[:] = np.maximum(polygn_staked_per_validator - slashing_amount, 0)
+    np.minimum(staking_metrics, polygn_staked_per_validator, out=staking_metrics)
+
+
+if NUMBA_AVAILABLE:
+    _attack_sets_kernel = numba.njit(cache=True)(_attack_sets_loop)
+    _sparse_attack_sets_kernel = numba.njit(cache=True)(_sparse_attack_sets_loop)
+    _clamp_slashed_stakes_kernel = numba.njit(cache=True)(_clamp_slashed_stakes_loop)
+else:
+    _attack_sets_kernel = _attack_sets_loop
+    _sparse_attack_sets_kernel = _sparse_attack_sets_loop
+    _clamp_slashed_stakes_kernel = _clamp_slashed_stakes_loop
+
+
+def attack_sets(staking_metrics, number_of_validators, use_numba=NUMBA_AVAILABLE):
+    """Calculate the smallest sets of nodes controlling more than 51% and up to 33% of each chain's stake
+
+    Args:
+        staking_metrics (np.ndarray): Stake per chain and node in [Chains, Validators]
+        number_of_validators (int): Length of the returned node count vectors
+        use_numba (bool, optional): Use the loop kernel, JIT-compiled if Numba is installed. Defaults to `NUMBA_AVAILABLE`.
+
+    Returns:
+        tuple: Per chain, the number of nodes in the 51% and 33% attack sets,
+        and per node, the number of chains in whose 51% and 33% attack sets it is.
+    """
+    staking_metrics = np.asarray(staking_metrics, dtype=float)
+    # Sort the nodes of each chain in descending order of staking amount
+    sorted_indices = np.ascontiguousarray(np.argsort(staking_metrics, axis=1)[:, ::-1])
+    total_stakes = staking_metrics.sum(axis=1)
+
+    kernel = _attack_sets_kernel if use_numba else _attack_sets_numpy
+    return kernel(staking_metrics, sorted_indices, total_stakes, number_of_validators)
+
+
+def sparse_attack_sets(staking_metrics, number_of_validators, use_numba=NUMBA_AVAILABLE):
+    """Calculate the attack sets of `attack_sets(...)` from a SciPy CSR staking matrix,
+    visiting only the stored stakes of each chain
+
+    Without Numba the cumulative stakes of all chains are evaluated in a single vectorized pass over the stored stakes.
+    The result equals that of the dense matrix up to the order in which equal stakes are visited.
+    """
+    # Sort the stored stakes of each chain in descending order, keeping the chains in row order
+    row_indices = np.repeat(np.arange(staking_metrics.shape[0]), np.diff(staking_metrics.indptr))
+    sorted_positions = np.lexsort((-staking_metrics.data, row_indices))
+    total_stakes = np.asarray(staking_metrics.sum(axis=1, dtype=np.float64)).ravel()
+
+    kernel = _sparse_attack_sets_kernel if use_numba else _sparse_attack_sets_numpy
+    return kernel(
+        staking_metrics.data.astype(float),
+        staking_metrics.indices,
+        staking_metrics.indptr,
+        sorted_positions,
+        total_stakes,
+        staking_metrics.shape[1],
+        number_of_validators,
+    )
+
+
+def clamp_slashed_stakes(
+    staking_metrics, polygn_staked_per_validator, slashing_amount, use_numba=NUMBA_AVAILABLE
+):
+    """Deduct the slashing amount from each validator's total stake, in place,
+    and cap each validator's stake on every chain to its remaining total stake
+
+    Args:
+        staking_metrics (np.ndarray): Float stake per chain and node in [Chains, Validators], updated in place
+        polygn_staked_per_validator (np.ndarray): Total stake per validator, updated in place
+        slashing_amount (np.ndarray): Amount slashed per validator
+        use_numba (bool, optional): Use the loop kernel, JIT-compiled if Numba is installed. Defaults to `NUMBA_AVAILABLE`.
+    """
+    kernel = _clamp_slashed_stakes_kernel if use_numba else _clamp_slashed_stakes_numpy
+    kernel(staking_metrics, polygn_staked_per_validator, slashing_amount)
@@ -0,0 +1,39 @@
+"""
+Storage dtypes of the [Chains, Validators] State Variable matrices, see the `state_precision` System Parameter.
+
+With `Precision.COMPACT`, stakes and liveness are stored as float32 and Poisson shares as uint16,
+halving the memory and bandwidth of the largest State Variables.
+Sums over the matrices are accumulated in float64, so only the stored values are rounded,
+to a relative error of at most 2**-24 (~6e-8) per element: aggregate metrics, such as the inflation
+and monopoly metrics, stay within a relative tolerance of 1e-6 of the float64 results, see `tests/test_precision.py`.
+"""
+
+import numpy as np
+
+from model.types import Precision
+
+
+COMPACT_DTYPES = {
+    "staking_metrics": np.float32,
+    "staking_metrics_if_fragmentation": np.float32,
+    "liveness_metrics": np.float32,
+    "share_by_validator_in_SingleStaking": np.uint16,
+}
+"""Compact storage dtype of each State Variable matrix"""
+
+
+def as_state_dtype(state_variable, value, precision):
+    """Cast a State Variable matrix to its storage dtype for the given precision"""
+    if precision == Precision.COMPACT:
+        return value.astype(COMPACT_DTYPES[state_variable], copy=False)
+    return value
+
+
+def compact_state(state):
+    """Return a copy of the state with the State Variable matrices in their compact storage dtypes,
+    e.g. to also compact the matrices of the initial state that aren't updated by any Policy Function
+    """
+    return {
+        key: as_state_dtype(key, value, Precision.COMPACT) if key in COMPACT_DTYPES else value
+        for key, value in state.items()
+    }
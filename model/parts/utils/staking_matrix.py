@@ -0,0 +1,257 @@
+"""
+Operations on the staking matrix, the stake per chain and validator in [Chains, Validators].
+Sums are accumulated in float64, also when the matrix is stored in a compact dtype, see `model.parts.utils.precision`.
+
+The staking matrix is a dense NumPy array by default. With the `sparse_staking_metrics` System Parameter enabled,
+it's stored as a SciPy CSR matrix instead: validators only participate in ~15% of the private chains,
+and stakes below the minimum stake are zeroed, so memory and time then scale with the number of active stakes
+rather than with chains x validators.
+
+The Policy Functions operate on the staking matrix through these functions, which accept either representation.
+For a dense matrix they perform the same NumPy operations as before, so results are unchanged.
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy import special
+
+from model.parts.utils.kernels import attack_sets, sparse_attack_sets, clamp_slashed_stakes
+
+
+def is_sparse(staking_metrics):
+    """Whether the staking matrix is stored as a SciPy sparse matrix"""
+    return sparse.issparse(staking_metrics)
+
+
+def as_staking_matrix(staking_metrics, use_sparse):
+    """Convert the staking matrix to a SciPy CSR matrix or a dense NumPy array"""
+    if use_sparse:
+        staking_metrics = sparse.csr_matrix(staking_metrics)
+        # Zeroed stakes are not active stakes
+        staking_metrics.eliminate_zeros()
+        return staking_metrics
+    if is_sparse(staking_metrics):
+        return staking_metrics.toarray()
+    return staking_metrics
+
+
+def to_dense(staking_metrics):
+    """The staking matrix as a dense NumPy array"""
+    return as_staking_matrix(staking_metrics, use_sparse=False)
+
+
+def total(staking_metrics):
+    """Total stake over all chains and validators"""
+    return staking_metrics.sum(dtype=np.float64)
+
+
+def stake_per_chain(staking_metrics):
+    """Row sums, the total stake per chain"""
+    return np.asarray(staking_metrics.sum(axis=1, dtype=np.float64)).ravel()
+
+
+def stake_per_validator(staking_metrics):
+    """Column sums, the total stake per validator over all chains"""
+    return np.asarray(staking_metrics.sum(axis=0, dtype=np.float64)).ravel()
+
+
+def count_nonzero(staking_metrics):
+    """Number of active stakes"""
+    if is_sparse(staking_metrics):
+        return staking_metrics.count_nonzero()
+    return np.count_nonzero(staking_metrics)
+
+
+def chain(staking_metrics, chain_id):
+    """Stake per validator on a single chain, as a dense vector"""
+    if is_sparse(staking_metrics):
+        return staking_metrics.getrow(chain_id).toarray().ravel()
+    return staking_metrics[chain_id]
+
+
+def chains(staking_metrics, chain_indices):
+    """Sub-matrix of the selected chains"""
+    return staking_metrics[chain_indices]
+
+
+def mask_validators(staking_metrics, mask):
+    """Multiply the stakes of each validator by its entry in `mask`"""
+    if is_sparse(staking_metrics):
+        return staking_metrics.multiply(mask).tocsr()
+    return np.multiply(staking_metrics, mask)
+
+
+def weighted_total(staking_metrics, weights):
+    """Total of the element-wise product with the dense weights in [Chains, Validators], e.g. the liveness metrics"""
+    if is_sparse(staking_metrics):
+        return staking_metrics.multiply(weights).sum(dtype=np.float64)
+    return (weights * staking_metrics).sum(dtype=np.float64)
+
+
+def weighted_validator_totals(staking_metrics, weights):
+    """Column sums of the element-wise product with the dense weights, reduced in one pass without a temporary matrix"""
+    if is_sparse(staking_metrics):
+        rows = np.repeat(np.arange(staking_metrics.shape[0]), np.diff(staking_metrics.indptr))
+        products = staking_metrics.data * weights[rows, staking_metrics.indices]
+        return np.bincount(staking_metrics.indices, weights=products, minlength=staking_metrics.shape[1])
+    return np.einsum("cv,cv->v", weights, staking_metrics, dtype=np.float64, casting="safe")
+
+
+def weighted_group_totals(staking_metrics, weights, mask):
+    """Weighted totals of all validators, the validators outside and inside the `mask` group,
+    equal to `weighted_total` of the staking matrix masked by `1 - mask` and `mask`,
+    but reducing the [Chains, Validators] matrices once
+    """
+    totals = weighted_validator_totals(staking_metrics, weights)
+    return totals.sum(), totals @ (1 - mask), totals @ mask
+
+
+def apply_minimum_stake(staking_metrics, minimum_stake):
+    """Zero the stakes below the minimum stake"""
+    if is_sparse(staking_metrics):
+        staking_metrics = staking_metrics.copy()
+        staking_metrics.data[staking_metrics.data < minimum_stake] = 0
+        staking_metrics.eliminate_zeros()
+        return staking_metrics
+    return np.where(staking_metrics < minimum_stake, 0, staking_metrics)
+
+
+def _sample_distinct(population, size):
+    """A uniform sample of `size` distinct integers below `population`, in the order drawn,
+    without materializing the population
+    """
+    sample = np.empty(0, dtype=np.int64)
+    while len(sample) < size:
+        draws = np.concatenate((sample, np.random.randint(0, population, size - len(sample))))
+        # Keep the first draw of each integer, which keeps the earlier, distinct sample
+        _, first = np.unique(draws, return_index=True)
+        sample = draws[np.sort(first)]
+    return sample
+
+
+def sample_stakes(staking_metrics, scale, maximum_stakes, minimum_stake):
+    """Sample each stake of a sparse staking matrix from a normal distribution with the `scale` around it,
+    clipped between zero and the maximum stake of each validator, as the dense multistaking sampling does
+
+    Inactive stakes are sampled around zero, so only those whose sample reaches the `minimum_stake`
+    are drawn: their number from a binomial distribution, their positions uniformly among the inactive stakes,
+    and their values from the normal distribution truncated below at the minimum stake.
+    The samples thus follow the same distribution as the dense sampling,
+    followed by `apply_minimum_stake`, while the cost scales with the number of active stakes.
+    """
+    staking_metrics = staking_metrics.tocsr().astype(np.float64)
+    staking_metrics.sort_indices()
+    staking_metrics.data = np.clip(
+        np.random.normal(staking_metrics.data, scale=scale), 0, maximum_stakes[staking_metrics.indices]
+    )
+
+    # Inactive stakes can only reach the minimum stake for validators whose maximum stake reaches it
+    eligible = np.flatnonzero(maximum_stakes >= minimum_stake)
+    number_of_chains = staking_metrics.shape[0]
+    column_ranks = np.full(staking_metrics.shape[1], -1)
+    column_ranks[eligible] = np.arange(len(eligible))
+    rows = np.repeat(np.arange(number_of_chains), np.diff(staking_metrics.indptr))
+    ranks = column_ranks[staking_metrics.indices]
+    # Positions of the active stakes in the [Chains, Eligible validators] grid, in ascending order
+    active = rows[ranks >= 0] * len(eligible) + ranks[ranks >= 0]
+    inactive = number_of_chains * len(eligible) - len(active)
+
+    activation = special.ndtr(-minimum_stake / scale)
+    activated = np.random.binomial(inactive, activation)
+    # The j-th inactive position is j plus the number of active positions up to it
+    inactive_ranks = np.sort(_sample_distinct(inactive, activated))
+    positions = inactive_ranks + np.searchsorted(active - np.arange(len(active)), inactive_ranks, side="right")
+    columns = eligible[positions % max(len(eligible), 1)]
+    # Inverse transform sampling of the upper tail of the normal distribution
+    values = scale * special.ndtri(1 - np.random.uniform(0, activation, activated))
+
+    activated_stakes = sparse.csr_matrix(
+        (np.minimum(values, maximum_stakes[columns]), (positions // max(len(eligible), 1), columns)),
+        shape=staking_metrics.shape,
+    )
+    return (staking_metrics + activated_stakes).tocsr()
+
+
+def append_chains(staking_metrics, new_staking_metrics):
+    """Append the stakes of new chains as rows"""
+    if is_sparse(staking_metrics):
+        return sparse.vstack((staking_metrics, sparse.csr_matrix(new_staking_metrics)), format="csr")
+    return np.concatenate((staking_metrics, new_staking_metrics), axis=0)
+
+
+def slash_chain(staking_metrics, chain_id, slashing_amount, polygn_staked_per_validator):
+    """Deduct the slashing amount per validator from its stake on the slashed chain and its total stake,
+    and cap each validator's stake on every chain to its remaining total stake
+
+    Both the float staking matrix and `polygn_staked_per_validator` are updated in place.
+    """
+    if not is_sparse(staking_metrics):
+        staking_metrics[chain_id] = staking_metrics[chain_id] - slashing_amount
+        clamp_slashed_stakes(staking_metrics, polygn_staked_per_validator, slashing_amount)
+        return
+
+    start, end = staking_metrics.indptr[chain_id], staking_metrics.indptr[chain_id + 1]
+    validators = staking_metrics.indices[start:end]
+    staking_metrics.data[start:end] = staking_metrics.data[start:end] - slashing_amount[validators]
+
+    polygn_staked_per_validator[:] = np.maximum(polygn_staked_per_validator - slashing_amount, 0)
+    np.minimum(
+        staking_metrics.data,
+        polygn_staked_per_validator[staking_metrics.indices],
+        out=staking_metrics.data,
+    )
+    staking_metrics.eliminate_zeros()
+
+
+def chain_attack_sets(staking_metrics, number_of_validators):
+    """Attack sets of each chain, see `model.parts.utils.kernels.attack_sets`"""
+    if is_sparse(staking_metrics):
+        return sparse_attack_sets(staking_metrics, number_of_validators)
+    return attack_sets(staking_metrics, number_of_validators)
+
+
+def gini_coefficient(x):
+    # Based on bottom eq: http://www.statsdirect.com/help/content/image/stat0206_wmf.gif
+    # from: http://www.statsdirect.com/help/default.htm#nonparametric_methods/gini.htm
+    n = len(x)
+    s = x.sum()
+    r = np.argsort(np.argsort(-x))  # calculates zero-based ranks
+    return 1 - (2 * (r * x).sum() + s) / (n * s)
+
+
+def hhi(x):
+    # Calculate the squares of the market shares
+    squares = np.square(x / np.sum(x))
+    # Sum up the squares and multiply by 10,000 to get the HHI
+    return np.sum(squares) * 10000
+
+
+def average_gini_and_hhi(staking_metrics):
+    """Average Gini coefficient and Herfindahl-Hirschman index of the stake distribution over all chains"""
+    if not is_sparse(staking_metrics):
+        gini_coeffs = []
+        hhis = []
+        for chain_stakes in staking_metrics:
+            gini_coeffs.append(gini_coefficient(np.array(chain_stakes, dtype=np.float64)))
+            hhis.append(hhi(np.array(chain_stakes, dtype=np.float64)))
+        return np.mean(gini_coeffs), np.mean(hhis)
+
+    # Validators without stake rank last and don't contribute to either sum,
+    # so only the stored stakes are ranked, in descending order within each chain
+    number_of_chains, number_of_nodes = staking_metrics.shape
+    row_indices = np.repeat(np.arange(number_of_chains), np.diff(staking_metrics.indptr))
+    sorted_positions = np.lexsort((-staking_metrics.data, row_indices))
+    ranks = np.empty(len(sorted_positions))
+    ranks[sorted_positions] = np.arange(len(sorted_positions)) - staking_metrics.indptr[row_indices]
+
+    data = staking_metrics.data.astype(np.float64)
+    s = np.bincount(row_indices, weights=data, minlength=number_of_chains)
+    ranked_sum = np.bincount(row_indices, weights=ranks * data, minlength=number_of_chains)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gini_coeffs = 1 - (2 * ranked_sum + s) / (number_of_nodes * s)
+        hhis = np.bincount(
+            row_indices, weights=np.square(data / s[row_indices]), minlength=number_of_chains
+        ) * 10000
+    # Chains without stake have undefined shares, as in the dense calculation
+    hhis[s == 0] = np.nan
+    return np.mean(gini_coeffs), np.mean(hhis)
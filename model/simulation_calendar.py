@@ -0,0 +1,89 @@
+"""
+# Simulation Calendar
+
+The calendar dates of the simulation timesteps, precomputed once per `date_start` and `dt` System Parameter,
+so that Policy Functions and post-processing index into it instead of doing datetime arithmetic per timestep.
+
+The calendar extends itself to the largest timestep requested, in powers of two.
+"""
+
+import datetime
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+import model.constants as constants
+
+
+class SimulationCalendar:
+    """Calendar of the timestamps `date_start + timestep * dt / epochs_per_day` days, indexed by timestep"""
+
+    def __init__(self, date_start: datetime.datetime, dt: int):
+        self.date_start = date_start
+        self.dt = dt
+        self.horizon = 0
+        self._first_timesteps_after = {}
+        self._lock = threading.Lock()
+        self._extend(1)
+
+    def _extend(self, timesteps):
+        if timesteps <= self.horizon:
+            return
+        with self._lock:
+            if timesteps <= self.horizon:
+                return
+            # Round up to a power of two, so that the calendar is rebuilt a logarithmic number of times
+            horizon = 1 << int(timesteps - 1).bit_length()
+
+            # Python datetimes, equal to the timestamps calculated per timestep
+            timestamps = [
+                self.date_start + datetime.timedelta(days=(timestep * self.dt / constants.epochs_per_day))
+                for timestep in range(horizon)
+            ]
+            datetimes = np.array(timestamps, dtype="datetime64[us]")
+            days = (datetimes - datetimes[0]) // np.timedelta64(1, "D")
+            months = datetimes.astype("datetime64[M]").astype(int)
+
+            # Threads reading the calendar without the lock see the horizon only once the arrays cover it
+            self.timestamps = timestamps
+            self.datetimes = datetimes
+            self.years = days // 365
+            """Whole 365-day years since the start of the simulation"""
+            self.months = months - months[0]
+            """Calendar months since the month of the start of the simulation"""
+            self.horizon = horizon
+
+    def timestamp(self, timestep) -> datetime.datetime:
+        """The timestamp of the timestep"""
+        self._extend(timestep + 1)
+        return self.timestamps[timestep]
+
+    def first_timestep_after(self, date: datetime.datetime) -> int:
+        """The first timestep with a timestamp after the date, e.g. the timestep an event is triggered at"""
+        if date in self._first_timesteps_after:
+            return self._first_timesteps_after[date]
+        # Extend the calendar to cover the date, at least one timestep beyond its approximate timestep
+        days = (date - self.date_start) / datetime.timedelta(days=1)
+        self._extend(max(int(days * constants.epochs_per_day / self.dt) + 2, 1))
+        timestep = int(np.searchsorted(self.datetimes, np.datetime64(date, "us"), side="right"))
+        self._first_timesteps_after[date] = timestep
+        return timestep
+
+    def years_at(self, timesteps):
+        """Whole years since the start of the simulation at each timestep, NaN for negative timesteps"""
+        timesteps = np.asarray(timesteps)
+        self._extend(int(timesteps.max(initial=0)) + 1)
+        return np.where(timesteps >= 0, self.years[np.maximum(timesteps, 0)], np.nan)
+
+    def months_at(self, timesteps):
+        """Calendar months since the start of the simulation at each timestep, NaN for negative timesteps"""
+        timesteps = np.asarray(timesteps)
+        self._extend(int(timesteps.max(initial=0)) + 1)
+        return np.where(timesteps >= 0, self.months[np.maximum(timesteps, 0)], np.nan)
+
+
+@lru_cache(maxsize=32)
+def simulation_calendar(date_start: datetime.datetime, dt: int) -> SimulationCalendar:
+    """The shared calendar of the `date_start` and `dt` System Parameters"""
+    return SimulationCalendar(date_start, dt)
@@ -12,7 +12,7 @@ import model.parts.supernets as supernets
 import model.parts.events as events
 import model.parts.decentralization as decentralization
 from model.system_parameters import parameters
-from model.utils import update_from_signal
+from model.utils import update_from_signal, update_from_optional_signal, copy_on_write_blocks
 
 # Edited
 state_update_block_stages = {
@@ -27,18 +27,14 @@ state_update_block_stages = {
 }
 
 # Added
-state_update_slashing_event = {
+state_update_scheduled_events = {
     "description": """
-        Update slashing events
+        Run scheduled events, such as slashing, when due
     """,
-    "policies": {"slashing": events.event_slashing_on_large_service},
+    "policies": {"scheduled_events": events.policy_scheduled_events},
     "variables": {
-        "stage": update_from_signal("stage"),
-        "staking_metrics": update_from_signal("staking_metrics"),
-        "polygn_staked_per_validator": update_from_signal("polygn_staked_per_validator"),
-        "polygn_staked": update_from_signal("polygn_staked"),
-        "validator_group_by_event": update_from_signal("validator_group_by_event"),
-        "unassigned_rewards_ratio": update_from_signal("unassigned_rewards_ratio"),
+        state_variable: update_from_optional_signal(state_variable)
+        for state_variable in events.SCHEDULED_EVENT_VARIABLES
     },
 }
 
@@ -159,6 +155,7 @@ state_treasury = {
         },
         "variables": {
             "domain_treasury_balance_locked": update_from_signal("domain_treasury_balance_locked"),
+            "domain_treasury_balance_unlocked": update_from_signal("domain_treasury_balance_unlocked"),
         },
 }
 
@@ -371,7 +368,7 @@ _state_update_blocks = (
     [
         state_update_block_stages,
         state_update_block_polygon,
-        state_update_slashing_event,
+        state_update_scheduled_events,
         state_supernets,
         state_txn_pricing, 
         state_update_block_validators,
@@ -384,7 +381,7 @@ _state_update_blocks = (
     else [
         state_update_block_stages,
         state_update_block_polygon,
-        state_update_slashing_event,
+        state_update_scheduled_events,
         state_supernets,
         state_txn_pricing,
         state_update_block_validators,
@@ -395,9 +392,11 @@ _state_update_blocks = (
 
 # Split the state update blocks into those used during the simulation (state_update_blocks)
 # and those used in post-processing to calculate the system metrics (post_processing_blocks)
-state_update_blocks = [
+# Policy Functions receive read-only views of the array State Variables they don't declare a write for,
+# so that the engine can run without deep copying the state, see `model.utils.copy_on_write`
+state_update_blocks = copy_on_write_blocks([
     block for block in _state_update_blocks if not block.get("post_processing", False)
-]
+])
 post_processing_blocks = [
     block for block in _state_update_blocks if block.get("post_processing", False)
 ]
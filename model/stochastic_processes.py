@@ -2,6 +2,10 @@
 Helper functions to generate stochastic environmental processes
 """
 
+import atexit
+import os
+import tempfile
+
 import numpy as np
 from stochastic import processes
 import math
@@ -161,6 +165,72 @@ def create_stochastic_process_realizations(
 
 
 
+class SharedProcessTable:
+    """Stochastic process realizations in [Runs, Samples], memory-mapped from a `.npy` file
+
+    Pickles as the path of the file, so that worker processes, e.g. of multi-process radCAD backends,
+    `experiments.scheduler` or `experiments.job_queue`, map the same file rather than receiving a copy of the samples
+    with every closure of the System Parameters, and share its pages in memory.
+    Indexed like the list of realizations, e.g. `samples[run - 1][timestep]`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.samples = np.load(path, mmap_mode="r")
+
+    def __getitem__(self, index):
+        return self.samples[index]
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __reduce__(self):
+        return (SharedProcessTable, (self.path,))
+
+
+def share_process_realizations(realizations, directory=None) -> SharedProcessTable:
+    """Publish stochastic process realizations once, to a file shared between processes
+
+    Files in node-local shared memory are removed when the publishing process exits.
+    Files in a given directory are kept, e.g. for workers on other nodes that run tasks after the publishing process,
+    and are removed with the directory.
+    Tasks of `experiments.job_queue` reference copies of their process tables in the queue directory instead.
+
+    Args:
+        realizations (list): Realizations of equal length, e.g. from `create_stochastic_process_realizations`
+        directory (str): Directory of the file, e.g. on a filesystem shared with worker nodes,
+            defaults to the `PROCESS_TABLE_DIRECTORY` environment variable, or else shared memory where available
+
+    Returns:
+        SharedProcessTable: Handle to the realizations
+    """
+    samples = np.asarray(realizations)
+    if samples.ndim != 2 or samples.dtype.kind not in "biuf":
+        raise ValueError("Process realizations must be numeric and of equal length")
+
+    directory = directory or os.environ.get("PROCESS_TABLE_DIRECTORY")
+    node_local = directory is None
+    if node_local:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    file_descriptor, path = tempfile.mkstemp(prefix="process_table_", suffix=".npy", dir=directory)
+    with os.fdopen(file_descriptor, "wb") as file:
+        np.save(file, samples)
+    if node_local:
+        atexit.register(_remove_process_table, path, os.getpid())
+
+    return SharedProcessTable(path)
+
+
+def _remove_process_table(path, pid):
+    # Only the publishing process removes the file, not forked workers exiting through atexit
+    if os.getpid() != pid:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
 
 def create_intial_state_risk_service_validator(public_chain_cnt,private_chain_cnt, validator_cnt):
     chain_cnt = public_chain_cnt + private_chain_cnt
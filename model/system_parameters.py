@@ -33,9 +33,11 @@ from model.types import (
     Epoch,
     Stage,
     Run_num,
+    Precision,
     ValidatorSetSize,
 )
 from model.utils import default
+from model.parts.events import ScheduledEvent, slashing_on_large_service
 from data.historical_values import (
     eth_price_mean,
     eth_block_rewards_mean,
@@ -284,6 +286,13 @@ class Parameters:
     The param of the annual issuance sqrt distribution k, when issuance rate is sqrt of total staked,
     New inflationary_rate_per_year = k/sqrt(polygn_staked) in float
     """
+    expected_liveness_inflation: List[bool] = default([False])
+    """
+    Allocate inflation using the expected liveness of the validators, `constants.validator_liveness`,
+    rather than the liveness drawn at each timestep, until an event such as a slashing splits the validators.
+    Avoids the reduction over the [Chains, Validators] matrices in `policy_inflation`, at the cost of the
+    inflation's sampling noise.
+    """
 
 
 
@@ -297,10 +306,12 @@ class Parameters:
     The parameter of quotient of transaction fees from public chains committed to Polygon Treasury
     """
     domain_treasury_monthly_unlock_process: List[Callable[[Run, Timestep], float]] = default(
-        [lambda _run, _timestep: 0.01]  # Gwei per gas
+        [lambda _run, _timestep: 0.0]
     )
     """
     A process that returns the monthly unlock percentage of the total treasury balance.
+
+    By default nothing is unlocked, see `model.emission.treasury_unlock_df` for unlock schedule sweeps.
     """
 
     # Validator parameters
@@ -356,6 +367,11 @@ class Parameters:
     """
     The percentage one validator is slashed by for a single slashing event on a large service.
     """
+    scheduled_events: List[List[ScheduledEvent]] = default([[slashing_on_large_service]])
+    """
+    Discrete events run when their trigger is due, e.g. the slashing on a large service at `date_slashing`.
+    See `model.parts.events.ScheduledEvent`.
+    """
 
     # # EIP-1559 transaction pricing parameters
     # base_fee_public_chain_process: List[Callable[[Run, Timestep], Gwei_per_Gas]] = default(
@@ -486,6 +502,16 @@ class Parameters:
     Staking mode for staking. Default set as double staking.
     Another option is "SingleStaking"
     """
+    sparse_staking_metrics: List[bool] = default([False])
+    """
+    Store the staking matrix as a sparse CSR matrix, see `model.parts.utils.staking_matrix`.
+    Reduces memory and time in large adoption scenarios, where most validators don't stake on most private chains.
+    """
+    state_precision: List[Precision] = default([Precision.FLOAT64])
+    """
+    Storage precision of the [Chains, Validators] State Variable matrices, see `model.parts.utils.precision`.
+    `Precision.COMPACT` halves their memory, with aggregate metrics within a relative tolerance of 1e-6.
+    """
 
 
     # Chains Adoption
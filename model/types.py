@@ -43,6 +43,14 @@ class Stage(Enum):
     All validators are slashed.
     """
 
+class Precision(Enum):
+    """Storage precision of the [Chains, Validators] State Variable matrices"""
+
+    FLOAT64 = 1
+    """Default NumPy dtypes"""
+    COMPACT = 2
+    """float32 stakes and liveness, and uint16 shares, see `model.parts.utils.precision`"""
+
 class Run_num(Enum):
     SINGLE = 1
     SMALL = 3
@@ -4,7 +4,9 @@ Misc. utility and helper functions
 
 import copy
 from dataclasses import field
-from functools import partial
+from functools import partial, wraps
+
+import numpy as np
 
 
 def _update_from_signal(
@@ -34,6 +36,102 @@ def update_from_signal(state_variable, signal_key=None):
     return partial(_update_from_signal, state_variable, signal_key)
 
 
+def _update_from_optional_signal(
+    state_variable,
+    signal_key,
+    params,
+    substep,
+    state_history,
+    previous_state,
+    policy_input,
+):
+    return state_variable, policy_input.get(signal_key, previous_state[state_variable])
+
+
+def update_from_optional_signal(state_variable, signal_key=None):
+    """A generic State Update Function to update a State Variable from a Policy Signal if there is one,
+    and otherwise keep its previous value
+
+    Args:
+        state_variable (str): State Variable key
+        signal_key (str, optional): Policy Signal key. Defaults to None.
+
+    Returns:
+        Callable: A generic State Update Function
+    """
+    if not signal_key:
+        signal_key = state_variable
+    return partial(_update_from_optional_signal, state_variable, signal_key)
+
+
+def writes(*state_variables):
+    """A decorator to declare the State Variable arrays a Policy Function updates in place
+
+    See `copy_on_write(...)`, which passes the Policy Function a private copy of these arrays.
+
+    Args:
+        state_variables (str): State Variable keys
+
+    Returns:
+        Callable: The decorator, which returns the Policy Function itself
+    """
+    def decorator(policy):
+        """Record the declared State Variables on the Policy Function"""
+        policy.writes = frozenset(state_variables)
+        return policy
+    return decorator
+
+
+def copy_on_write(policy):
+    """Wrap a Policy Function to receive read-only views of the NumPy array State Variables
+
+    Only the arrays declared using the `writes(...)` decorator are copied, so that a Policy Function
+    can't mutate the state shared with the state history when the radCAD engine runs with `deepcopy = False`.
+    Writing to any other array raises a `ValueError`.
+
+    Args:
+        policy (Callable): Policy Function
+
+    Returns:
+        Callable: The wrapped Policy Function
+    """
+    declared_writes = getattr(policy, "writes", frozenset())
+
+    @wraps(policy)
+    def wrapper(params, substep, state_history, previous_state):
+        """Call the Policy Function with read-only views, or copies of its declared writes, of the arrays"""
+        state = dict(previous_state)
+        views = {}
+        for key, value in previous_state.items():
+            if not isinstance(value, np.ndarray):
+                continue
+            if key in declared_writes:
+                state[key] = value.copy()
+            else:
+                view = value.view()
+                view.flags.writeable = False
+                state[key] = view
+                views[id(view)] = value
+
+        signals = policy(params, substep, state_history, state)
+
+        # Pass on the original arrays rather than the read-only views
+        return {
+            key: views.get(id(signal), signal) if isinstance(signal, np.ndarray) else signal
+            for key, signal in signals.items()
+        }
+
+    return wrapper
+
+
+def copy_on_write_blocks(state_update_blocks):
+    """Wrap the Policy Functions of the State Update Blocks using `copy_on_write(...)`"""
+    return [
+        {**block, "policies": {key: copy_on_write(policy) for key, policy in block["policies"].items()}}
+        for block in state_update_blocks
+    ]
+
+
 def local_variables(_locals):
     return {
         key: _locals[key]
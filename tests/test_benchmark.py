@@ -0,0 +1,160 @@
+"""
+Performance regression suite for the model Policy Functions and end-to-end experiments.
+
+Run and save a baseline with `make benchmark`, then compare against it with `make benchmark-compare`,
+which fails when the mean time of any benchmark regresses beyond the configured threshold.
+"""
+
+import copy
+
+import numpy as np
+import pytest
+from radcad.core import generate_parameter_sweep
+
+pytest.importorskip("pytest_benchmark")
+
+import model.parts.hub_system as hub
+import model.parts.staking as staking
+import model.parts.supernets as supernets
+import model.parts.events as events
+import model.parts.decentralization as decentralization
+import model.parts.system_metrics as metrics
+import model.parts.validators as validators
+import model.parts.treasury as treasury
+from model.state_variables import initial_state
+from model.system_parameters import parameters
+from model.types import Stage
+from model.simulation_calendar import simulation_calendar
+
+
+NUMBER_OF_VALIDATORS = 100
+CHAIN_COUNTS = {"small": 4, "medium": 500, "large": 5_000}
+ROUNDS = {"small": 20, "medium": 5, "large": 2}
+
+POLICIES = [
+    hub.policy_upgrade_stages,
+    hub.policy_network_issuance,
+    hub.policy_transaction_pricing,
+    hub.policy_inflation,
+    staking.policy_signature_check,
+    staking.policy_staking_multistaking_sampling,
+    supernets.policy_new_supernet_staking,
+    events.policy_scheduled_events,
+    events.event_slashing_on_large_service,
+    decentralization.policy_staking_centralization_metric,
+    decentralization.policy_slashable_amount,
+    decentralization.policy_monoply,
+    metrics.policy_validator_costs,
+    metrics.policy_validator_yields,
+    metrics.policy_total_online_validator_rewards,
+    validators.policy_staking,
+    validators.policy_validators,
+    validators.policy_average_effective_balance,
+    treasury.policy_domain_treasury_balance,
+]
+
+
+def synthetic_params():
+    """Return the first parameter subset of the default System Parameters"""
+    return generate_parameter_sweep(parameters)[0]
+
+
+def synthetic_state(chains, validators=NUMBER_OF_VALIDATORS, seed=1):
+    """Create a synthetic model state with `chains` x `validators` sized matrices
+
+    Matrix sparsity follows the initial state generator:
+    public chains are fully staked and private chains have ~15% validator participation.
+    """
+    rng = np.random.default_rng(seed)
+    public_chains = min(2, chains)
+    private_chains = chains - public_chains
+
+    state = copy.deepcopy(initial_state)
+    params = synthetic_params()
+
+    polygn_staked_per_validator = rng.poisson(5, validators) + 1.0
+    polygn_staked_per_validator *= state["polygn_staked"] / polygn_staked_per_validator.sum()
+
+    participation = np.ones((chains, validators))
+    participation[public_chains:] = rng.binomial(1, 0.15, (private_chains, validators))
+    participation[:, :6] = 1  # Each chain has at least 6 validators
+    staking_metrics = (
+        polygn_staked_per_validator
+        * participation
+        * np.clip(rng.normal(90, 30, (chains, validators)), 30, 100) / 100
+    )
+
+    # The first timestep after the slashing date, so that the slashing event is triggered
+    calendar = simulation_calendar(params["date_start"], params["dt"])
+    timestep = calendar.first_timestep_after(params["date_slashing"]) + 1
+
+    state.update({
+        "run": 1,
+        "timestep": timestep,
+        "substep": 1,
+        "stage": Stage.ALL.value,
+        "timestamp": calendar.timestamp(timestep - 1),
+        "PUBLIC_CHAINS_CNT": public_chains,
+        "PRIVATE_CHAINS_CNT": private_chains,
+        "polygn_staked_per_validator": polygn_staked_per_validator,
+        "staking_metrics": staking_metrics,
+        "staking_metrics_if_fragmentation": staking_metrics / staking_metrics.sum(axis=0),
+        "liveness_metrics": rng.binomial(100, 0.95, (chains, validators)) / 100,
+        "share_by_validator_in_SingleStaking": rng.poisson(5, (chains, validators)),
+        "chain_specific_checkpoint_submission_cadence": rng.binomial(1, 0.5, chains) + 1,
+        "service_trust_size": rng.uniform(0, 1, chains),
+        "validator_group_by_event": np.zeros(validators, dtype=int),
+    })
+
+    # Derived decentralization state consumed by policy_monoply
+    state.update(
+        decentralization.policy_staking_centralization_metric(params, 0, [], state)
+    )
+
+    return state
+
+
+@pytest.mark.parametrize("size", CHAIN_COUNTS.keys())
+@pytest.mark.parametrize(
+    "policy",
+    POLICIES,
+    ids=[f"{policy.__module__.split('.')[-1]}.{policy.__name__}" for policy in POLICIES],
+)
+def test_policy_benchmark(benchmark, policy, size):
+    params = synthetic_params()
+    state = synthetic_state(CHAIN_COUNTS[size])
+
+    benchmark.group = f"policies-{size}"
+    benchmark.extra_info["chains"] = CHAIN_COUNTS[size]
+    benchmark.extra_info["validators"] = NUMBER_OF_VALIDATORS
+
+    # Policies may mutate State Variables in place, so every round receives a fresh copy
+    benchmark.pedantic(
+        policy,
+        setup=lambda: ((params, 0, [], copy.deepcopy(state)), {}),
+        rounds=ROUNDS[size],
+    )
+
+
+def test_default_experiment_benchmark(benchmark):
+    from experiments.default_experiment import experiment
+    from experiments.run import run
+
+    benchmark.group = "experiments"
+    benchmark.pedantic(
+        run,
+        setup=lambda: ((copy.deepcopy(experiment),), {}),
+        rounds=1,
+    )
+
+
+def test_new_economic_experiment_benchmark(benchmark):
+    from experiments.templates.polygon.new_economic import experiment
+    from experiments.run import run
+
+    benchmark.group = "experiments"
+    benchmark.pedantic(
+        run,
+        setup=lambda: ((copy.deepcopy(experiment),), {}),
+        rounds=1,
+    )
@@ -0,0 +1,123 @@
+import random
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+import pytest
+from radcad import Model, Simulation
+
+from experiments.default_experiment import experiment
+from model.block_scheduler import block_access, block_substeps, function_access, schedule_blocks
+from model.parts.events import ScheduledEvent, event_slashing_on_large_service, policy_scheduled_events
+from model.utils import update_from_optional_signal, update_from_signal
+from tests.utils import assert_results_equal
+
+
+def policy_a(params, substep, state_history, previous_state):
+    return {"a": previous_state["x"] + previous_state.get("y", 0)}
+
+
+def policy_b(params, substep, state_history, previous_state):
+    return {"b": previous_state["a"]}
+
+
+def policy_random(params, substep, state_history, previous_state):
+    return {"c": np.random.random()}
+
+
+def policy_opaque(params, substep, state_history, previous_state):
+    return {"d": sum(value for value in previous_state.values() if isinstance(value, int))}
+
+
+def event_random_ratio(params, substep, state_history, previous_state):
+    return {"unassigned_rewards_ratio": np.random.random()}
+
+
+def block(policy, *state_variables):
+    return {
+        "policies": {"policy": policy},
+        "variables": {state_variable: update_from_signal(state_variable) for state_variable in state_variables},
+    }
+
+
+def test_function_access():
+    assert function_access(policy_a).reads == {"x", "y"}
+    assert not function_access(policy_a).random
+    assert function_access(policy_random).random
+    assert function_access(policy_opaque).opaque
+    # Passes the state to the event handlers of the System Parameters
+    assert function_access(policy_scheduled_events).random
+    assert function_access(update_from_signal("a")).reads == set()
+    assert function_access(update_from_optional_signal("a")).reads == {"a"}
+
+
+def test_block_substeps():
+    blocks = [
+        block(policy_random, "c"),
+        block(policy_a, "a"),
+        # Reads the writes of the previous block
+        block(policy_b, "b"),
+        # Writes what an earlier block reads, so can't run before it
+        block(lambda params, substep, state_history, previous_state: {"x": 1}, "x"),
+        # Keeps its order with the other block drawing random numbers
+        block(policy_random, "e"),
+        block(policy_opaque, "d"),
+    ]
+    # The first block updates the timestep, which blocks reading it would see in later substeps
+    assert block_substeps(blocks) == [0, 0, 1, 0, 0, 2]
+    assert len(schedule_blocks(blocks)) == 3
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_scheduled_blocks_reproduce_results(concurrent):
+    simulation = deepcopy(experiment.simulations[0])
+    simulation.timesteps = 12
+    simulation.runs = 2
+    simulation.model.params["scheduled_events"] = [[ScheduledEvent(
+        handler=event_slashing_on_large_service, timestep=5, pulse={"unassigned_rewards_ratio": 0.0}
+    )]]
+    blocks = simulation.model.state_update_blocks
+
+    results = []
+    for state_update_blocks in [blocks, schedule_blocks(blocks, concurrent=concurrent, max_workers=4)]:
+        simulation.model.state_update_blocks = state_update_blocks
+        np.random.seed(1)
+        random.seed(1)
+        simulation.run()
+        results.append(pd.DataFrame(simulation.results).drop(columns=["substep"]))
+
+    assert len(schedule_blocks(blocks)) < len(blocks)
+    assert results[0]["unassigned_rewards_ratio"].max() > 0
+    assert_results_equal(*results)
+
+
+def test_random_event_handler():
+    events_block = {
+        "policies": {"scheduled_events": policy_scheduled_events},
+        "variables": {"unassigned_rewards_ratio": update_from_optional_signal("unassigned_rewards_ratio")},
+    }
+    blocks = [
+        block(policy_random, "c"),
+        events_block,
+        {"policies": {"policy": policy_random}, "variables": {"e": update_from_signal("e", "c")}},
+    ]
+    # The event handler draws random numbers in the same substep as the last block
+    assert block_substeps(blocks) == [0, 1, 1]
+    assert block_access(events_block).random
+
+    results = []
+    for state_update_blocks in [blocks, schedule_blocks(blocks, concurrent=True, max_workers=4)]:
+        simulation = Simulation(
+            model=Model(
+                initial_state={"c": 0.0, "e": 0.0, "unassigned_rewards_ratio": 0.0},
+                state_update_blocks=state_update_blocks,
+                params={"scheduled_events": [[ScheduledEvent(handler=event_random_ratio, predicate=lambda params, state: True)]]},
+            ),
+            timesteps=20,
+            runs=1,
+        )
+        np.random.seed(1)
+        simulation.run()
+        results.append(pd.DataFrame(simulation.results).drop(columns=["substep"]).groupby("timestep").last())
+
+    assert_results_equal(*results)
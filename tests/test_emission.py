@@ -0,0 +1,65 @@
+import datetime
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from model.emission import emission_df, treasury_unlock_df
+
+
+DATE_START = datetime.date(2023, 1, 1)
+
+
+def test_emission_grid():
+    df = emission_df(
+        validator_rates=(0.01, 0.02),
+        treasury_rates=(0.01,),
+        constant_years=(5, 10),
+        decay_years=(np.inf, 3),
+        date_start=DATE_START,
+    )
+
+    assert len(df) == 2 * 1 * 2 * 2 * 180
+    # Before the horizon, the rates are constant
+    constant = df[df["timestamp"].dt.year - DATE_START.year < df["constant_years"]]
+    assert_allclose(constant["validator_emission"], constant["validator_rate"])
+    # Without decay, the rates are constant
+    assert_allclose(df[df["decay_years"] == np.inf]["treasury_emission"], 0.01)
+    # Decaying rates reach zero after the decay years
+    decayed = df[(df["decay_years"] == 3) & (df["timestamp"].dt.year - DATE_START.year >= df["constant_years"] + 3)]
+    assert len(decayed) > 0 and (decayed["validator_emission"] == 0).all()
+
+
+def test_emission_supply():
+    df = emission_df(decay_years=(np.inf,), date_start=DATE_START, initial_supply=100.0)
+
+    assert_allclose(df["polygn_supply"].iloc[-1], 100.0 * (1 + 0.02 / 12) ** 180)
+
+
+def test_emission_cache_copy():
+    df = emission_df(date_start=DATE_START)
+    df["validator_emission"] = 0
+
+    assert (emission_df(date_start=DATE_START)["validator_emission"] > 0).any()
+
+
+def test_treasury_unlocks():
+    df = treasury_unlock_df(
+        unlock_processes=(lambda _run, _epoch: 0.0, lambda _run, _epoch: 0.05),
+        initial_balance=10.0,
+        validator_rates=(0.01, 0.02),
+        decay_years=(np.inf, 3),
+        date_start=DATE_START,
+        initial_supply=100.0,
+    )
+
+    assert len(df) == 2 * 2 * 2 * 180
+    for (_validator_rate, _decay_years, unlock_schedule), curve in df.groupby(["validator_rate", "decay_years", "unlock_schedule"]):
+        total_balance = 10.0 + curve["treasury_inflow"].cumsum()
+        # The treasury balance is conserved, and nothing is unlocked without an unlock schedule
+        assert_allclose(curve["treasury_balance_locked"] + curve["treasury_balance_unlocked"], total_balance)
+        if unlock_schedule == 0:
+            assert_allclose(curve["treasury_balance_locked"], total_balance)
+        else:
+            assert_allclose(curve["treasury_balance_locked"].iloc[0], (10.0 + curve["treasury_inflow"].iloc[0]) * 0.95)
+    # The treasury emission of the first month is minted from the initial supply
+    assert_allclose(df["treasury_inflow"].iloc[0], 100.0 * 0.01 / 12)
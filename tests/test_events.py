@@ -0,0 +1,120 @@
+import copy
+import random
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from radcad.core import generate_parameter_sweep
+
+import experiments.default_experiment as base
+from model.parts.utils import staking_matrix
+from model.parts.events import ScheduledEvent, policy_scheduled_events
+from model.simulation_calendar import simulation_calendar
+from model.state_variables import initial_state
+from model.system_parameters import parameters
+
+
+def run_scheduled_events(scheduled_events, timesteps=10):
+    params = generate_parameter_sweep(parameters)[0]
+    params["scheduled_events"] = scheduled_events
+    state = copy.deepcopy(initial_state)
+    state["unassigned_rewards_ratio"] = 0.0
+
+    fired = []
+    for timestep in range(1, timesteps + 1):
+        state["timestep"] = timestep
+        signals = policy_scheduled_events(params, 1, [], state)
+        state.update(signals)
+        fired.append(signals.get("polygn_staked"))
+    return params, fired
+
+
+def handler(params, substep, state_history, previous_state):
+    return {"polygn_staked": previous_state["timestep"], "unassigned_rewards_ratio": 0.5}
+
+
+def test_timestep_and_predicate_triggers():
+    _, fired = run_scheduled_events([
+        ScheduledEvent(handler=handler, timestep=3),
+        ScheduledEvent(handler=handler, predicate=lambda params, state: state["timestep"] % 5 == 0),
+    ])
+
+    assert fired == [None, None, 3, None, 5, None, None, None, None, 10]
+
+
+def test_date_trigger():
+    params = generate_parameter_sweep(parameters)[0]
+    calendar = simulation_calendar(params["date_start"], params["dt"])
+    date = calendar.timestamp(4) - timedelta(hours=1)
+
+    _, fired = run_scheduled_events([ScheduledEvent(handler=handler, date=date)])
+
+    # The timestamp at a timestep is that of the previous timestep
+    assert fired == [None, None, None, None, 5, None, None, None, None, None]
+
+
+def test_pulse_reset():
+    params = generate_parameter_sweep(parameters)[0]
+    params["scheduled_events"] = [
+        ScheduledEvent(handler=handler, timestep=2, pulse={"unassigned_rewards_ratio": 0.0})
+    ]
+    state = copy.deepcopy(initial_state)
+    state["unassigned_rewards_ratio"] = 0.0
+
+    ratios = []
+    for timestep in range(1, 5):
+        state["timestep"] = timestep
+        signals = policy_scheduled_events(params, 1, [], state)
+        # Non-firing timesteps don't update any State Variables
+        assert timestep in (2, 3) or signals == {}
+        state.update(signals)
+        ratios.append(state["unassigned_rewards_ratio"])
+
+    assert ratios == [0.0, 0.5, 0.0, 0.0]
+
+
+def test_unknown_state_variable():
+    with pytest.raises(ValueError):
+        run_scheduled_events([
+            ScheduledEvent(handler=lambda *args: {"polygn_supply": 0}, timestep=1)
+        ])
+
+
+def test_slashing_validator_groups():
+    simulation = copy.deepcopy(base.experiment.simulations[0])
+    simulation.timesteps = 6
+    simulation.runs = 1
+    params = simulation.model.params
+    calendar = simulation_calendar(params["date_start"][0], params["dt"][0])
+    params["date_slashing"] = [calendar.timestamp(3) - timedelta(hours=1)]
+
+    np.random.seed(1)
+    random.seed(1)
+    df = pd.DataFrame(simulation.run())
+    df = df[df.substep == df.substep.max()].set_index("timestep")
+
+    # Before the slashing, no validators deviate, and all inflation goes to the normal group
+    for timestep in [1, 2, 3]:
+        assert not np.any(df.loc[timestep, "validator_group_by_event"])
+        assert df.loc[timestep, "total_inflation_to_validators_deviate"] == 0
+        assert 0 < df.loc[timestep, "total_inflation_to_validators_normal"] < df.loc[timestep, "total_inflation_to_validators"]
+
+    # At the slashing, the validators staking on the slashed chain deviate, for the rest of the run
+    staking_metrics = df.loc[3, "staking_metrics"]
+    group = df.loc[4, "validator_group_by_event"]
+    assert any(
+        np.array_equal(group, staking_matrix.chain(staking_metrics, chain_id) != 0) for chain_id in [0, 1, 2]
+    )
+    for timestep in [4, 5, 6]:
+        np.testing.assert_array_equal(df.loc[timestep, "validator_group_by_event"], group)
+        inflation = df.loc[timestep]
+        assert inflation["total_inflation_to_validators_deviate"] > 0
+        assert (
+            inflation["total_inflation_to_validators_normal"] + inflation["total_inflation_to_validators_deviate"]
+            < inflation["total_inflation_to_validators"]
+        )
+        # The normal group is empty when the slashed chain is staked on by all validators
+        assert inflation["total_inflation_to_validators_normal"] >= 0
+        if np.all(group):
+            assert inflation["total_inflation_to_validators_normal"] == 0
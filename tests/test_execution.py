@@ -0,0 +1,165 @@
+import datetime
+import os
+import random
+from copy import deepcopy
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pytest
+from radcad import Simulation
+
+import experiments.templates.time_domain_analysis as time_domain_analysis
+from experiments.execution import (
+    ParameterChange, divergence_timestep, load_checkpoint, run_checkpointed, run_forked, run_from
+)
+from tests.utils import assert_results_equal
+
+
+DATE_START = datetime.datetime(2023, 1, 1)
+
+
+def test_run_from_initial_state():
+    simulation: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation.timesteps = 20
+    simulation.engine.deepcopy = False
+    simulation.engine.drop_substeps = True
+
+    np.random.seed(1)
+    random.seed(1)
+    df_1 = pd.DataFrame(simulation.run())
+
+    np.random.seed(1)
+    random.seed(1)
+    initial_state = {
+        **deepcopy(simulation.model.initial_state),
+        "simulation": 0, "subset": 0, "run": 1, "substep": 0, "timestep": 0,
+    }
+    results = [[initial_state]] + run_from(
+        initial_state,
+        simulation.model.state_update_blocks,
+        {key: value[0] for key, value in simulation.model.params.items()},
+        simulation.timesteps,
+    )
+    df_2 = pd.DataFrame([state for timestep in results for state in timestep])
+
+    assert_results_equal(df_1, df_2)
+
+
+def test_divergence_timestep():
+    params = {"date_start": DATE_START, "dt": 225, "date_slashing": DATE_START + datetime.timedelta(days=10)}
+
+    assert divergence_timestep(params, dict(params)) == np.inf
+    assert divergence_timestep(params, {**params, "dt": 1}) == 0
+    assert divergence_timestep(params, {**params, "date_slashing": DATE_START + datetime.timedelta(days=20)}) == 12
+    assert divergence_timestep({**params, "date_pos": DATE_START}, {**params, "date_pos": DATE_START + datetime.timedelta(days=90)}) == np.inf
+
+
+def constant(value, _run, _timestep):
+    return value
+
+
+def test_divergence_timestep_processes():
+    params = {"date_start": DATE_START, "dt": 225, "validator_process": partial(constant, 3.0)}
+
+    assert divergence_timestep(params, {**params, "validator_process": partial(constant, 3.0)}) == np.inf
+    assert divergence_timestep(params, {**params, "validator_process": partial(constant, 4.0)}) == 0
+    assert divergence_timestep(params, {**params, "validator_process": lambda _run, _timestep: 3.0}) == 0
+
+
+def test_checkpoint_resume(tmp_path):
+    simulation: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation.timesteps = 30
+    simulation.runs = 2
+
+    np.random.seed(1)
+    random.seed(1)
+    df_1 = pd.DataFrame(run_checkpointed(simulation))
+
+    # Interrupt the simulation after 10 timesteps of the first run
+    checkpoint_path = tmp_path / "checkpoint.pkl.gz"
+    simulation.timesteps = 10
+    simulation.runs = 1
+    np.random.seed(1)
+    random.seed(1)
+    run_checkpointed(simulation, checkpoint_path=checkpoint_path, checkpoint_interval=5)
+    assert load_checkpoint(checkpoint_path)["results"][(0, 0, 0)][-1][-1]["timestep"] == 10
+
+    simulation.timesteps = 30
+    simulation.runs = 2
+    np.random.seed(2)
+    random.seed(2)
+    df_2 = pd.DataFrame(run_checkpointed(simulation, resume_from=checkpoint_path))
+
+    assert_results_equal(df_1, df_2)
+
+
+def test_checkpoint_history(tmp_path):
+    simulation: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation.timesteps = 20
+    checkpoint_path = tmp_path / "checkpoint.pkl.gz"
+
+    run_checkpointed(simulation, checkpoint_path=checkpoint_path, checkpoint_interval=10)
+    checkpoint_size = os.path.getsize(checkpoint_path)
+    history_size = os.path.getsize(f"{checkpoint_path}.history")
+    simulation.timesteps = 40
+    run_checkpointed(simulation, checkpoint_path=checkpoint_path, checkpoint_interval=10, resume_from=checkpoint_path)
+
+    # Only the latest state is rewritten, and the history is appended to
+    assert os.path.getsize(checkpoint_path) < 1.5 * checkpoint_size
+    assert os.path.getsize(f"{checkpoint_path}.history") > 1.5 * history_size
+    results = load_checkpoint(checkpoint_path)["results"][(0, 0, 0)]
+    assert [substeps[-1]["timestep"] for substeps in results] == list(range(41))
+
+    # Runs with different System Parameters are not resumed
+    simulation.model.params["slashing_fraction"] = [0.2]
+    with pytest.raises(ValueError, match="slashing_fraction"):
+        run_checkpointed(simulation, resume_from=checkpoint_path)
+
+
+def test_run_forked():
+    simulation: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation.timesteps = 30
+    simulation.model.params.update({
+        "date_start": [DATE_START],
+        "date_slashing": [DATE_START + datetime.timedelta(days=days) for days in [10, 20, 5]],
+    })
+
+    np.random.seed(1)
+    random.seed(1)
+    df_1 = pd.DataFrame(run_checkpointed(simulation))
+    np.random.seed(1)
+    random.seed(1)
+    df_2 = pd.DataFrame(run_forked(simulation))
+
+    assert len(df_2) == len(df_1)
+    assert (df_2["subset"].to_numpy() == df_1["subset"].to_numpy()).all()
+    # The first subset is simulated from timestep 0
+    assert_results_equal(df_1.query("subset == 0"), df_2.query("subset == 0"))
+    # The second subset is forked from the first before the earlier slashing date
+    subsets = [df_2.query(f"subset == {subset}").drop(columns=["subset"]).reset_index(drop=True) for subset in range(3)]
+    assert_results_equal(subsets[0].iloc[:11], subsets[1].iloc[:11])
+    assert_results_equal(subsets[0].iloc[:6], subsets[2].iloc[:6])
+
+
+def test_run_forked_parameter_change():
+    simulation: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation.timesteps = 20
+    simulation.model.params.update({
+        "polygn_staked_process": [lambda _run, _timestep: 3e9],
+        "inflation_sqrt_numerator": [5e4, ParameterChange(5e4, 1e5, 10)],
+    })
+
+    np.random.seed(1)
+    random.seed(1)
+    df_1 = pd.DataFrame(run_checkpointed(simulation))
+    np.random.seed(1)
+    random.seed(1)
+    df_2 = pd.DataFrame(run_forked(simulation))
+
+    # The changed subset is forked from the first before the change, and its inflation doubles from the change
+    assert_results_equal(df_1.query("subset == 0"), df_2.query("subset == 0"))
+    subsets = [df_2.query(f"subset == {subset}").drop(columns=["subset"]).reset_index(drop=True) for subset in range(2)]
+    assert_results_equal(subsets[0].iloc[:10], subsets[1].iloc[:10])
+    inflation = [subset.set_index("timestep")["total_inflation_to_validators"] for subset in subsets]
+    assert ((inflation[1] / inflation[0]).loc[10:] > 1.5).all()
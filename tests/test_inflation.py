@@ -0,0 +1,79 @@
+import copy
+
+import numpy as np
+from numpy.testing import assert_allclose
+from radcad.core import generate_parameter_sweep
+
+import model.constants as constants
+import model.parts.hub_system as hub
+from model.state_variables import initial_state
+from model.system_parameters import parameters
+
+
+def inflation_state(timestep=1, event=False):
+    state = copy.deepcopy(initial_state)
+    state.update({"run": 1, "timestep": timestep})
+    rng = np.random.default_rng(1)
+    chains, validators = state["staking_metrics"].shape
+    state["staking_metrics"] = rng.uniform(1e6, 1e7, (chains, validators))
+    state["liveness_metrics"] = rng.binomial(100, constants.validator_liveness, (chains, validators)) / 100
+    if event:
+        state["validator_group_by_event"] = rng.binomial(1, 0.5, validators)
+        state["unassigned_rewards_ratio"] = 0.01
+    return state
+
+
+def staked_params(**overrides):
+    params = generate_parameter_sweep(parameters)[0]
+    params.update({
+        "polygn_staked_process": lambda _run, timestep: 3e9 + timestep,
+        "inflation_sqrt_numerator": 5e4,
+        **overrides,
+    })
+    return params
+
+
+def test_policy_inflation_before_event():
+    params = staked_params()
+    state = inflation_state(timestep=17)
+
+    result = hub.policy_inflation(params, 0, [], state)
+
+    rate = 5e4 / (params["polygn_staked_process"](1, 17 * params["dt"]) ** 0.5) * constants.gwei
+    online_ratio = (state["staking_metrics"] * state["liveness_metrics"]).sum() / state["staking_metrics"].sum()
+    expected = state["polygn_supply"] * rate / constants.epochs_per_year * params["dt"] * online_ratio
+    assert_allclose(result["total_inflation_to_validators"], expected, rtol=1e-12)
+    assert_allclose(result["total_inflation_to_validators_normal"], expected * online_ratio, rtol=1e-12)
+    assert result["total_inflation_to_validators_deviate"] == 0
+
+
+def test_expected_liveness_inflation():
+    expected_params = staked_params(expected_liveness_inflation=True)
+    state = inflation_state()
+
+    result = hub.policy_inflation(expected_params, 0, [], state)
+    sampled = hub.policy_inflation(staked_params(), 0, [], state)
+
+    assert_allclose(
+        result["total_inflation_to_validators"] / sampled["total_inflation_to_validators"], 1, rtol=0.01
+    )
+    assert result["total_inflation_to_validators_deviate"] == 0
+
+    # Falls back to the liveness draws once an event splits the validators
+    state = inflation_state(event=True)
+    assert hub.policy_inflation(expected_params, 0, [], state) == hub.policy_inflation(staked_params(), 0, [], state)
+
+
+def test_policy_inflation_process_table():
+    # A process table only extends to the simulated timesteps
+    table = 3e9 + np.arange(101)
+    dt = staked_params()["dt"]
+    params = staked_params(polygn_staked_process=lambda _run, timestep: table[timestep // dt])
+    state = inflation_state(timestep=100)
+
+    result = hub.policy_inflation(params, 0, [], state)
+
+    rate = 5e4 / (table[100] ** 0.5) * constants.gwei
+    online_ratio = (state["staking_metrics"] * state["liveness_metrics"]).sum() / state["staking_metrics"].sum()
+    expected = state["polygn_supply"] * rate / constants.epochs_per_year * params["dt"] * online_ratio
+    assert_allclose(result["total_inflation_to_validators"], expected, rtol=1e-12)
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from experiments.job_queue import JobQueue, run_distributed
+from experiments.scheduler import run_parallel
+from model.stochastic_processes import share_process_realizations
+from tests.utils import assert_results_equal, sweep_simulation
+
+
+def test_run_distributed(tmp_path):
+    simulation = sweep_simulation()
+
+    df_1 = pd.DataFrame(run_parallel(simulation, processes=2, seed=1, progress=False))
+    df_2 = pd.DataFrame(run_distributed(simulation, tmp_path / "queue", workers=2, seed=1, poll_interval=0))
+
+    # Tasks are seeded from the task, so the results don't depend on the backend
+    assert_results_equal(df_1, df_2)
+
+
+def test_retry_expired_claim(tmp_path):
+    queue = JobQueue(tmp_path / "queue")
+    queue.submit(sweep_simulation(), seed=1)
+
+    # A worker claims a task and dies
+    task_id = queue.claim()
+    assert queue.requeue_expired(lease=60) == 0
+    expired = time.time() - 120
+    os.utime(queue._path("claimed", task_id), (expired, expired))
+    assert queue.requeue_expired(lease=60) == 1
+
+    # Resubmitting doesn't duplicate tasks
+    assert len(queue.submit(sweep_simulation(), seed=1)) == 4
+    assert len(os.listdir(tmp_path / "queue" / "tasks")) == 4
+
+    queue.work()
+    assert queue.is_complete()
+    assert len(queue.results()) == 4 * 11
+
+
+def test_process_tables_in_queue(tmp_path):
+    table = share_process_realizations([[1, 2], [2, 1]], directory=tmp_path)
+    simulation = sweep_simulation()
+    simulation.model.params["Adoption_speed_process"] = [lambda run, _timestep: table[run - 1][0]]
+
+    queue = JobQueue(tmp_path / "queue")
+    queue.submit(simulation, seed=1)
+    assert len(os.listdir(tmp_path / "queue" / "tables")) == 1
+
+    # Workers read the copy in the queue, e.g. after the published file is removed or on another node
+    os.remove(table.path)
+    queue.work()
+    assert queue.is_complete()
+    assert len(queue.results()) == 2 * 11
+
+
+def test_changed_task_resubmitted(tmp_path):
+    queue = JobQueue(tmp_path / "queue")
+    task_ids = queue.submit(sweep_simulation(), seed=1)
+    queue.work()
+
+    # A changed Experiment doesn't reuse the results of the tasks it changed
+    simulation = sweep_simulation()
+    simulation.model.params["slashing_fraction"] = [0.2]
+    assert set(queue.submit(simulation, seed=1)).isdisjoint(task_ids)
+    assert len(os.listdir(tmp_path / "queue" / "tasks")) == 4
+    assert queue.submit(sweep_simulation(), seed=2)[0] != task_ids[0]
+    assert queue.submit(sweep_simulation(), seed=1) == task_ids
+
+
+def test_resubmitted_without_seed(tmp_path):
+    queue = JobQueue(tmp_path / "queue")
+    task_ids = queue.submit(sweep_simulation())
+    queue.work()
+
+    # Resubmitting after a crash reuses the seed of the queue, and so the completed tasks
+    assert JobQueue(tmp_path / "queue").submit(sweep_simulation()) == task_ids
+    assert not os.listdir(tmp_path / "queue" / "tasks")
+
+    # Pending tasks of an earlier submission are removed, and so are its expired claims
+    queue.submit(sweep_simulation(), seed=1)
+    assert len(os.listdir(tmp_path / "queue" / "tasks")) == 4
+    claimed_task_id = queue.claim()
+    expired = time.time() - 120
+    os.utime(queue._path("claimed", claimed_task_id), (expired, expired))
+    simulation = sweep_simulation()
+    simulation.model.params["slashing_fraction"] = [0.2]
+    changed_task_ids = queue.submit(simulation)
+    assert sorted(os.listdir(tmp_path / "queue" / "tasks")) == sorted(f"{task_id}.pkl" for task_id in changed_task_ids)
+    assert queue.requeue_expired(lease=60) == 0
+    assert not os.listdir(tmp_path / "queue" / "claimed")
+
+
+def test_lease_renewed(tmp_path):
+    queue = JobQueue(tmp_path / "queue", heartbeat=0.05)
+    queue.submit(sweep_simulation(), seed=1)
+    task_id = queue.claim()
+    expired = time.time() - 120
+    os.utime(queue._path("claimed", task_id), (expired, expired))
+
+    # A long-running task renews its lease
+    done = threading.Event()
+    heartbeat = threading.Thread(target=queue._renew_lease, args=(task_id, done))
+    heartbeat.start()
+    time.sleep(0.2)
+    assert queue.requeue_expired(lease=60) == 0
+    done.set()
+    heartbeat.join()
@@ -0,0 +1,57 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+from scipy import sparse
+
+from model.parts.utils.kernels import attack_sets, clamp_slashed_stakes, sparse_attack_sets
+
+
+def random_staking_metrics(chains=50, validators=100, seed=1):
+    rng = np.random.default_rng(seed)
+    staking_metrics = rng.poisson(5, (chains, validators)) * 1_000_000.0
+    # Sparse private chains, duplicate stakes, and a chain without stake
+    staking_metrics[10:] *= rng.binomial(1, 0.15, (chains - 10, validators))
+    staking_metrics[5] = 1_000_000.0
+    staking_metrics[6] = 0.0
+    return staking_metrics
+
+
+def test_attack_sets_kernels_equivalent():
+    staking_metrics = random_staking_metrics()
+
+    numpy_result = attack_sets(staking_metrics, 100, use_numba=False)
+    loop_result = attack_sets(staking_metrics, 100, use_numba=True)
+
+    for numpy_array, loop_array in zip(numpy_result, loop_result):
+        assert_array_equal(numpy_array, loop_array)
+
+
+def test_sparse_attack_sets_kernels_equivalent():
+    staking_metrics = sparse.csr_matrix(random_staking_metrics())
+
+    numpy_result = sparse_attack_sets(staking_metrics, 100, use_numba=False)
+    loop_result = sparse_attack_sets(staking_metrics, 100, use_numba=True)
+
+    for numpy_array, loop_array in zip(numpy_result, loop_result):
+        assert_array_equal(numpy_array, loop_array)
+
+
+def test_clamp_slashed_stakes_kernels_equivalent():
+    staking_metrics = random_staking_metrics()
+    polygn_staked_per_validator = staking_metrics.max(axis=0) * 1.5
+    slashing_amount = staking_metrics[0] * 0.9
+
+    numpy_staking_metrics = staking_metrics.copy()
+    numpy_polygn_staked_per_validator = polygn_staked_per_validator.copy()
+    clamp_slashed_stakes(
+        numpy_staking_metrics, numpy_polygn_staked_per_validator, slashing_amount, use_numba=False
+    )
+
+    loop_staking_metrics = staking_metrics.copy()
+    loop_polygn_staked_per_validator = polygn_staked_per_validator.copy()
+    clamp_slashed_stakes(
+        loop_staking_metrics, loop_polygn_staked_per_validator, slashing_amount, use_numba=True
+    )
+
+    assert_array_equal(numpy_staking_metrics, loop_staking_metrics)
+    assert_array_equal(numpy_polygn_staked_per_validator, loop_polygn_staked_per_validator)
+    assert (numpy_staking_metrics <= numpy_polygn_staked_per_validator).all()
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+
+from experiments.monte_carlo import MonteCarloStatistics, P2Quantiles
+
+
+def run_dfs(runs=200, timesteps=5):
+    rng = np.random.default_rng(1)
+    for run in range(1, runs + 1):
+        df = pd.DataFrame({
+            "run": run,
+            "subset": np.repeat([0, 1], timesteps),
+            "timestep": np.tile(np.arange(1, timesteps + 1), 2),
+            "timestamp": np.tile(pd.date_range("2023-01-01", periods=timesteps), 2),
+            "polygn_staked": rng.normal(np.repeat([0.0, 10.0], timesteps), 1.0),
+            "monoply_51": rng.random(2 * timesteps),
+        })
+        df.loc[rng.random(2 * timesteps) < 0.1, "monoply_51"] = np.nan
+        yield df
+
+
+def test_p2_quantiles():
+    rng = np.random.default_rng(1)
+    samples = rng.uniform(size=(5_000, 10))
+    estimator = P2Quantiles(0.9, 10)
+    for observations in samples:
+        estimator.add(observations)
+
+    assert_allclose(estimator.estimate(), np.quantile(samples, 0.9, axis=0), atol=0.02)
+
+
+def test_monte_carlo_statistics():
+    dfs = list(run_dfs())
+    statistics = MonteCarloStatistics(["polygn_staked", "monoply_51"], quantiles=(0.5,))
+    for df in dfs:
+        statistics.add(df)
+
+    df = statistics.statistics()
+    expected = pd.concat(dfs).groupby(["subset", "timestep"])
+    for metric in ["polygn_staked", "monoply_51"]:
+        assert_allclose(df[(metric, "mean")], expected[metric].mean())
+        assert_allclose(df[(metric, "std")], expected[metric].std())
+        assert_allclose(df[(metric, "count")], expected[metric].count())
+        assert_allclose(df[(metric, "q0.5")], expected[metric].median(), atol=0.2)
+
+    frames = statistics.frames()
+    assert list(frames) == [0, 1]
+    assert list(frames[1].columns) == ["timestep", "timestamp", "polygn_staked", "monoply_51"]
+    assert_allclose(frames[1]["polygn_staked"], 10, atol=0.3)
+
+
+def test_confidence_interval_width():
+    statistics = MonteCarloStatistics(["polygn_staked", "monoply_51"])
+    dfs = run_dfs(runs=100)
+    for df in dfs:
+        statistics.add(df)
+
+    width = statistics.confidence_interval_width(confidence=0.95)
+
+    # The standard deviation of polygn_staked is 1
+    assert_allclose(width["polygn_staked"], 2 * 1.96 / np.sqrt(100), rtol=0.2)
+
+
+def test_monte_carlo_statistics_simulations():
+    # Two Simulations with the same subsets and timesteps, folded one DataFrame of both per run
+    dfs = [
+        pd.concat([df_0.assign(simulation=0), df_1.assign(simulation=1, polygn_staked=df_1["polygn_staked"] + 100)])
+        for df_0, df_1 in zip(run_dfs(runs=50), run_dfs(runs=50))
+    ]
+    statistics = MonteCarloStatistics(["polygn_staked"], quantiles=(0.5,))
+    for df in dfs:
+        # Every substep of a timestep, of which only the last is observed
+        statistics.add(pd.concat([df.assign(polygn_staked=np.nan), df]).sort_values("timestep", kind="stable"))
+
+    df = statistics.statistics()
+    expected = pd.concat(dfs).groupby(["simulation", "subset", "timestep"])
+    assert list(df.index.names) == ["simulation", "subset", "timestep"]
+    assert_allclose(df[("polygn_staked", "mean")], expected["polygn_staked"].mean())
+    assert_allclose(df[("polygn_staked", "count")], 50)
+    assert statistics.runs == 50 * 2 * 2
+    assert_allclose(statistics.frames(simulation=1)[0]["polygn_staked"], 100, atol=0.5)
@@ -1,11 +1,15 @@
 import pytest
 from copy import deepcopy
+import random
 import time
+import numpy as np
 import pandas as pd
 from pandas._testing import assert_frame_equal
 from radcad import Simulation
 
 import experiments.templates.time_domain_analysis as time_domain_analysis
+from model.utils import copy_on_write, writes
+from tests.utils import assert_results_equal
 
 
 def test_deepcopy():
@@ -24,3 +28,44 @@ def test_deepcopy():
 
     assert exec_time_1 > exec_time_2
     assert_frame_equal(df_1, df_2)
+
+
+def test_copy_on_write_policy():
+    state = {"a": np.zeros(3), "b": np.zeros(3), "c": 0}
+
+    @writes("a")
+    def policy(params, substep, state_history, previous_state):
+        previous_state["a"] += 1
+        return {"a": previous_state["a"], "b": previous_state["b"]}
+
+    signals = copy_on_write(policy)({}, 0, [], state)
+
+    assert (state["a"] == 0).all()
+    assert (signals["a"] == 1).all()
+    # Unchanged arrays are passed on as the original array, not the read-only view
+    assert signals["b"] is state["b"]
+
+    def undeclared_write_policy(params, substep, state_history, previous_state):
+        previous_state["b"] += 1
+        return {}
+
+    with pytest.raises(ValueError):
+        copy_on_write(undeclared_write_policy)({}, 0, [], state)
+
+
+def test_copy_on_write_without_deepcopy():
+    simulation_1: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation_2: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation_1.timesteps = simulation_2.timesteps = 40
+
+    simulation_1.engine.deepcopy = True
+    np.random.seed(1)
+    random.seed(1)
+    df_1 = pd.DataFrame(simulation_1.run())
+
+    simulation_2.engine.deepcopy = False
+    np.random.seed(1)
+    random.seed(1)
+    df_2 = pd.DataFrame(simulation_2.run())
+
+    assert_results_equal(df_1, df_2)
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from experiments.optimization import CMAES, Constraint, EvaluationCache, Objective, optimize, pareto_front
+from experiments.sweeps import Dimension
+
+
+DIMENSIONS = [
+    Dimension("inflation_sqrt_numerator", 0, 1e5),
+    Dimension("inflationary_rate_per_year", 0, 0.1),
+]
+
+
+def evaluate(table):
+    numerator, rate = table["inflation_sqrt_numerator"] / 1e5, table["inflationary_rate_per_year"]
+    return pd.DataFrame({
+        "total_profit_yields_pct": 10 * rate + 5 * numerator,
+        "supply_inflation": rate + 0.05 * numerator,
+        "monoply_51": 0.5 - 0.2 * numerator,
+    })
+
+
+def test_cmaes():
+    strategy = CMAES(np.full(4, 0.5), 0.3, seed=1)
+    for _ in range(200):
+        candidates = strategy.ask()
+        loss = ((candidates - [0.1, 0.2, 0.3, 0.4]) ** 2).sum(axis=1)
+        strategy.tell(np.argsort(np.argsort(loss)))
+
+    np.testing.assert_allclose(strategy.mean, [0.1, 0.2, 0.3, 0.4], atol=1e-4)
+
+
+def test_pareto_front():
+    evaluations = pd.DataFrame({"a": [1, 2, 3, 2, 0], "b": [3, 2, 1, 3, 0], "c": [0, 0, 0, 0, 1]})
+
+    front = pareto_front(evaluations, [Objective("a"), Objective("b")], [Constraint("c", high=0.5)])
+
+    assert list(front.index) == [0, 1, 2]
+
+
+def test_optimize(tmp_path):
+    objectives = [Objective("total_profit_yields_pct", "band", low=0.5, high=0.6), Objective("monoply_51", weight=0.1)]
+    constraints = [Constraint("supply_inflation", high=0.05)]
+    cache_path = str(tmp_path / "evaluations.pkl")
+    evaluated = []
+
+    def counting_evaluate(table):
+        evaluated.append(len(table))
+        return evaluate(table)
+
+    front, evaluations = optimize(
+        counting_evaluate, DIMENSIONS, objectives, constraints, cache_path, max_evaluations=300, seed=1
+    )
+
+    assert sum(evaluated) == len(evaluations) <= 300
+    best = evaluations.loc[evaluations.query("violation == 0")["loss"].idxmin()]
+    # Maximum decentralization in the yield band, at inflation_sqrt_numerator = 12000
+    assert 0.5 - 1e-3 <= best["total_profit_yields_pct"] <= 0.6 + 1e-3
+    assert best["supply_inflation"] <= 0.05
+    assert best["monoply_51"] < 0.477
+    assert len(front) > 0 and (front["supply_inflation"] <= 0.05).all()
+
+    # Rerun from the cache
+    front_cached, _ = optimize(
+        counting_evaluate, DIMENSIONS, objectives, constraints, cache_path, max_evaluations=300, seed=1
+    )
+    assert sum(evaluated) == len(evaluations)
+    pd.testing.assert_frame_equal(front_cached, front)
+
+
+def test_evaluation_cache(tmp_path):
+    cache = EvaluationCache(str(tmp_path / "evaluations.pkl"), evaluate, ["inflation_sqrt_numerator", "inflationary_rate_per_year"])
+    table = pd.DataFrame({"inflation_sqrt_numerator": [1.0, 2.0, 1.0], "inflationary_rate_per_year": [0.1, 0.2, 0.1]})
+
+    pd.testing.assert_frame_equal(cache(table), evaluate(table))
+    assert cache.evaluated_points == 2
+    reloaded = EvaluationCache(cache.path, evaluate, cache.parameters)
+    pd.testing.assert_frame_equal(reloaded(table.iloc[::-1]), evaluate(table.iloc[::-1]))
+    assert reloaded.evaluated_points == 0
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from experiments.post_processing import aggregate_df_in_multi_sims, aggregate_statistics
+
+
+def replicate_dfs(replicates=5, timesteps=10):
+    rng = np.random.default_rng(1)
+    dfs = []
+    for _ in range(replicates):
+        df = pd.DataFrame({
+            "timestamp": np.tile(pd.date_range("2023-01-01", periods=timesteps), 2),
+            "subset": np.repeat([0, 1], timesteps),
+            "polygn_staked": rng.normal(size=2 * timesteps),
+            "stage": "ALL",
+        })
+        df.loc[rng.random(2 * timesteps) < 0.2, "polygn_staked"] = np.nan
+        dfs.append(df)
+    return dfs
+
+
+def test_aggregate_df_in_multi_sims():
+    dfs = replicate_dfs()
+
+    agg_dfs = aggregate_df_in_multi_sims(df for df in dfs)
+
+    for subset, agg_df in agg_dfs.items():
+        expected = pd.concat([df.query(f"subset == {subset}") for df in dfs]).groupby("timestamp").mean(numeric_only=True).reset_index()
+        pd.testing.assert_frame_equal(agg_df, expected, check_dtype=False)
+
+
+def test_aggregate_statistics():
+    dfs = replicate_dfs()
+
+    statistics = aggregate_statistics(dfs, quantiles=(0.5,))
+
+    values = pd.concat(dfs).groupby(["subset", "timestamp"])["polygn_staked"]
+    pd.testing.assert_series_equal(statistics[("polygn_staked", "std")], values.std(), check_names=False)
+    pd.testing.assert_series_equal(statistics[("polygn_staked", "q0.5")], values.median(), check_names=False)
@@ -0,0 +1,49 @@
+import copy
+
+import numpy as np
+from numpy.testing import assert_allclose
+from radcad.core import generate_parameter_sweep
+
+import model.parts.hub_system as hub
+import model.parts.decentralization as decentralization
+from model.parts.utils.precision import COMPACT_DTYPES, compact_state
+from model.state_variables import initial_state
+from model.system_parameters import parameters
+from model.types import Precision
+
+
+RELATIVE_TOLERANCE = 1e-6
+
+
+def float64_state():
+    state = copy.deepcopy(initial_state)
+    state.update({"run": 1, "timestep": 1})
+    rng = np.random.default_rng(1)
+    state["liveness_metrics"] = rng.binomial(100, 0.95, state["staking_metrics"].shape) / 100
+    state["validator_group_by_event"] = rng.binomial(1, 0.5, state["staking_metrics"].shape[1])
+    state["unassigned_rewards_ratio"] = 0.01
+    return state
+
+
+def test_compact_state_dtypes():
+    state = compact_state(float64_state())
+
+    for state_variable, dtype in COMPACT_DTYPES.items():
+        assert state[state_variable].dtype == dtype
+
+
+def test_compact_precision_within_tolerance():
+    params = generate_parameter_sweep(parameters)[0]
+    params["state_precision"] = Precision.COMPACT
+    state = float64_state()
+    state.update(decentralization.policy_staking_centralization_metric(params, 0, [], state))
+
+    for policy in [
+        hub.policy_inflation,
+        decentralization.policy_monoply,
+        decentralization.policy_slashable_amount,
+    ]:
+        expected = policy(params, 0, [], copy.deepcopy(state))
+        result = policy(params, 0, [], compact_state(state))
+        for key, value in expected.items():
+            assert_allclose(result[key], value, rtol=RELATIVE_TOLERANCE, err_msg=key)
@@ -0,0 +1,26 @@
+import dill
+import multiprocess
+import numpy as np
+import pytest
+
+from model.stochastic_processes import SharedProcessTable, share_process_realizations
+
+
+def test_shared_process_table():
+    realizations = [np.arange(100_000) * run for run in range(1, 4)]
+    samples = share_process_realizations(realizations)
+    process = lambda run, timestep: samples[run - 1][timestep]
+
+    # Closures pickle the path of the table, not its samples
+    assert len(dill.dumps(process)) < 1_000
+    assert process(2, 10) == 20
+
+    with multiprocess.Pool(2) as pool:
+        assert pool.map(dill.loads, [dill.dumps(process)] * 2)[0](3, 10) == 30
+        assert pool.starmap(process, [(1, 5), (3, 99_999)]) == [5, 299_997]
+
+
+def test_shared_process_table_invalid():
+    with pytest.raises(ValueError):
+        share_process_realizations([[1, 2], [3]])
+    assert isinstance(share_process_realizations([[1, 2], [3, 4]]), SharedProcessTable)
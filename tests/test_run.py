@@ -1,4 +1,12 @@
+import random
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from experiments.default_experiment import experiment
 from experiments.run import run
+from tests.utils import assert_results_equal
 
 
 def test_run():
@@ -8,3 +16,35 @@ def test_run():
 
     _results, _exceptions = run()
     assert True
+
+
+def test_run_incompatible_options():
+    for options in [
+        {"fork": True, "processes": 2},
+        {"fork": True, "checkpoint_path": "checkpoint.pkl.gz"},
+        {"queue_path": "queue", "resume_from": "checkpoint.pkl.gz"},
+        {"processes": 2, "checkpoint_path": "checkpoint.pkl.gz"},
+        {"checkpoint_interval": 10},
+        {"concurrent": True},
+    ]:
+        with pytest.raises(ValueError):
+            run(**options)
+
+
+def test_run_scheduled():
+    simulation = deepcopy(experiment.simulations[0])
+    simulation.timesteps = 10
+    simulation.runs = 2
+    blocks = simulation.model.state_update_blocks
+
+    results = []
+    for options in [{}, {"schedule": True}, {"schedule": True, "concurrent": True}]:
+        np.random.seed(1)
+        random.seed(1)
+        df, _exceptions = run(simulation, **options)
+        results.append(df.drop(columns=["substep"]))
+
+    # Scheduled State Update Blocks reproduce the results of the original blocks, which are restored
+    assert simulation.model.state_update_blocks is blocks
+    assert_results_equal(results[0], results[1])
+    assert_results_equal(results[0], results[2])
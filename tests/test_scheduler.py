@@ -0,0 +1,24 @@
+import pandas as pd
+
+from experiments.scheduler import estimate_cost, run_parallel
+from experiments.execution import simulation_tasks
+from tests.utils import assert_results_equal, sweep_simulation
+
+
+def test_estimate_cost():
+    costs = [estimate_cost(simulation, params, key[2]) for key, simulation, params in simulation_tasks(sweep_simulation())]
+
+    # Tasks of the faster adoption subset are more expensive
+    assert costs[0] < costs[1] and costs[0] == costs[2]
+
+
+def test_run_parallel():
+    simulation = sweep_simulation()
+
+    df_1 = pd.DataFrame(run_parallel(simulation, processes=2, seed=1, progress=False))
+    df_2 = pd.DataFrame(run_parallel(simulation, processes=3, seed=1, progress=False))
+
+    assert list(df_1.groupby(["run", "subset"], sort=False).size().index) == [(1, 0), (1, 1), (2, 0), (2, 1)]
+    assert (df_1["timestep"].to_numpy() == list(range(11)) * 4).all()
+    # Results are independent of the order the tasks complete in
+    assert_results_equal(df_1, df_2)
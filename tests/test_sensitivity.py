@@ -0,0 +1,58 @@
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+
+from experiments.default_experiment import experiment
+from experiments.sensitivity import run_sensitivity_analysis, saltelli_sample, sobol_indices
+from experiments.sweeps import Dimension, constant_process
+
+
+ISHIGAMI_DIMENSIONS = [Dimension(f"x{i}", -np.pi, np.pi) for i in range(1, 4)]
+
+
+def ishigami(table):
+    x1, x2, x3 = table["x1"], table["x2"], table["x3"]
+    f = np.sin(x1) + 7 * np.sin(x2) ** 2 + 0.1 * x3 ** 4 * np.sin(x1)
+    return pd.DataFrame({"f": f, "g": x2})
+
+
+def test_saltelli_sample():
+    table = saltelli_sample(ISHIGAMI_DIMENSIONS, 8, seed=1)
+    a, b, ab = table[:8].to_numpy(), table[8:16].to_numpy(), table[16:].to_numpy().reshape(3, 8, 3)
+
+    assert len(table) == 8 * 5
+    for i in range(3):
+        np.testing.assert_array_equal(ab[i][:, i], b[:, i])
+        np.testing.assert_array_equal(np.delete(ab[i], i, axis=1), np.delete(a, i, axis=1))
+
+
+def test_sobol_indices():
+    table = saltelli_sample(ISHIGAMI_DIMENSIONS, 4096, seed=1)
+    indices = sobol_indices(ishigami(table), ["x1", "x2", "x3"], bootstrap=200, seed=1)
+
+    # Analytical indices of the Ishigami function
+    np.testing.assert_allclose(indices.loc["f", "S1"], [0.3139, 0.4424, 0], atol=0.03)
+    np.testing.assert_allclose(indices.loc["f", "ST"], [0.5576, 0.4424, 0.2437], atol=0.03)
+    np.testing.assert_allclose(indices.loc["g", "S1"], [0, 1, 0], atol=1e-9)
+    assert (indices["S1_low"] <= indices["S1"] + 1e-9).all() and (indices["S1"] <= indices["S1_high"] + 1e-9).all()
+    assert (indices["ST_low"] <= indices["ST"] + 1e-9).all() and (indices["ST"] <= indices["ST_high"] + 1e-9).all()
+
+
+def test_run_sensitivity_analysis():
+    simulation = deepcopy(experiment.simulations[0])
+    simulation.timesteps = 2
+    simulation.runs = 1
+    dimensions = [
+        Dimension("polygn_price_process", 0.5, 2, transform=constant_process),
+        Dimension("slashing_fraction", 0.01, 0.2),
+    ]
+
+    indices = run_sensitivity_analysis(
+        simulation, dimensions, ["total_profit_yields_pct"], n=4, bootstrap=10, processes=1, seed=1
+    )
+
+    assert list(indices.index) == [
+        ("total_profit_yields_pct", "polygn_price_process"),
+        ("total_profit_yields_pct", "slashing_fraction"),
+    ]
@@ -0,0 +1,48 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import model.constants as constants
+from model.simulation_calendar import SimulationCalendar
+
+
+DATE_START = datetime.datetime(2023, 1, 1, 10, 30, 7, 123456)
+DT = constants.epochs_per_day
+
+
+def expected_timestamp(timestep, dt=DT):
+    return DATE_START + datetime.timedelta(days=(timestep * dt / constants.epochs_per_day))
+
+
+def test_timestamps():
+    calendar = SimulationCalendar(DATE_START, 100)
+
+    for timestep in [0, 1, 2, 127, 128, 1000]:
+        assert calendar.timestamp(timestep) == expected_timestamp(timestep, dt=100)
+    assert calendar.horizon == 1024
+
+
+def test_first_timestep_after():
+    calendar = SimulationCalendar(DATE_START, DT)
+
+    for date in [
+        DATE_START - datetime.timedelta(days=10),
+        DATE_START,
+        expected_timestamp(5),
+        datetime.datetime(2023, 8, 4),
+        datetime.datetime(2030, 1, 1),
+    ]:
+        timestep = calendar.first_timestep_after(date)
+        assert expected_timestamp(timestep) > date
+        assert timestep == 0 or not expected_timestamp(timestep - 1) > date
+
+
+def test_years_at():
+    calendar = SimulationCalendar(DATE_START, DT)
+    timesteps = np.arange(-1, 1000)
+
+    timestamps = pd.Series([expected_timestamp(timestep) if timestep >= 0 else None for timestep in timesteps])
+    expected_years = (pd.to_datetime(timestamps) - DATE_START).dt.days // 365
+
+    np.testing.assert_array_equal(calendar.years_at(timesteps), expected_years.to_numpy())
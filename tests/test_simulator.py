@@ -0,0 +1,32 @@
+import datetime
+from copy import deepcopy
+
+from radcad import Simulation
+
+import experiments.templates.time_domain_analysis as time_domain_analysis
+from experiments.simulator import WarmSimulator
+from tests.utils import assert_results_equal
+
+
+DATE_START = datetime.datetime(2023, 1, 1)
+
+
+def date_slashing_parameters(date_slashing):
+    return {"date_start": DATE_START, "date_slashing": date_slashing}
+
+
+def test_warm_simulator_resume():
+    simulation: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation.timesteps = 40
+    warm_simulator = WarmSimulator(simulation, parameters=date_slashing_parameters)
+
+    df_1 = warm_simulator.run(date_slashing=DATE_START + datetime.timedelta(days=20))
+    assert warm_simulator.run(date_slashing=DATE_START + datetime.timedelta(days=20)) is df_1
+
+    df_2 = warm_simulator.submit(date_slashing=DATE_START + datetime.timedelta(days=30)).result()
+
+    assert warm_simulator.resumed_timesteps == 21
+    assert len(df_2) == len(df_1)
+    # The states before the earlier slashing date are shared
+    state_variables = list(simulation.model.initial_state)
+    assert_results_equal(df_1[state_variables].iloc[:20], df_2[state_variables].iloc[:20])
@@ -0,0 +1,133 @@
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+from model.parts.utils import staking_matrix
+from model.parts.utils.kernels import attack_sets, sparse_attack_sets
+
+
+def random_staking_metrics(chains=200, validators=100, seed=1):
+    rng = np.random.default_rng(seed)
+    # Continuous stakes, so that the order of the nodes within each chain is unique
+    staking_metrics = rng.uniform(100_000, 5_000_000, (chains, validators))
+    # Fully staked public chains, ~15% participation on private chains, and a chain without stake
+    staking_metrics[2:] *= rng.binomial(1, 0.15, (chains - 2, validators))
+    staking_metrics[7] = 0.0
+    return staking_metrics
+
+
+def test_sparse_operations_match_dense():
+    dense = random_staking_metrics()
+    csr = staking_matrix.as_staking_matrix(dense, use_sparse=True)
+    liveness_metrics = np.random.default_rng(2).uniform(0.9, 1, dense.shape)
+    mask = np.random.default_rng(3).binomial(1, 0.5, dense.shape[1])
+
+    assert staking_matrix.is_sparse(csr)
+    assert_array_equal(staking_matrix.to_dense(csr), dense)
+    assert staking_matrix.count_nonzero(csr) == np.count_nonzero(dense)
+    assert_allclose(staking_matrix.total(csr), staking_matrix.total(dense))
+    assert_allclose(staking_matrix.stake_per_chain(csr), dense.sum(axis=1))
+    assert_allclose(staking_matrix.stake_per_validator(csr), dense.sum(axis=0))
+    assert_array_equal(staking_matrix.chain(csr, 3), dense[3])
+    assert_allclose(
+        staking_matrix.weighted_total(staking_matrix.mask_validators(csr, mask), liveness_metrics),
+        staking_matrix.weighted_total(staking_matrix.mask_validators(dense, mask), liveness_metrics),
+    )
+    assert_array_equal(
+        staking_matrix.to_dense(staking_matrix.apply_minimum_stake(csr, 1_000_000)),
+        staking_matrix.apply_minimum_stake(dense, 1_000_000),
+    )
+    assert_array_equal(
+        staking_matrix.to_dense(staking_matrix.append_chains(csr, dense[:3])),
+        staking_matrix.append_chains(dense, dense[:3]),
+    )
+
+
+def test_weighted_group_totals_match_masked_totals():
+    dense = random_staking_metrics()
+    liveness_metrics = np.random.default_rng(2).uniform(0.9, 1, dense.shape)
+    mask = np.random.default_rng(3).binomial(1, 0.5, dense.shape[1])
+    expected = (
+        staking_matrix.weighted_total(dense, liveness_metrics),
+        staking_matrix.weighted_total(staking_matrix.mask_validators(dense, 1 - mask), liveness_metrics),
+        staking_matrix.weighted_total(staking_matrix.mask_validators(dense, mask), liveness_metrics),
+    )
+
+    for staking_metrics, weights in [
+        (dense, liveness_metrics),
+        (staking_matrix.as_staking_matrix(dense, use_sparse=True), liveness_metrics),
+        (dense.astype(np.float32), liveness_metrics.astype(np.float32)),
+    ]:
+        assert_allclose(
+            staking_matrix.weighted_group_totals(staking_metrics, weights, mask),
+            expected,
+            rtol=1e-6 if staking_metrics.dtype == np.float32 else 1e-12,
+        )
+
+
+def test_sparse_attack_sets_match_dense():
+    dense = random_staking_metrics()
+    csr = staking_matrix.as_staking_matrix(dense, use_sparse=True)
+
+    for use_numba in (False, True):
+        dense_result = attack_sets(dense, 100, use_numba=use_numba)
+        sparse_result = sparse_attack_sets(csr, 100, use_numba=use_numba)
+        for dense_array, sparse_array in zip(dense_result, sparse_result):
+            assert_array_equal(dense_array, sparse_array)
+
+
+def test_sparse_gini_and_hhi_match_dense():
+    dense = random_staking_metrics()
+    # Every chain has stake, as the averages are undefined otherwise
+    dense[7, 0] = 1_000_000.0
+    csr = staking_matrix.as_staking_matrix(dense, use_sparse=True)
+
+    assert_allclose(
+        staking_matrix.average_gini_and_hhi(csr),
+        staking_matrix.average_gini_and_hhi(dense),
+    )
+
+
+def test_sparse_slash_chain_matches_dense():
+    dense = random_staking_metrics()
+    csr = staking_matrix.as_staking_matrix(dense, use_sparse=True)
+    polygn_staked_per_validator = dense.max(axis=0) * 1.5
+    slashing_amount = dense[0] * 0.9
+
+    dense_polygn_staked_per_validator = polygn_staked_per_validator.copy()
+    staking_matrix.slash_chain(dense, 0, slashing_amount, dense_polygn_staked_per_validator)
+
+    sparse_polygn_staked_per_validator = polygn_staked_per_validator.copy()
+    staking_matrix.slash_chain(csr, 0, slashing_amount, sparse_polygn_staked_per_validator)
+
+    assert_allclose(staking_matrix.to_dense(csr), dense)
+    assert_allclose(sparse_polygn_staked_per_validator, dense_polygn_staked_per_validator)
+
+
+def test_sample_stakes_match_dense_sampling():
+    dense = random_staking_metrics(chains=400, validators=500)
+    csr = staking_matrix.as_staking_matrix(dense, use_sparse=True)
+    maximum_stakes = np.random.default_rng(2).uniform(0, 3_000_000, dense.shape[1])
+
+    np.random.seed(1)
+    sampled = staking_matrix.to_dense(staking_matrix.apply_minimum_stake(
+        staking_matrix.sample_stakes(csr, 1_000_000, maximum_stakes, 180000), 180000
+    ))
+    # The dense multistaking sampling, see `policy_staking_multistaking_sampling`
+    expected = staking_matrix.apply_minimum_stake(
+        np.clip(np.random.normal(dense, scale=1_000_000), 0, maximum_stakes), 180000
+    )
+
+    # The input matrix is unchanged
+    assert_array_equal(staking_matrix.to_dense(csr), dense)
+    assert (sampled <= maximum_stakes).all()
+    for stakes in [dense > 0, dense == 0]:
+        # Active and inactive stakes are as likely to be active after sampling, with the same stakes
+        assert_allclose((sampled[stakes] > 0).mean(), (expected[stakes] > 0).mean(), atol=0.01)
+        assert_allclose(sampled[stakes].mean(), expected[stakes].mean(), rtol=0.02)
+        assert_allclose(sampled[stakes].std(), expected[stakes].std(), rtol=0.02)
+    # Inactive stakes are activated uniformly over chains and validators
+    activated = (sampled > 0) & (dense == 0)
+    eligible = maximum_stakes >= 180000
+    assert not activated[:, ~eligible].any()
+    assert_allclose(activated[:, eligible].mean(axis=0) / (dense[:, eligible] == 0).mean(axis=0), 0.43, atol=0.1)
+
@@ -0,0 +1,77 @@
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from experiments.default_experiment import experiment
+from experiments.surrogate import RBFSurrogate, SurrogateCache, simulation_metrics
+from experiments.sweeps import Dimension, constant_process, design_table
+
+
+DIMENSIONS = [
+    Dimension("polygn_price", 0.1, 10, log=True),
+    Dimension("polygn_staked", 1e9, 5e9),
+]
+
+
+def simulate(table):
+    price, staked = table["polygn_price"], table["polygn_staked"] / 1e9
+    return pd.DataFrame({"profit_yields": np.log(price) + 1 / staked, "revenue_yields": 2 / staked})
+
+
+def test_rbf_surrogate(tmp_path):
+    table = design_table(DIMENSIONS, 64, seed=1)
+    surrogate = RBFSurrogate(DIMENSIONS, table, simulate(table))
+
+    # Interpolates the simulated points
+    values, errors = surrogate.predict(table)
+    np.testing.assert_allclose(values, simulate(table).to_numpy(), rtol=1e-6)
+    np.testing.assert_array_equal(errors, 0)
+
+    # Estimated errors are of the order of the actual errors
+    queries = design_table(DIMENSIONS, 256, method="random", seed=2)
+    values, errors = surrogate.predict(queries)
+    actual = np.abs(values - simulate(queries).to_numpy())
+    assert actual.mean() / 5 < errors.mean() < actual.mean() * 5
+
+    surrogate.save(tmp_path / "surrogate.npz")
+    loaded = RBFSurrogate.load(tmp_path / "surrogate.npz")
+    for expected, result in zip(surrogate.predict(queries), loaded.predict(queries.to_numpy())):
+        np.testing.assert_array_equal(expected, result)
+
+
+def test_surrogate_cache(tmp_path):
+    path = str(tmp_path / "surrogate.npz")
+    cache = SurrogateCache(path, simulate, DIMENSIONS, initial_points=16, seed=1)
+    assert cache.simulated_points == 16
+
+    df = cache.grid(num=20, tolerance=0.01, batch_size=8, max_points=200)
+    assert df["profit_yields_error"].max() <= 0.01
+    assert cache.simulated_points > 16
+    actual = simulate(df)["profit_yields"] - df["profit_yields"]
+    assert np.abs(actual).max() < 0.1
+
+    # Reloaded without simulating
+    reloaded = SurrogateCache(path, simulate, DIMENSIONS)
+    assert reloaded.simulated_points == 0
+    pd.testing.assert_frame_equal(reloaded.grid(num=20), df)
+
+    with pytest.raises(ValueError):
+        SurrogateCache(path, simulate, DIMENSIONS[:1])
+
+
+def test_simulation_metrics():
+    simulation = deepcopy(experiment.simulations[0])
+    simulation.timesteps = 2
+    simulation.runs = 1
+    dimensions = [
+        Dimension("polygn_price_process", 0.5, 2, transform=constant_process),
+        Dimension("polygn_staked_process", 1e9, 3e9, transform=constant_process),
+    ]
+    table = design_table(dimensions, 2, seed=1)
+
+    values = simulation_metrics(simulation, dimensions, ["total_profit_yields_pct"], processes=1, seed=1)(table)
+
+    assert values.shape == (2, 1)
+    assert values.notna().all().all()
@@ -0,0 +1,51 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+from radcad.core import generate_parameter_sweep
+
+from experiments.default_experiment import experiment
+from experiments.sweeps import Dimension, apply_design, constant_process, latin_hypercube, unit_design
+
+
+DIMENSIONS = [
+    Dimension("inflation_sqrt_numerator", 0, 1e6),
+    Dimension("slashing_fraction", 1e-4, 1e-1, log=True),
+    Dimension("checkpoint_gas_cost", 1e5, 1e6, integer=True),
+    Dimension("polygn_price_process", 1, 10, transform=constant_process),
+]
+
+
+def test_latin_hypercube():
+    design = latin_hypercube(50, 3, np.random.default_rng(1))
+
+    # One point per stratum of each dimension
+    for dimension in range(3):
+        assert sorted((design[:, dimension] * 50).astype(int)) == list(range(50))
+
+
+@pytest.mark.parametrize("method", ["sobol", "lhs", "random"])
+def test_unit_design(method):
+    design = unit_design(64, 5, method, seed=1)
+
+    assert design.shape == (64, 5)
+    assert ((design >= 0) & (design < 1)).all()
+    np.testing.assert_array_equal(design, unit_design(64, 5, method, seed=1))
+
+
+def test_apply_design():
+    simulation = deepcopy(experiment.simulations[0])
+
+    table = apply_design(simulation, DIMENSIONS, 16, seed=1)
+    subsets = generate_parameter_sweep(simulation.model.params)
+
+    assert len(subsets) == len(table) == 16
+    assert (table["slashing_fraction"].between(1e-4, 1e-1)).all()
+    assert (table["checkpoint_gas_cost"] % 1 == 0).all()
+    for subset, params in enumerate(subsets):
+        assert params["inflation_sqrt_numerator"] == table["inflation_sqrt_numerator"][subset]
+        assert params["polygn_price_process"](1, 0) == table["polygn_price_process"][subset]
+
+    simulation.model.params["dt"] = [1, 2]
+    with pytest.raises(ValueError):
+        apply_design(simulation, DIMENSIONS, 16)
@@ -0,0 +1,97 @@
+import copy
+
+import numpy as np
+from numpy.testing import assert_allclose
+from radcad.core import generate_parameter_sweep
+
+import model.constants as constants
+from model.parts.treasury import policy_domain_treasury_balance, treasury_unlocks, unlock_schedule
+from model.state_variables import initial_state
+from model.system_parameters import parameters
+
+
+def test_default_no_unlock():
+    # By default the domain treasury isn't unlocked, as before the unlock mechanism
+    params = generate_parameter_sweep(parameters)[0]
+    state = copy.deepcopy(initial_state)
+    state.update({
+        "run": 1,
+        "domain_treasury_balance_locked": 100.0,
+        "public_base_fee_to_domain_treasury": 10.0,
+        "private_base_fee_to_domain_treasury": 5.0,
+    })
+
+    for timestep in range(1, 101):
+        state["timestep"] = timestep
+        state.update(policy_domain_treasury_balance(params, 0, [], state))
+
+    assert state["domain_treasury_balance_locked"] == 100.0 + 15.0 * 100
+    assert state["domain_treasury_balance_unlocked"] == 0
+
+
+def test_policy_matches_vectorized_unlocks():
+    params = generate_parameter_sweep(parameters)[0]
+    params["domain_treasury_monthly_unlock_process"] = lambda _run, timestep: 0.01 + 0.01 * (timestep > 100 * params["dt"])
+    state = copy.deepcopy(initial_state)
+    state.update({"run": 1, "public_base_fee_to_domain_treasury": 10.0, "private_base_fee_to_domain_treasury": 5.0})
+
+    locked, unlocked = [], []
+    for timestep in range(1, 301):
+        state["timestep"] = timestep
+        state.update(policy_domain_treasury_balance(params, 0, [], state))
+        locked.append(state["domain_treasury_balance_locked"])
+        unlocked.append(state["domain_treasury_balance_unlocked"])
+
+    schedule = unlock_schedule(params["domain_treasury_monthly_unlock_process"], 1, params["dt"], 512)[:300]
+    expected_locked, expected_unlocked = treasury_unlocks(initial_state["domain_treasury_balance_locked"], 15.0, schedule)
+
+    assert_allclose(locked, expected_locked[0])
+    assert_allclose(unlocked, expected_unlocked[0])
+    # The treasury balance is conserved
+    assert_allclose(expected_locked[0] + expected_unlocked[0], initial_state["domain_treasury_balance_locked"] + 15.0 * np.arange(1, 301))
+
+
+def test_unlock_schedule_variants():
+    dt = constants.epochs_per_day
+    monthly_unlock_rates = np.array([[0.0], [0.01], [0.05]])
+    unlock_fractions = np.repeat(monthly_unlock_rates * dt / constants.epochs_per_month, 365, axis=1)
+
+    locked, unlocked = treasury_unlocks(100.0, 0.0, unlock_fractions)
+
+    assert locked.shape == unlocked.shape == (3, 365)
+    assert_allclose(unlocked[:, -1], 100.0 * (1 - (1 - unlock_fractions[:, 0]) ** 365))
+
+
+def test_treasury_unlocks_match_recurrence():
+    rng = np.random.default_rng(1)
+    unlock_fractions = rng.uniform(0, 0.2, (5, 1000))
+    unlock_fractions[2] = rng.uniform(0.9, 1, 1000)
+    # Long horizons and full unlocks, which cumulative products divided out would underflow or divide by zero
+    unlock_fractions[1, 500] = 1.0
+    inflows = rng.uniform(0, 10, 1000)
+
+    locked, unlocked = treasury_unlocks(100.0, inflows, unlock_fractions, block=64)
+
+    balance = np.full(5, 100.0)
+    total_unlocked = np.zeros(5)
+    for timestep in range(1000):
+        balance = balance + inflows[timestep]
+        unlocked_amount = balance * unlock_fractions[:, timestep]
+        balance = balance - unlocked_amount
+        total_unlocked = total_unlocked + unlocked_amount
+        assert_allclose(locked[:, timestep], balance, rtol=1e-10, atol=1e-12)
+        assert_allclose(unlocked[:, timestep], total_unlocked, rtol=1e-10)
+    assert locked[1, 500] == 0
+
+
+def test_policy_unlock_process_table():
+    # A process table only extends to the simulated timesteps
+    params = generate_parameter_sweep(parameters)[0]
+    table = np.full(101, 0.01)
+    params["domain_treasury_monthly_unlock_process"] = lambda _run, timestep: table[timestep // params["dt"]]
+    state = copy.deepcopy(initial_state)
+    state.update({"run": 1, "timestep": 101})
+
+    result = policy_domain_treasury_balance(params, 0, [], state)
+
+    assert result["domain_treasury_balance_unlocked"] > state["domain_treasury_balance_unlocked"]
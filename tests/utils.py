@@ -0,0 +1,37 @@
+"""
+Helpers shared by the test modules
+"""
+
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+from radcad import Simulation
+
+import experiments.templates.time_domain_analysis as time_domain_analysis
+
+
+def values_equal(value_1, value_2):
+    if isinstance(value_1, tuple):
+        return len(value_1) == len(value_2) and all(map(values_equal, value_1, value_2))
+    if isinstance(value_1, np.ndarray):
+        return np.array_equal(value_1, value_2, equal_nan=value_1.dtype.kind == "f")
+    return value_1 == value_2 or (pd.isna(value_1) and pd.isna(value_2))
+
+
+def assert_results_equal(df_1, df_2):
+    """Assert that two frames of results are equal, including their array State Variables"""
+    assert list(df_1.columns) == list(df_2.columns)
+    for column in df_1.columns:
+        assert all(map(values_equal, df_1[column], df_2[column])), column
+
+
+def sweep_simulation():
+    """A short Simulation of two runs of two parameter subsets"""
+    simulation: Simulation = deepcopy(time_domain_analysis.experiment.simulations[0])
+    simulation.timesteps = 10
+    simulation.runs = 2
+    simulation.model.params.update({
+        "Adoption_speed_process": [lambda _run, _timestep: 1, lambda _run, _timestep: 2],
+    })
+    return simulation